@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+from data_preprocessing.schemas import SENTIMENT_SCHEMA, TOPICS_SCHEMA, Schema
+from utils.file_cache import FileVersionCache
+from utils.near_dedup import MULTIPLICITY_COLUMN, post_weights
+
+# Resampling rules exposed by the API; weeks are labelled by their Monday
+FREQUENCIES = {
+    "D": {"rule": "D", "label": "left", "closed": "left"},
+    "W": {"rule": "W-MON", "label": "left", "closed": "left"},
+}
+
+# Shared cache of computed aggregates, keyed by parameters and input file version
+aggregate_cache = FileVersionCache()
+
+
+def _resample_kwargs(freq: str) -> Dict:
+    """Validate a frequency code and return the matching resample arguments"""
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unsupported frequency '{freq}', expected one of {list(FREQUENCIES)}")
+    return FREQUENCIES[freq]
+
+
+def _period_start(dates: pd.Series, freq: str) -> pd.Series:
+    """Map each timestamp to the start of its resampling period"""
+    if freq == "W":
+        return dates.dt.to_period("W-SUN").dt.start_time
+    return dates.dt.normalize()
+
+
+def _read_posts(file_path: str, schema: Schema, columns) -> pd.DataFrame:
+    """
+    Read the given columns plus the multiplicity of collapsed duplicates, when the file has it.
+    Dates are kept as YYYY-MM-DD strings, the other columns get their schema types.
+    """
+    wanted = set(columns) | {MULTIPLICITY_COLUMN}
+    df = pd.read_csv(file_path, usecols=lambda col: col in wanted, dtype=schema.dtypes(wanted))
+    df[MULTIPLICITY_COLUMN] = post_weights(df)
+    return df
+
+
+def _compute_stock_ohlc(file_path: str, freq: str) -> pd.DataFrame:
+    df = pd.read_csv(
+        file_path,
+        usecols=["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"],
+        dtype=str,
+    )
+
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    for col in ["Open", "High", "Low", "Close", "Adj Close", "Volume"]:
+        df[col] = pd.to_numeric(df[col].str.replace(",", ""), errors="coerce")
+    df = df.dropna().set_index("Date").sort_index()
+
+    ohlc = df.resample(**_resample_kwargs(freq)).agg({
+        "Open": "first",
+        "High": "max",
+        "Low": "min",
+        "Close": "last",
+        "Adj Close": "last",
+        "Volume": "sum",
+    })
+    # Drop periods without any trading day (weekends, holidays)
+    ohlc = ohlc.dropna(subset=["Open"]).reset_index()
+    ohlc["Date"] = ohlc["Date"].dt.strftime("%Y-%m-%d")
+    return ohlc
+
+
+def _compute_social_daily(file_path: str) -> pd.DataFrame:
+    sentiment_columns = ["vader_compound", "finbert_positive", "finbert_negative", "finbert_neutral"]
+    df = _read_posts(file_path, SENTIMENT_SCHEMA, ["date", "source"] + sentiment_columns)
+
+    # Means are weighted by the number of posts each (deduplicated) row stands for,
+    # missing scores are skipped like in an unweighted mean
+    weights = df[MULTIPLICITY_COLUMN]
+    weighted = df[["date", "source"]].assign(posts=weights)
+    for col in sentiment_columns:
+        weighted[col] = (df[col].astype(np.float64) * weights).fillna(0)
+        weighted[f"{col}_weight"] = weights.where(df[col].notna(), 0)
+    sums = weighted.groupby(["date", "source"], observed=True).sum()
+
+    daily = pd.DataFrame({"posts": sums["posts"]})
+    for col in sentiment_columns:
+        daily[f"{col}_mean"] = sums[col] / sums[f"{col}_weight"]
+    daily = daily.reset_index()
+    daily["source"] = daily["source"].astype(str)
+    return daily.round(4)
+
+
+def _compute_topic_frequency(file_path: str, freq: str) -> pd.DataFrame:
+    _resample_kwargs(freq)
+    df = _read_posts(file_path, TOPICS_SCHEMA, ["date", "topic", "topic_words"])
+    df["date"] = _period_start(pd.to_datetime(df["date"]), freq)
+
+    counts = (
+        df.groupby(["date", "topic", "topic_words"], observed=True)[MULTIPLICITY_COLUMN]
+        .sum()
+        .rename("count")
+        .reset_index()
+    )
+    # Share of the period's posts that belong to each topic
+    counts["share"] = (counts["count"] / counts.groupby("date")["count"].transform("sum")).round(4)
+    counts["date"] = counts["date"].dt.strftime("%Y-%m-%d")
+    counts["topic_words"] = counts["topic_words"].astype(str)
+    return counts.sort_values(["date", "topic"]).reset_index(drop=True)
+
+
+def stock_ohlc(file_path: str, freq: str = "D") -> pd.DataFrame:
+    """
+    OHLC bars of the raw stock history resampled to the given frequency
+
+    Parameters:
+    - file_path: Path to tesla_stock_history.csv
+    - freq: "D" for daily or "W" for weekly bars
+
+    Returns:
+    - DataFrame with one row per period
+    """
+    _resample_kwargs(freq)
+    return aggregate_cache.get(
+        ("stock_ohlc", file_path, freq), [file_path],
+        lambda: _compute_stock_ohlc(file_path, freq),
+    )
+
+
+def social_daily(file_path: str) -> pd.DataFrame:
+    """
+    Daily post counts and mean sentiment scores per source
+
+    Parameters:
+    - file_path: Path to comments_with_sentiments_without_topics.csv
+
+    Returns:
+    - DataFrame with one row per (date, source)
+    """
+    return aggregate_cache.get(
+        ("social_daily", file_path), [file_path],
+        lambda: _compute_social_daily(file_path),
+    )
+
+
+def topic_frequency(file_path: str, freq: str = "D") -> pd.DataFrame:
+    """
+    Number and share of posts assigned to each topic per period
+
+    Parameters:
+    - file_path: Path to comments_with_topics.csv
+    - freq: "D" for daily or "W" for weekly counts
+
+    Returns:
+    - DataFrame with one row per (period, topic)
+    """
+    _resample_kwargs(freq)
+    return aggregate_cache.get(
+        ("topic_frequency", file_path, freq), [file_path],
+        lambda: _compute_topic_frequency(file_path, freq),
+    )
@@ -0,0 +1,182 @@
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from utils.stage_metrics import load_stage_metrics, record_stage
+
+# Latency buckets in seconds, from cached JSON hits up to model runs
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def escape_label(value) -> str:
+    """Escape a label value for the text exposition format (backslash, double quote, newline)"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Cumulative latency histogram keyed by a tuple of label values"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [bucket counts..., +Inf count, sum]
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], List]]:
+        with self._lock:
+            return [(labels, list(series)) for labels, series in self._series.items()]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Request metrics of the API process plus pipeline stage timings and cache stats"""
+        self.request_latency = Histogram()
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        # name -> callable returning FileVersionCache.stats()-like dicts
+        self.caches: Dict[str, Callable[[], Dict]] = {}
+        # name -> callable returning BrowserPool.stats()-like dicts
+        self.pools: Dict[str, Callable[[], Dict]] = {}
+        self.pool_wait = Histogram()
+
+    def register_cache(self, name: str, stats: Callable[[], Dict]) -> None:
+        """Expose the hit/miss counters of a cache under the given name"""
+        self.caches[name] = stats
+
+    def register_pool(self, name: str, stats: Callable[[], Dict]) -> None:
+        """Expose the occupancy and lifecycle counters of a browser pool under the given name"""
+        self.pools[name] = stats
+
+    def observe_pool_wait(self, pool: str, wait_seconds: float) -> None:
+        """Record how long a checkout waited for a browser session"""
+        self.pool_wait.observe((pool,), wait_seconds)
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, route: str, method: str, status: int, duration: float) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self.request_latency.observe((route, method, str(status)), duration)
+
+    def record_stage(self, stage: str, duration_seconds: float, rows: int = None) -> None:
+        """Record a pipeline stage that ran inside the API process"""
+        record_stage(stage, duration_seconds, rows)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = [
+            "# HELP http_request_duration_seconds Request latency per route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (route, method, status), series in sorted(self.request_latency.samples()):
+            labels = f'route="{escape_label(route)}",method="{escape_label(method)}",status="{escape_label(status)}"'
+            for bound, count in zip(self.request_latency.buckets, series):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series[-2]}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {series[-1]:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {series[-2]}")
+
+        lines += [
+            "# HELP http_requests_in_flight Requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+
+        stages = load_stage_metrics()
+        lines += [
+            "# HELP pipeline_stage_duration_seconds Wall time of the most recent run of each stage.",
+            "# TYPE pipeline_stage_duration_seconds gauge",
+        ]
+        lines += [
+            f'pipeline_stage_duration_seconds{{stage="{escape_label(stage)}"}} {info["duration_seconds"]}'
+            for stage, info in sorted(stages.items())
+        ]
+        lines += [
+            "# HELP pipeline_stage_rows Rows produced by the most recent run of each stage.",
+            "# TYPE pipeline_stage_rows gauge",
+        ]
+        lines += [
+            f'pipeline_stage_rows{{stage="{escape_label(stage)}"}} {info["rows"]}'
+            for stage, info in sorted(stages.items()) if info.get("rows") is not None
+        ]
+        lines += [
+            "# HELP pipeline_stage_last_run_timestamp_seconds Unix time the stage last finished.",
+            "# TYPE pipeline_stage_last_run_timestamp_seconds gauge",
+        ]
+        lines += [
+            f'pipeline_stage_last_run_timestamp_seconds{{stage="{escape_label(stage)}"}} {info["finished_at"]:.0f}'
+            for stage, info in sorted(stages.items())
+        ]
+
+        cache_stats = {name: stats() for name, stats in self.caches.items()}
+        for metric, key, kind, help_text in [
+            ("cache_hits_total", "hits", "counter", "Cache lookups served from memory."),
+            ("cache_misses_total", "misses", "counter", "Cache lookups that recomputed the value."),
+            ("cache_hit_ratio", "hit_ratio", "gauge", "Share of cache lookups served from memory."),
+        ]:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            lines += [
+                f'{metric}{{cache="{escape_label(name)}"}} {stats[key]}'
+                for name, stats in sorted(cache_stats.items())
+            ]
+
+        lines += [
+            "# HELP browser_pool_wait_seconds Time to check out a browser session, including launching Chrome.",
+            "# TYPE browser_pool_wait_seconds histogram",
+        ]
+        for (pool,), series in sorted(self.pool_wait.samples()):
+            for bound, count in zip(self.pool_wait.buckets, series):
+                lines.append(f'browser_pool_wait_seconds_bucket{{pool="{escape_label(pool)}",le="{bound}"}} {count}')
+            lines.append(f'browser_pool_wait_seconds_bucket{{pool="{escape_label(pool)}",le="+Inf"}} {series[-2]}')
+            lines.append(f'browser_pool_wait_seconds_sum{{pool="{escape_label(pool)}"}} {series[-1]:.6f}')
+            lines.append(f'browser_pool_wait_seconds_count{{pool="{escape_label(pool)}"}} {series[-2]}')
+
+        pool_stats = {name: stats() for name, stats in self.pools.items()}
+        for metric, key, kind, help_text in [
+            ("browser_pool_sessions_idle", "idle", "gauge", "Warm browser sessions waiting in the pool."),
+            ("browser_pool_sessions_in_use", "in_use", "gauge", "Browser sessions currently checked out."),
+            ("browser_pool_sessions_created_total", "created", "counter", "Browser sessions launched."),
+            ("browser_pool_sessions_recycled_total", "recycled", "counter", "Sessions quit after reaching their use limit."),
+            ("browser_pool_sessions_discarded_total", "discarded", "counter", "Sessions quit after failing a health check."),
+        ]:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            lines += [
+                f'{metric}{{pool="{escape_label(name)}"}} {stats[key]}'
+                for name, stats in sorted(pool_stats.items())
+            ]
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class StageTimer:
+    """Context manager recording the wall time of a pipeline stage run by the API"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.rows = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is None:
+            metrics.record_stage(self.stage, self.duration, self.rows)
+        return False
@@ -0,0 +1,152 @@
+import gzip
+import hashlib
+import json
+import pandas as pd
+from typing import Callable, Dict, Hashable, List, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from utils.file_cache import FileVersionCache, file_version
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the json module gives the same output more slowly
+    orjson = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+# Serialized payloads (and their compressed variants), keyed by file version
+payload_cache = FileVersionCache()
+
+
+class JsonPayload:
+    """Serialized JSON body with lazily computed compressed variants"""
+
+    __slots__ = ("body", "_encoded")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        """Return the body compressed with the given content-coding (None for identity)"""
+        if encoding is None:
+            return self.body
+        if encoding not in self._encoded:
+            if encoding == "br":
+                self._encoded[encoding] = brotli.compress(self.body, quality=5)
+            else:
+                self._encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+        return self._encoded[encoding]
+
+
+def frame_to_json_bytes(df: pd.DataFrame) -> bytes:
+    """
+    Serialize a DataFrame to a JSON array of records.
+
+    Floats are written in their shortest round-trip form (250.08, not
+    250.080000000000012), missing values as null and dates in ISO format.
+    """
+    casts = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if dtype == "float32":
+            # Widen through the shortest float32 repr: 244.98, not 244.97999572753906
+            casts[col] = df[col].astype(str).astype("float64")
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            casts[col] = df[col].dt.strftime("%Y-%m-%dT%H:%M:%S.%f").str[:-3]
+    if casts:
+        df = df.assign(**casts)
+
+    if orjson is not None:
+        # orjson writes NaN as null
+        return orjson.dumps(df.to_dict(orient="records"))
+    df = df.astype(object).where(df.notna(), None)
+    return json.dumps(df.to_dict(orient="records"), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def compute_etag(key: Hashable, file_paths: List[str]) -> str:
+    """Derive a weak ETag from the response key and the version of its input files"""
+    digest = hashlib.sha1(repr((key, [file_version(path) for path in file_paths])).encode("utf-8"))
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    # Weak comparison: W/"x" and "x" refer to the same representation
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported content-coding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def json_response(
+    request: Request,
+    key: Hashable,
+    file_paths: List[str],
+    build_frame: Callable[[], pd.DataFrame],
+) -> Response:
+    """
+    Serve a DataFrame derived from files as JSON with ETag and compression support.
+
+    The ETag only depends on the file versions, so a matching If-None-Match
+    is answered with 304 before anything is read or serialized. Otherwise
+    the serialized (and compressed) body is cached until the files change.
+
+    Parameters:
+    - request: Incoming request (for If-None-Match and Accept-Encoding)
+    - key: Identifier of the payload (e.g. endpoint name and parameters)
+    - file_paths: Files the payload is computed from
+    - build_frame: Zero-argument callable producing the DataFrame to serialize
+
+    Returns:
+    - Response with the JSON body, or an empty 304 response
+    """
+    etag = compute_etag(key, file_paths)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    payload = payload_cache.get(
+        key, file_paths,
+        lambda: JsonPayload(frame_to_json_bytes(build_frame())),
+    )
+
+    encoding = None
+    if len(payload.body) >= MIN_COMPRESS_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=payload.encoded(encoding), media_type="application/json", headers=headers)
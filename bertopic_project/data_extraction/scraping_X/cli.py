@@ -1,8 +1,11 @@
 import argparse
+from datetime import datetime, timedelta
 from getpass import getpass
 from dotenv import load_dotenv
+import multiprocessing
 import os
-from x_scrapper import XScraper
+import pandas as pd
+from x_scrapper import XScraper, TweetBudget, checkpoint_path, load_checkpoint, migrate_output_header, write_checkpoint
 from time import sleep
 
 def load_accounts(account_file=None):
@@ -26,17 +29,133 @@ def load_accounts(account_file=None):
     
     return accounts
 
+def split_date_range(start_date, end_date, n_shards):
+    """
+    Split [start_date, end_date] into at most n_shards contiguous, disjoint ranges of days.
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    total_days = (end - start).days + 1
+    n_shards = max(1, min(n_shards, total_days))
+
+    shards = []
+    shard_start = start
+    for i in range(n_shards):
+        # Spread the remainder over the first shards
+        length = total_days // n_shards + (1 if i < total_days % n_shards else 0)
+        shard_end = shard_start + timedelta(days=length - 1)
+        shards.append((shard_start.strftime("%Y-%m-%d"), shard_end.strftime("%Y-%m-%d")))
+        shard_start = shard_end + timedelta(days=1)
+    return shards
+
+def run_worker(scraper_kwargs, budget):
+    """
+    Scrape one date shard with its own browser session (runs in a worker process).
+    """
+    scraper = XScraper(budget=budget, **scraper_kwargs)
+    try:
+        scraper.scrape_tweets()
+        print(f"Worker {scraper_kwargs['date_limit']}..{scraper_kwargs['end_date']}: "
+              f"saved {scraper.total_tweets_processed} tweets to {scraper.filename}")
+    finally:
+        scraper.close()
+
+def merge_shards(shard_files, output_file):
+    """
+    Append the per-shard CSV files (in date order) to the final output file
+    and fold the shard checkpoints into the output file's checkpoint.
+    """
+    completed_days = load_checkpoint(checkpoint_path(output_file))
+    # Shards are appended under the output file's header, which must have the id column
+    migrate_output_header(output_file)
+    total = 0
+    for path in shard_files:
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            shard = pd.read_csv(path, dtype=str, keep_default_na=False)
+            if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+                header = pd.read_csv(output_file, nrows=0).columns
+                shard.reindex(columns=header).to_csv(output_file, mode='a', header=False, index=False)
+            else:
+                shard.to_csv(output_file, index=False)
+            total += len(shard)
+        # Only fold the shard checkpoint once its tweets are in the output file
+        shard_checkpoint = checkpoint_path(path)
+        completed_days |= load_checkpoint(shard_checkpoint)
+        for leftover in (path, shard_checkpoint):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    if completed_days:
+        write_checkpoint(checkpoint_path(output_file), completed_days)
+    return total
+
+def scrape_parallel(args, accounts):
+    """
+    Coordinator: split the date range into one shard per worker and run each
+    worker in its own process with its own accounts and Chrome session.
+    The --max budget is shared by all workers.
+    """
+    n_workers = min(args.workers, len(accounts))
+    end_date = args.end_date or datetime.now().strftime("%Y-%m-%d")
+    shards = split_date_range(args.date, end_date, n_workers)
+    budget = TweetBudget(args.max) if args.max else None
+    output_file = f"{args.ticker}_tweets.csv"
+
+    processes = []
+    shard_files = []
+    for i, (shard_start, shard_end) in enumerate(shards):
+        shard_file = f"{args.ticker}_tweets.part{i:03d}.csv"
+        shard_files.append(shard_file)
+        scraper_kwargs = dict(
+            # Each worker rotates through its own disjoint subset of accounts
+            accounts=accounts[i::len(shards)],
+            ticker=args.ticker,
+            date_limit=shard_start,
+            end_date=shard_end,
+            batch_size=args.batch_size,
+            tweets_per_day=args.tweets_per_day,
+            headless=args.headless,
+            account_switch_interval=args.switch_days,
+            filename=shard_file,
+            # Tweets from earlier runs are never collected again
+            seed_files=[output_file],
+            extra_checkpoints=[checkpoint_path(output_file)],
+            flush_every_day=args.flush_every_day,
+            jitter=tuple(args.jitter),
+            scroll_timeout=args.scroll_timeout,
+            page_timeout=args.page_timeout,
+        )
+        process = multiprocessing.Process(target=run_worker, args=(scraper_kwargs, budget))
+        process.start()
+        processes.append(process)
+        print(f"Started worker {i} for {shard_start}..{shard_end}")
+
+    for process in processes:
+        process.join()
+
+    failed = [i for i, process in enumerate(processes) if process.exitcode != 0]
+    if failed:
+        print(f"Workers {failed} exited with errors, their shards may be incomplete.")
+
+    total = merge_shards(shard_files, output_file)
+    print(f"Appended {total} new tweets to {output_file}")
+
 def main():
     load_dotenv()
     parser = argparse.ArgumentParser(description="Scrape tweets about stock tickers")
     parser.add_argument("-t", "--ticker", required=True, help="Stock ticker symbol (e.g., TSLA)")
     parser.add_argument("-d", "--date", required=True, help="Starting date (YYYY-MM-DD)")
+    parser.add_argument("-e", "--end-date", default=None, help="Last date to scrape (YYYY-MM-DD), defaults to today")
     parser.add_argument("-m", "--max", type=int, default=None, help="Overall maximum tweets to collect")
     parser.add_argument("-b", "--batch-size", type=int, default=1000, help="Number of tweets to collect before saving to file")
     parser.add_argument("--tweets-per-day", type=int, default=None, help="Maximum tweets to scrape per day")
     parser.add_argument("-a", "--accounts-file", help="Path to a file containing account details (username,password)")
     parser.add_argument("--switch-days", type=int, default=5, help="Switch accounts after how many days")
     parser.add_argument("--headless", action="store_true", help="Run in headless mode")
+    parser.add_argument("--flush-every-day", action="store_true", help="Save tweets and the checkpoint after every scraped day")
+    parser.add_argument("--jitter", type=float, nargs=2, default=[0.2, 0.8], metavar=("MIN", "MAX"), help="Random pause range (seconds) after each page wait, use 0 0 to disable")
+    parser.add_argument("--scroll-timeout", type=float, default=2.0, help="Seconds to wait for new tweets after a scroll (doubled while nothing new appears)")
+    parser.add_argument("--page-timeout", type=float, default=15.0, help="Seconds to wait for the login fields and search results")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of parallel workers (one Chrome session each, at most one per account)")
 
     args = parser.parse_args()
 
@@ -45,6 +164,10 @@ def main():
     if not accounts:
         print("No accounts provided. Exiting.")
         return
+
+    if args.workers > 1 and len(accounts) > 1:
+        scrape_parallel(args, accounts)
+        return
     
     scraper = XScraper(
         accounts=accounts,  
@@ -54,7 +177,12 @@ def main():
         batch_size=args.batch_size,
         tweets_per_day=args.tweets_per_day,
         headless=args.headless,
-        account_switch_interval=args.switch_days
+        account_switch_interval=args.switch_days,
+        end_date=args.end_date,
+        flush_every_day=args.flush_every_day,
+        jitter=tuple(args.jitter),
+        scroll_timeout=args.scroll_timeout,
+        page_timeout=args.page_timeout
     )
 
     try:
@@ -1,14 +1,171 @@
 import pandas as pd
 from datetime import datetime, timedelta
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
 import random
-from time import sleep
+from time import sleep, perf_counter
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import JavascriptException, TimeoutException
 import undetected_chromedriver as uc
 
+# Make the shared bertopic_project modules importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from utils.browser_pool import BrowserPool
+from utils.record_sink import RecordSink
+
+# Extracts (tweet id, datetime, text) for every tweet article on the page in a
+# single WebDriver round trip. Ids returned once are remembered on the page
+# (window.__xsSeenIds) so later scrolls only transfer new articles.
+EXTRACT_TWEETS_JS = """
+const seen = window.__xsSeenIds || (window.__xsSeenIds = new Set());
+const rows = [];
+for (const article of document.querySelectorAll('article[data-testid="tweet"]')) {
+    const time = article.querySelector('time');
+    if (!time) continue;
+    const link = time.closest('a[href*="/status/"]');
+    const match = link ? link.getAttribute('href').match(/\\/status\\/(\\d+)/) : null;
+    const id = match ? match[1] : null;
+    if (id !== null) {
+        if (seen.has(id)) continue;
+        seen.add(id);
+    }
+    const spans = article.querySelectorAll('div[data-testid="tweetText"] span');
+    const text = Array.from(spans, span => span.innerText).join(' ');
+    rows.push([id, time.getAttribute('datetime'), text]);
+}
+return rows;
+"""
+
+# True once the search results have rendered: either a tweet or the "no results" state.
+RESULTS_READY_JS = """
+return document.querySelector('article[data-testid="tweet"]') !== null
+    || document.querySelector('[data-testid="emptyState"]') !== null;
+"""
+
+# Scrolls to the bottom and returns the page height before new content is requested.
+SCROLL_TO_BOTTOM_JS = """
+const height = document.body.scrollHeight;
+window.scrollTo(0, height);
+return height;
+"""
+
+# True once scrolling produced new content: the page grew, or an article not yet
+# extracted is on the page (the timeline is virtualized, so the article count alone
+# does not necessarily increase).
+NEW_CONTENT_JS = """
+if (document.body.scrollHeight > arguments[0]) return true;
+const seen = window.__xsSeenIds || new Set();
+for (const time of document.querySelectorAll('article[data-testid="tweet"] time')) {
+    const link = time.closest('a[href*="/status/"]');
+    const match = link ? link.getAttribute('href').match(/\\/status\\/(\\d+)/) : null;
+    if (match && !seen.has(match[1])) return true;
+}
+return false;
+"""
+
+class TweetBudget:
+    def __init__(self, limit):
+        """
+        Overall tweet budget, shareable between worker processes.
+
+        :param limit: Maximum number of tweets all holders may collect together.
+        """
+        self._remaining = multiprocessing.Value('q', limit)
+
+    def take(self):
+        """
+        Reserve one tweet from the budget. Returns False once it is exhausted.
+        """
+        with self._remaining.get_lock():
+            if self._remaining.value <= 0:
+                return False
+            self._remaining.value -= 1
+            return True
+
+    def exhausted(self):
+        return self._remaining.value <= 0
+
+
+OUTPUT_COLUMNS = ["content", "date", "id"]
+
+
+def migrate_output_header(path):
+    """
+    Add the OUTPUT_COLUMNS missing from an existing output file, left empty.
+
+    Files written before tweet ids were recorded have a content,date header.
+    Appending to them would drop the id column (the existing header is kept),
+    so they are rewritten once, atomically, with an empty id for the old rows.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    header = list(pd.read_csv(path, nrows=0).columns)
+    missing = [column for column in OUTPUT_COLUMNS if column not in header]
+    if not missing:
+        return
+
+    existing = pd.read_csv(path, dtype=str, keep_default_na=False)
+    for column in missing:
+        existing[column] = ""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    os.close(fd)
+    try:
+        existing.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    print(f"Added the {', '.join(missing)} column(s) to {path}")
+
+
+def tweet_keys(tweet_id, content, date_str):
+    """
+    De-duplication keys of a tweet: its id (when known) and a hash of its timestamp and content.
+    Checking both keeps tweets saved before ids were recorded from being written again.
+    """
+    content_key = hashlib.sha1(f"{date_str}\x1f{content}".encode("utf-8")).digest()[:12]
+    if tweet_id:
+        return (str(tweet_id), content_key)
+    return (content_key,)
+
+
+def checkpoint_path(filename):
+    return f"{filename}.checkpoint.json"
+
+
+def load_checkpoint(path):
+    """
+    Return the set of days (YYYY-MM-DD) recorded as completed in a checkpoint file.
+    """
+    try:
+        with open(path, "r") as f:
+            return set(json.load(f).get("completed_days", []))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return set()
+
+
+def write_checkpoint(path, completed_days):
+    """
+    Atomically replace a checkpoint file with the given completed days.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"completed_days": sorted(completed_days)}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
 class XScraper:
-    def __init__(self, accounts, ticker, date_limit, max_tweets=None, batch_size=1000, tweets_per_day=None, headless=False, account_switch_interval=5):
+    def __init__(self, accounts, ticker, date_limit, max_tweets=None, batch_size=1000, tweets_per_day=None, headless=False, account_switch_interval=5, end_date=None, filename=None, budget=None, seed_files=None, flush_every_day=False, extra_checkpoints=None, jitter=(0.2, 0.8), scroll_timeout=2.0, max_scroll_timeout=8.0, page_timeout=15.0, pool=None, max_session_uses=20):
         """
         :param accounts: A list of tuples containing (username, password) pairs for rotation.
         :param ticker: Stock ticker symbol.
@@ -18,23 +175,71 @@ class XScraper:
         :param tweets_per_day: Maximum tweets to scrape per day.
         :param headless: Run in headless mode if True.
         :param account_switch_interval: After how many days (or queries) to switch accounts.
+        :param end_date: Last date (YYYY-MM-DD) to scrape, defaults to today.
+        :param filename: Output CSV file, defaults to {ticker}_tweets.csv.
+        :param budget: TweetBudget shared with other workers (overrides max_tweets).
+        :param seed_files: Other CSV files whose tweets must not be collected again.
+        :param flush_every_day: Save tweets and the checkpoint after every day instead of every batch.
+        :param extra_checkpoints: Other checkpoint files whose completed days are skipped too.
+        :param jitter: (min, max) seconds of random pause added after each wait succeeds, (0, 0) disables it.
+        :param scroll_timeout: Seconds to wait for new tweets after a scroll, doubled after every scroll without new content.
+        :param max_scroll_timeout: Upper bound of the scroll wait after backing off.
+        :param page_timeout: Seconds to wait for the login fields and the search results to appear.
+        :param pool: BrowserPool to take Chrome sessions from, a private single-session pool is used by default.
+        :param max_session_uses: Logins after which the private pool relaunches Chrome.
         """
         self.accounts = accounts  # List of (username, password) pairs
         self.account_index = 0  
         self.ticker = ticker
         self.date_limit = datetime.strptime(date_limit, "%Y-%m-%d").date()
+        self.end_date = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else datetime.now().date()
         self.max_tweets = max_tweets
+        if budget is None and max_tweets:
+            budget = TweetBudget(max_tweets)
+        self.budget = budget
         self.batch_size = batch_size
         self.tweets_per_day = tweets_per_day  # per-day limit
         self.headless = headless
         self.account_switch_interval = account_switch_interval  # Interval at which to switch accounts
         self.driver = None
-        self.tweets_data = []
         self.total_tweets_processed = 0
-        self.filename = f"{ticker}_tweets.csv"
+        self.filename = filename or f"{ticker}_tweets.csv"
+        migrate_output_header(self.filename)
+        # Tweets are buffered column by column and appended by save_batch()
+        self.sink = RecordSink(self.filename, OUTPUT_COLUMNS, chunk_rows=None)
+        self.seen_keys = set()  # tweet ids and content hashes already collected
+        self._load_seen_keys([self.filename] + list(seed_files or []))
+        self.flush_every_day = flush_every_day
+        # Days are only marked completed once their tweets are on disk
+        self.checkpoint_file = checkpoint_path(self.filename)
+        self.completed_days = load_checkpoint(self.checkpoint_file)
+        for path in extra_checkpoints or []:
+            self.completed_days |= load_checkpoint(path)
+        self.pending_days = []
+        self.jitter = jitter
+        self.scroll_timeout = scroll_timeout
+        self.max_scroll_timeout = max_scroll_timeout
+        self.page_timeout = page_timeout
+        # Account rotation reuses the running Chrome instead of relaunching it
+        self._owns_pool = pool is None
+        self.pool = pool or BrowserPool(self._setup_driver, max_size=1, max_uses=max_session_uses)
         self.current_account = self.accounts[self.account_index]  
         self._login_driver()  
 
+    def _load_seen_keys(self, paths):
+        """
+        Seed the de-duplication set from previously written output files.
+        """
+        for path in paths:
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                continue
+            for chunk in pd.read_csv(path, dtype=str, chunksize=100_000, keep_default_na=False):
+                ids = chunk["id"] if "id" in chunk.columns else [None] * len(chunk)
+                for tweet_id, content, date_str in zip(ids, chunk["content"], chunk["date"]):
+                    self.seen_keys.update(tweet_keys(tweet_id, content, date_str))
+        if self.seen_keys:
+            print(f"Loaded {len(self.seen_keys)} de-duplication keys from existing output")
+
     def _setup_driver(self):
         options = uc.ChromeOptions()
         if self.headless:
@@ -52,42 +257,78 @@ class XScraper:
 
     def _login_driver(self):
         """
-        Logs into Twitter with the current account.
+        Logs into Twitter with the current account, on a session checked out from the pool.
         """
-        self.driver = self._setup_driver()
+        self.driver = self.pool.checkout()
+        self._clear_session()
         username, password = self.current_account
         self.driver.get("https://twitter.com/i/flow/login")
-        sleep(random.uniform(4, 6))  # randomized delay
-        username_field = self.driver.find_element(By.NAME, "text")
+        username_field = WebDriverWait(self.driver, self.page_timeout).until(
+            EC.element_to_be_clickable((By.NAME, "text"))
+        )
+        self._pause()
         username_field.send_keys(username)
         username_field.send_keys(Keys.RETURN)
-        sleep(random.uniform(2, 3))
 
-        password_field = self.driver.find_element(By.NAME, "password")
+        password_field = WebDriverWait(self.driver, self.page_timeout).until(
+            EC.element_to_be_clickable((By.NAME, "password"))
+        )
+        self._pause()
         password_field.send_keys(password)
         password_field.send_keys(Keys.RETURN)
-        sleep(random.uniform(3, 5))
+        # Logged in once the flow leaves the login pages
+        if not self._wait_until(lambda driver: "/login" not in driver.current_url, self.page_timeout):
+            print(f"Login of {username} did not complete within {self.page_timeout}s, continuing anyway")
+
+    def _clear_session(self):
+        """
+        Log out of a reused session by clearing its cookies and Twitter's site storage.
+        """
+        self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        for origin in ("https://twitter.com", "https://x.com"):
+            self.driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+
+    def _wait_until(self, condition, timeout):
+        """
+        Poll a condition on the driver until it holds or the timeout expires.
+        Returns False on timeout instead of raising.
+        """
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.2,
+                          ignored_exceptions=(JavascriptException,)).until(condition)
+            return True
+        except TimeoutException:
+            return False
+
+    def _pause(self):
+        """
+        Randomized human-like pause, configured by the jitter range.
+        """
+        low, high = self.jitter
+        if high > 0:
+            sleep(random.uniform(low, high))
 
     def switch_account(self):
         """
-        Switch to the next account in the rotation.
+        Switch to the next account in the rotation. The Chrome session goes back
+        to the pool and is logged in again with the next account (the pool only
+        relaunches Chrome once the session reached its use limit or is unhealthy).
         """
-        self.driver.quit()  
+        self.pool.release(self.driver)
         self.account_index = (self.account_index + 1) % len(self.accounts)  
         self.current_account = self.accounts[self.account_index]  
         self._login_driver() 
 
     def save_batch(self):
-        if self.tweets_data:
-            df = pd.DataFrame(self.tweets_data)
-            # Save with header for the first batch
-            if self.total_tweets_processed == 0:
-                df.to_csv(self.filename, index=False)
-            else:
-                df.to_csv(self.filename, mode='a', header=False, index=False)
-            self.total_tweets_processed += len(self.tweets_data)
-            print(f"Saved batch of {len(self.tweets_data)} tweets. Total tweets: {self.total_tweets_processed}")
-            self.tweets_data = []
+        # Appended as one chunk (truncated back on failure), using the existing header
+        saved = self.sink.flush()
+        if saved:
+            self.total_tweets_processed += saved
+            print(f"Saved batch of {saved} tweets. Total tweets: {self.total_tweets_processed}")
+        if self.pending_days:
+            self.completed_days.update(self.pending_days)
+            self.pending_days = []
+            write_checkpoint(self.checkpoint_file, self.completed_days)
 
     def scrape_day(self, day):
         """
@@ -97,85 +338,112 @@ class XScraper:
         query = f"${self.ticker} since:{day.strftime('%Y-%m-%d')} until:{day_end.strftime('%Y-%m-%d')} lang:en"
         search_url = f"https://twitter.com/search?q={query}&src=typed_query&f=live"
         self.driver.get(search_url)
-        sleep(random.uniform(2, 4))  # randomized delay after loading the page
+        if not self._wait_until(lambda driver: driver.execute_script(RESULTS_READY_JS), self.page_timeout):
+            print(f"Search results for {day} did not load within {self.page_timeout}s")
+        self._pause()
         
         day_tweets = []
         no_new_tweets_count = 0
-        last_position = 0
 
         while True:
-            tweets = self.driver.find_elements(By.XPATH, '//article[@data-testid="tweet"]')
-            for tweet in tweets:
-                current_total = self.total_tweets_processed + len(self.tweets_data) + len(day_tweets)
-                if self.max_tweets and current_total >= self.max_tweets:
+            try:
+                rows = self.driver.execute_script(EXTRACT_TWEETS_JS)
+            except JavascriptException:
+                rows = []
+            for tweet_id, date_str, content in rows:
+                if self.budget and self.budget.exhausted():
                     return day_tweets
-                try:
-                    date_element = tweet.find_element(By.TAG_NAME, "time")
-                    date_str = date_element.get_attribute("datetime")
-                    tweet_date = datetime.fromisoformat(date_str.split('T')[0]).date()
-                    if tweet_date != day:
-                        continue
-                    content_elements = tweet.find_elements(By.XPATH, './/div[@data-testid="tweetText"]//span')
-                    content = ' '.join([elem.text for elem in content_elements])
-                    tweet_dict = {"content": content, "date": date_str}
-                    if tweet_dict not in day_tweets:
-                        day_tweets.append(tweet_dict)
-                        if self.tweets_per_day and len(day_tweets) >= self.tweets_per_day:
-                            break
-                except (NoSuchElementException, StaleElementReferenceException):
+                if not date_str:
+                    continue
+                tweet_date = datetime.fromisoformat(date_str.split('T')[0]).date()
+                if tweet_date != day:
+                    continue
+                keys = tweet_keys(tweet_id, content, date_str)
+                if any(key in self.seen_keys for key in keys):
                     continue
+                if self.budget and not self.budget.take():
+                    return day_tweets
+                self.seen_keys.update(keys)
+                day_tweets.append((content, date_str, tweet_id))
+                if self.tweets_per_day and len(day_tweets) >= self.tweets_per_day:
+                    break
 
             if self.tweets_per_day and len(day_tweets) >= self.tweets_per_day:
                 break
-            if self.max_tweets and (self.total_tweets_processed + len(self.tweets_data) + len(day_tweets)) >= self.max_tweets:
+            if self.budget and self.budget.exhausted():
                 break
 
-            # Scroll to load more tweets with a natural delay.
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            sleep(random.uniform(1.5, 3))
-            current_position = self.driver.execute_script("return window.pageYOffset;")
-            if current_position == last_position:
+            # Scroll and wait for new tweets, backing off while nothing new appears.
+            previous_height = self.driver.execute_script(SCROLL_TO_BOTTOM_JS)
+            timeout = min(self.scroll_timeout * 2 ** no_new_tweets_count, self.max_scroll_timeout)
+            if self._wait_until(lambda driver: driver.execute_script(NEW_CONTENT_JS, previous_height), timeout):
+                no_new_tweets_count = 0
+                self._pause()
+            else:
                 no_new_tweets_count += 1
                 if no_new_tweets_count >= 3:
                     break
-            else:
-                no_new_tweets_count = 0
-            last_position = current_position
 
         return day_tweets
 
     def scrape_tweets(self):
         """
-        Iterates day by day (starting from date_limit up to today) and scrapes tweets.
+        Iterates day by day (starting from date_limit up to end_date) and scrapes tweets.
+        Days recorded in the checkpoint are skipped, so an interrupted run resumes
+        from the first incomplete day.
         """
         current_day = self.date_limit
-        today = datetime.now().date()
         days_scraped = 0
+        skipped_days = 0
+        scrape_seconds = 0.0
+        days_timed = 0
         
-        while current_day <= today:
-            if self.max_tweets and (self.total_tweets_processed + len(self.tweets_data)) >= self.max_tweets:
-                break
+        try:
+            while current_day <= self.end_date:
+                if self.budget and self.budget.exhausted():
+                    break
 
-            print(f"Scraping tweets for {current_day}...")
-            day_tweets = self.scrape_day(current_day)
-            if day_tweets:
-                print(f"Found {len(day_tweets)} tweets for {current_day}")
-                self.tweets_data.extend(day_tweets)
-            else:
-                print(f"No tweets found for {current_day}")
-                
-            if len(self.tweets_data) >= self.batch_size:
-                self.save_batch()
-
-            days_scraped += 1
-            if days_scraped >= self.account_switch_interval:  
-                self.switch_account()
-                days_scraped = 0  
-                
-            current_day += timedelta(days=1)
-        
-        if self.tweets_data:
+                day_key = current_day.strftime('%Y-%m-%d')
+                if day_key in self.completed_days:
+                    skipped_days += 1
+                    current_day += timedelta(days=1)
+                    continue
+                if skipped_days:
+                    print(f"Resuming from {day_key} ({skipped_days} completed days skipped)")
+                    skipped_days = 0
+
+                print(f"Scraping tweets for {current_day}...")
+                day_start = perf_counter()
+                day_tweets = self.scrape_day(current_day)
+                scrape_seconds += perf_counter() - day_start
+                days_timed += 1
+                if day_tweets:
+                    print(f"Found {len(day_tweets)} tweets for {current_day}")
+                    for tweet in day_tweets:
+                        self.sink.write(tweet)
+                else:
+                    print(f"No tweets found for {current_day}")
+
+                # A day cut short by the global budget is not complete
+                if not (self.budget and self.budget.exhausted()):
+                    self.pending_days.append(day_key)
+                    
+                if self.flush_every_day or len(self.sink) >= self.batch_size:
+                    self.save_batch()
+
+                days_scraped += 1
+                if days_scraped >= self.account_switch_interval:  
+                    self.switch_account()
+                    days_scraped = 0  
+                    
+                current_day += timedelta(days=1)
+        finally:
+            # Buffered tweets only belong to fully scraped days, keep them even if the run crashed
             self.save_batch()
+            if days_timed:
+                print(f"Scraped {days_timed} days in {scrape_seconds:.1f}s ({scrape_seconds / days_timed:.1f}s per day)")
 
     def close(self):
-        self.driver.quit()
+        self.pool.release(self.driver)
+        if self._owns_pool:
+            self.pool.close()
@@ -1,21 +1,33 @@
+import argparse
+import json
 import os
+import sys
+import tempfile
 from dotenv import load_dotenv
 import praw
+import prawcore
 import pandas as pd
+import threading
 import time
 import re
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import logging
-from typing import List, Dict, Set
-from dataclasses import dataclass
-from ratelimit import limits, sleep_and_retry
+from operator import attrgetter
+from typing import Callable, List, Dict, Optional, Set, Tuple
+from dataclasses import dataclass, fields
+
+# Make the shared bertopic_project modules importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from utils.rate_limit import TokenBucket
+from utils.record_sink import RecordSink
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class StockMention:
     date: datetime.date
     time: datetime.time
@@ -24,16 +36,185 @@ class StockMention:
     text: str
     ticker: str
     company_name: str
+    submission_id: str = ""
+
+
+MENTION_COLUMNS = [field.name for field in fields(StockMention)]
+# Values of a mention in column order, without building a dict
+mention_values = attrgetter(*MENTION_COLUMNS)
+
+
+def high_water_marks_path(output_path: str) -> str:
+    """State file storing the newest submission seen per subreddit, next to the CSV."""
+    return os.path.splitext(output_path)[0] + "_high_water_marks.json"
+
+
+def load_high_water_marks(path: str) -> Dict[str, float]:
+    """Return the newest created_utc seen per subreddit ({} on the first run)."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_high_water_marks(path: str, marks: Dict[str, float]) -> None:
+    """Atomically replace the high-water mark file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(marks, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+LEGACY_KEY_COLUMNS = ["date", "time", "subreddit", "title", "ticker"]
+
+
+def mention_keys(mention: StockMention) -> Tuple[Tuple, Tuple]:
+    """Return the (submission_id, ticker) key of a mention and its key among rows without a submission id."""
+    legacy_key = (str(mention.date), str(mention.time), mention.subreddit, mention.title, mention.ticker)
+    return (mention.submission_id, mention.ticker), legacy_key
+
+
+def load_mention_keys(output_path: str) -> Set[Tuple]:
+    """
+    Return the keys of the mentions already stored in the CSV.
+
+    Rows have a (submission_id, ticker) key. Rows written before submission
+    ids were recorded have none, so they are keyed on their date, time,
+    subreddit, title and ticker instead (see mention_keys). Files of that
+    format are migrated once by atomically adding an empty submission_id
+    column.
+    """
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return set()
+
+    header = pd.read_csv(output_path, nrows=0).columns
+    if "submission_id" not in header:
+        existing = pd.read_csv(output_path, dtype=str, keep_default_na=False)
+        existing["submission_id"] = ""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)), suffix=".tmp")
+        os.close(fd)
+        try:
+            existing.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    stored = pd.read_csv(
+        output_path, usecols=["submission_id"] + LEGACY_KEY_COLUMNS, dtype=str, keep_default_na=False
+    )
+    legacy = stored["submission_id"] == ""
+    keys = set(zip(stored.loc[~legacy, "submission_id"], stored.loc[~legacy, "ticker"]))
+    keys.update(stored.loc[legacy, LEGACY_KEY_COLUMNS].itertuples(index=False, name=None))
+    return keys
+
+
+class TickerMatcher:
+    """
+    Finds every tracked ticker mentioned in a text with one compiled regex.
+
+    - $-prefixed tickers match in any case ($tsla, $F)
+    - Tickers of 4+ characters match in any case (tsla, Tsla)
+    - Shorter tickers only match in uppercase, so words like "a" or "it" are not mentions
+    - Company names match in any case, with any whitespace between words
+    All alternatives must start and end on word boundaries.
+    """
+
+    # Reddit rejects search queries longer than 512 characters
+    MAX_QUERY_LENGTH = 512
+
+    def __init__(self, stocks: Dict[str, str]):
+        self.stocks = stocks
+        self._lookup: Dict[str, str] = {}
+        for ticker, company in stocks.items():
+            self._lookup[company.lower()] = ticker
+            self._lookup[ticker.lower()] = ticker
+
+        def alternation(aliases):
+            # Longest first, so "Tesla Motors" wins over "Tesla"
+            escaped = [
+                r"\s+".join(re.escape(word) for word in alias.split())
+                for alias in sorted(set(aliases), key=len, reverse=True)
+            ]
+            return "|".join(escaped) or "(?!)"
+
+        tickers = list(stocks.keys())
+        short_tickers = [ticker for ticker in tickers if len(ticker) < 4]
+        long_aliases = [ticker for ticker in tickers if len(ticker) >= 4] + list(stocks.values())
+        self.pattern = re.compile(
+            r"(?<![\w$])(?:"
+            rf"\$(?i:{alternation(tickers)})"
+            rf"|(?:{alternation(short_tickers)})"
+            rf"|(?i:{alternation(long_aliases)})"
+            r")(?!\w)"
+        )
+
+    def find(self, text: str) -> Set[str]:
+        """Return the tickers mentioned in a text."""
+        if not text:
+            return set()
+        return {
+            self._lookup[" ".join(match.lstrip("$").split()).lower()]
+            for match in self.pattern.findall(text)
+        }
+
+    def query_batches(self, max_length: int = MAX_QUERY_LENGTH) -> List[str]:
+        """Split the Lucene search query for all stocks into queries within the length limit."""
+        batches, current = [], ""
+        for ticker, company in self.stocks.items():
+            term = f'({ticker} OR "{company}")'
+            candidate = f"{current} OR {term}" if current else term
+            if current and len(candidate) > max_length:
+                batches.append(current)
+                candidate = term
+            current = candidate
+        if current:
+            batches.append(current)
+        return batches
+
+
+class RateLimitedRequestor(prawcore.Requestor):
+    """prawcore requestor taking a token from a shared bucket before every HTTP request."""
+
+    def __init__(self, *args, limiter: TokenBucket, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    def request(self, *args, **kwargs):
+        self.limiter.acquire()
+        return super().request(*args, **kwargs)
 
 
 class RedditStockScraper:
-    def __init__(self, client_id: str, client_secret: str, user_agent: str):
-        """Initialize the Reddit scraper with API credentials."""
-        self.reddit = praw.Reddit(
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        user_agent: str,
+        max_workers: int = 4,
+        requests_per_minute: int = 60,
+        stocks: Optional[Dict[str, str]] = None,
+    ):
+        """
+        Initialize the Reddit scraper with API credentials.
+
+        Args:
+            stocks: Tickers to track mapped to their company names (defaults to Tesla)
+            max_workers: Number of subreddits fetched concurrently
+            requests_per_minute: Budget of HTTP requests shared by all workers
+        """
+        self._credentials = dict(
             client_id=client_id, client_secret=client_secret, user_agent=user_agent
         )
+        self.max_workers = max_workers
+        # One bucket for the whole scraper, so concurrent workers share Reddit's budget
+        self.limiter = TokenBucket.per_minute(requests_per_minute)
+        self._local = threading.local()
 
-        self.stocks = {"TSLA": "Tesla"}
+        self.stocks = stocks or {"TSLA": "Tesla"}
+        self.matcher = TickerMatcher(self.stocks)
 
         self.subreddits = [
             "wallstreetbets",
@@ -46,6 +227,17 @@ class RedditStockScraper:
             "finance",
         ]
 
+    @property
+    def reddit(self) -> praw.Reddit:
+        """Reddit client of the current thread (PRAW instances are not thread-safe)."""
+        if not hasattr(self._local, "reddit"):
+            self._local.reddit = praw.Reddit(
+                **self._credentials,
+                requestor_class=RateLimitedRequestor,
+                requestor_kwargs={"limiter": self.limiter},
+            )
+        return self._local.reddit
+
     def _validate_dates(self, start_date: str, end_date: str) -> tuple:
         """Validate and convert date strings to timestamps."""
         try:
@@ -59,109 +251,206 @@ class RedditStockScraper:
             raise
 
     def _extract_stock_mentions(self, text: str) -> Set[str]:
-        """Extract stock mentions from text using multiple patterns."""
-        if not text:
-            return set()
-
-        mentions = set()
-
-        # Find $TICKER mentions
-        dollar_mentions = set(re.findall(r"\$([A-Z]{1,5})", text))
+        """Extract stock mentions from text in a single pass of the compiled matcher."""
+        return self.matcher.find(text)
 
-        # Find company name mentions
-        company_mentions = {
-            ticker
-            for ticker, company in self.stocks.items()
-            if company.lower() in text.lower()
-        }
+    def _fetch_subreddit_posts(
+        self,
+        subreddit_name: str,
+        start_timestamp: int,
+        end_timestamp: int,
+        high_water_mark: Optional[float] = None,
+        emit: Optional[Callable[[StockMention], None]] = None,
+    ) -> Tuple[int, Optional[float]]:
+        """
+        Fetch posts from a subreddit within the specified timeframe.
 
-        # Find raw ticker mentions
-        ticker_mentions = {
-            ticker for ticker in self.stocks.keys() if ticker in text.upper()
-        }
+        Results come newest first, so the walk stops at the first submission
+        older than the start date or the high-water mark (submissions created
+        in the same second as the mark are fetched again and deduplicated).
+        Large ticker lists are searched in several query batches; a submission
+        matched by more than one batch is only processed once.
 
-        mentions.update(dollar_mentions, company_mentions, ticker_mentions)
-        return {m for m in mentions if m in self.stocks}
+        Args:
+            emit: Called with every mention as soon as it is found
 
-    @sleep_and_retry
-    @limits(calls=60, period=60)  # Reddit API rate limit
-    def _fetch_subreddit_posts(
-        self, subreddit_name: str, start_timestamp: int, end_timestamp: int
-    ) -> List[StockMention]:
-        """Fetch posts from a subreddit within the specified timeframe."""
-        mentions = []
+        Returns:
+            Number of mentions found and the newest created_utc seen (None if no submission)
+        """
+        found = 0
+        newest = None
+        seen_ids = set()
         subreddit = self.reddit.subreddit(subreddit_name)
 
-        search_query = " OR ".join(
-            f'({ticker} OR "{company}")' for ticker, company in self.stocks.items()
-        )
-
         try:
-            for submission in subreddit.search(
-                search_query, syntax="lucene", time_filter="all", sort="new", limit=None
-            ):
-
-                if submission.created_utc < start_timestamp:
-                    break
-
-                if submission.created_utc <= end_timestamp:
-                    text = f"{submission.title} {submission.selftext}"
-                    stock_mentions = self._extract_stock_mentions(text)
-
-                    timestamp = datetime.fromtimestamp(submission.created_utc)
-
-                    for ticker in stock_mentions:
-                        mentions.append(
-                            StockMention(
-                                date=timestamp.date(),
-                                time=timestamp.time(),
-                                subreddit=subreddit_name,
-                                title=submission.title,
-                                text=submission.selftext,
-                                ticker=ticker,
-                                company_name=self.stocks[ticker],
+            for search_query in self.matcher.query_batches():
+                for submission in subreddit.search(
+                    search_query, syntax="lucene", time_filter="all", sort="new", limit=None
+                ):
+
+                    if submission.created_utc < start_timestamp:
+                        break
+                    if high_water_mark is not None and submission.created_utc < high_water_mark:
+                        break
+                    if submission.id in seen_ids:
+                        continue
+                    seen_ids.add(submission.id)
+
+                    if submission.created_utc <= end_timestamp:
+                        if newest is None or submission.created_utc > newest:
+                            newest = submission.created_utc
+                        text = f"{submission.title} {submission.selftext}"
+                        stock_mentions = self._extract_stock_mentions(text)
+
+                        timestamp = datetime.fromtimestamp(submission.created_utc)
+
+                        for ticker in stock_mentions:
+                            found += 1
+                            emit(
+                                StockMention(
+                                    date=timestamp.date(),
+                                    time=timestamp.time(),
+                                    subreddit=subreddit_name,
+                                    title=submission.title,
+                                    text=submission.selftext,
+                                    ticker=ticker,
+                                    company_name=self.stocks[ticker],
+                                    submission_id=submission.id,
+                                )
                             )
-                        )
 
         except Exception as e:
             logger.error(f"Error scraping r/{subreddit_name}: {e}")
             raise
 
-        return mentions
+        return found, newest
+
+    def _scrape_subreddits(
+        self,
+        start_date: str,
+        end_date: str,
+        high_water_marks: Optional[Dict[str, float]],
+        emit_for: Callable[[str], Callable[[StockMention], None]],
+    ) -> None:
+        """Fetch every subreddit concurrently, passing mentions to emit_for(subreddit)."""
+        start_timestamp, end_timestamp = self._validate_dates(start_date, end_date)
+
+        # Subreddits are fetched concurrently to overlap network latency; the
+        # shared token bucket keeps the total request rate within budget
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            for subreddit_name in self.subreddits:
+                logger.info(f"Scraping r/{subreddit_name}...")
+                futures[subreddit_name] = executor.submit(
+                    self._fetch_subreddit_posts,
+                    subreddit_name, start_timestamp, end_timestamp,
+                    (high_water_marks or {}).get(subreddit_name),
+                    emit_for(subreddit_name),
+                )
+
+            for subreddit_name, future in futures.items():
+                try:
+                    found, newest = future.result()
+                    if high_water_marks is not None and newest is not None:
+                        high_water_marks[subreddit_name] = max(
+                            newest, high_water_marks.get(subreddit_name, newest)
+                        )
+                    logger.info(f"Found {found} mentions in r/{subreddit_name}")
+
+                except Exception as e:
+                    logger.error(f"Failed to scrape r/{subreddit_name}: {e}")
+                    continue
+
+        logger.info(
+            f"{self.limiter.acquired} API requests, "
+            f"{self.limiter.wait_seconds:.1f}s spent waiting for the rate limiter"
+        )
 
-    def get_posts_by_timeframe(self, start_date: str, end_date: str) -> pd.DataFrame:
+    def get_posts_by_timeframe(
+        self,
+        start_date: str,
+        end_date: str,
+        high_water_marks: Optional[Dict[str, float]] = None,
+    ) -> pd.DataFrame:
         """
         Get all stock mentions within the specified timeframe.
 
+        Keeps every mention in memory; use scrape_to_csv for large scrapes.
+
         Args:
             start_date: Start date in 'YYYY-MM-DD' format
             end_date: End date in 'YYYY-MM-DD' format
+            high_water_marks: Newest created_utc already stored per subreddit.
+                Fetching stops at these submissions, and the dict is updated
+                in place for every subreddit fetched successfully.
 
         Returns:
             DataFrame containing all stock mentions
         """
-        start_timestamp, end_timestamp = self._validate_dates(start_date, end_date)
-        all_mentions = []
+        per_subreddit = {subreddit_name: [] for subreddit_name in self.subreddits}
+        self._scrape_subreddits(
+            start_date, end_date, high_water_marks,
+            lambda subreddit_name: per_subreddit[subreddit_name].append,
+        )
 
-        for subreddit_name in self.subreddits:
-            try:
-                logger.info(f"Scraping r/{subreddit_name}...")
-                mentions = self._fetch_subreddit_posts(
-                    subreddit_name, start_timestamp, end_timestamp
-                )
-                all_mentions.extend(mentions)
-                logger.info(f"Found {len(mentions)} mentions in r/{subreddit_name}")
+        # Collect in subreddit order so the output does not depend on timing
+        return pd.DataFrame(
+            [mention_values(mention) for mentions in per_subreddit.values() for mention in mentions],
+            columns=MENTION_COLUMNS,
+        )
+
+    def scrape_to_csv(
+        self,
+        start_date: str,
+        end_date: str,
+        output_path: str,
+        high_water_marks: Optional[Dict[str, float]] = None,
+        chunk_rows: int = 5000,
+    ) -> int:
+        """
+        Stream stock mentions to a CSV file as they are found.
+
+        Mentions are appended in chunks of chunk_rows through a RecordSink, so
+        memory stays bounded whatever the number of posts. Mentions already
+        in the file are skipped (see load_mention_keys).
 
-            except Exception as e:
-                logger.error(f"Failed to scrape r/{subreddit_name}: {e}")
-                continue
+        Args:
+            start_date: Start date in 'YYYY-MM-DD' format
+            end_date: End date in 'YYYY-MM-DD' format
+            output_path: CSV file to append to
+            high_water_marks: See get_posts_by_timeframe
+            chunk_rows: Mentions buffered before each append
+
+        Returns:
+            Number of mentions appended
+        """
+        stored_keys = load_mention_keys(output_path)
+        keys_lock = threading.Lock()
+
+        with RecordSink(output_path, MENTION_COLUMNS, chunk_rows=chunk_rows) as sink:
+            def emit(mention: StockMention) -> None:
+                key, legacy_key = mention_keys(mention)
+                with keys_lock:
+                    if key in stored_keys or legacy_key in stored_keys:
+                        return
+                    stored_keys.add(key)
+                sink.write(mention_values(mention))
+
+            self._scrape_subreddits(start_date, end_date, high_water_marks, lambda subreddit_name: emit)
 
-        return pd.DataFrame([vars(mention) for mention in all_mentions])
+        return sink.rows_written
 
 
 if __name__ == "__main__":
     load_dotenv()
 
+    parser = argparse.ArgumentParser(description="Scrape stock mentions from Reddit")
+    parser.add_argument("--start-date", default="2024-01-01", help="Oldest date to scrape (YYYY-MM-DD)")
+    parser.add_argument("--end-date", default=None, help="Newest date to scrape (YYYY-MM-DD), defaults to tomorrow")
+    parser.add_argument("--full", action="store_true", help="Ignore the high-water marks and rewrite reddit_data.csv")
+    args = parser.parse_args()
+    end_date = args.end_date or (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+
     # Get the path to bertopic_project/data/raw
     current_dir = os.path.dirname(os.path.abspath(__file__))  # Get scraping_reddit dir
     project_dir = os.path.dirname(
@@ -175,9 +464,25 @@ if __name__ == "__main__":
         user_agent=os.getenv("REDDIT_USER_AGENT"),
     )
 
-    df = scraper.get_posts_by_timeframe("2024-01-01", "2025-01-31")
-    print(f"Total mentions found: {len(df)}")
-
     # Save to project's raw directory
     output_path = os.path.join(raw_dir, "reddit_data.csv")
-    df.to_csv(output_path, index=False)
+    marks_path = high_water_marks_path(output_path)
+
+    if args.full:
+        # Rebuild in a temporary file so the previous data survives a failed run
+        marks = {}
+        tmp_path = output_path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        written = scraper.scrape_to_csv(args.start_date, end_date, tmp_path, marks)
+        if os.path.exists(tmp_path):
+            os.replace(tmp_path, output_path)
+        print(f"Total mentions found: {written}")
+    else:
+        # Only walk the submissions newer than the last run in each subreddit
+        marks = load_high_water_marks(marks_path)
+        written = scraper.scrape_to_csv(args.start_date, end_date, output_path, marks)
+        print(f"New mentions appended: {written}")
+
+    # Marks are only saved once the mentions they cover are on disk
+    save_high_water_marks(marks_path, marks)
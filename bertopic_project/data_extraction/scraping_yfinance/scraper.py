@@ -4,26 +4,95 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.chrome.options import Options
+from datetime import datetime, timedelta, timezone
+import argparse
+from requests.adapters import HTTPAdapter
+from typing import Optional
+from urllib3.util.retry import Retry
 import pandas as pd
+import requests
+import tempfile
+import threading
 import time
 import os
+import sys
+
+# Overridable so the HTTP mode can run against a local stub server
+YAHOO_CHART_BASE_URL = os.getenv("YAHOO_CHART_BASE_URL", "https://query1.finance.yahoo.com")
+# Range of the original hard-coded history URL (period1=1704067200, period2=1738281600)
+DEFAULT_START_DATE = "2024-01-01"
+DEFAULT_END_DATE = "2025-01-31"
+PRICE_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+CONSENT_BUTTON = (By.XPATH, "//button[text()='Refuser tout']")
+HISTORY_TABLE = (By.CSS_SELECTOR, "table[class*='yf-']")
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session() -> requests.Session:
+    """Process-wide HTTP session, so repeated fetches reuse pooled keep-alive connections"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            # Yahoo rejects requests without a browser-like user agent
+            session.headers["User-Agent"] = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+            _http_session = session
+        return _http_session
+
+def format_history_dates(dates: pd.Series) -> pd.Series:
+    """Dates as the history table shows them: "Jan 2, 2024" (day not zero-padded)"""
+    return dates.map(lambda d: f"{d:%b} {d.day}, {d:%Y}")
+
+def to_timestamp(date: str) -> int:
+    """Unix timestamp of midnight UTC for a YYYY-MM-DD date"""
+    return int(datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
 
 class TeslaStockScraper:
-    def __init__(self):
-        """Initialize the scraper with output directory configuration"""
+    def __init__(
+        self,
+        pool=None,
+        ticker: str = "TSLA",
+        company_name: str = "Tesla, Inc.",
+        base_url: str = YAHOO_CHART_BASE_URL,
+        timeout: float = 15.0,
+    ):
+        """
+        Initialize the scraper with output directory configuration
+
+        Parameters:
+        - pool: Optional BrowserPool providing warm Chrome sessions (a new Chrome is launched per call otherwise)
+        - ticker: Stock ticker symbol
+        - company_name: Company name written next to the ticker
+        - base_url: Root URL of the chart API (point it to a stub server for offline runs)
+        - timeout: HTTP timeout in seconds
+        """
+        self.pool = pool
+        self.ticker = ticker
+        self.company_name = company_name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
         # Get the absolute path of the current script
         current_dir = os.path.dirname(os.path.abspath(__file__))
         # Navigate up to data directory and then to raw
         data_dir = os.path.dirname(current_dir)  # up to data directory
         self.output_dir = os.path.join(data_dir, 'raw')
+        file_prefix = "tesla" if ticker == "TSLA" else ticker.lower()
+        self.output_file = os.path.join(self.output_dir, f"{file_prefix}_stock_history.csv")
         self.ensure_output_directory()
         
     def ensure_output_directory(self):
         """Create output directory if it doesn't exist"""
         os.makedirs(self.output_dir, exist_ok=True)
         
-    def setup_driver(self):
-        """Configure and return Chrome WebDriver"""
+    @staticmethod
+    def setup_driver():
+        """Configure and return Chrome WebDriver (also the factory of the API's browser pool)"""
         chrome_options = Options()
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
@@ -37,85 +106,248 @@ class TeslaStockScraper:
     def handle_cookie_consent(self, driver):
         """Handle the cookie consent popup if it appears"""
         try:
-            accept_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[text()='Refuser tout']"))
-            )
-            accept_button.click()
-            time.sleep(1)
+            # Sessions reused from a pool already answered the popup, so stop
+            # waiting as soon as the table shows up instead
+            element = WebDriverWait(driver, 5).until(EC.any_of(
+                EC.element_to_be_clickable(CONSENT_BUTTON),
+                EC.presence_of_element_located(HISTORY_TABLE),
+            ))
+            if element.tag_name == "button":
+                element.click()
+                time.sleep(1)
         except (TimeoutException, NoSuchElementException):
             pass
     
-    def scrape_stock_data(self):
-        """Scrape Tesla stock historical data"""
+    def fetch_price_history(self, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Fetch daily prices from Yahoo's chart API over plain HTTP
+
+        Parameters:
+        - start_date: First date to fetch (YYYY-MM-DD)
+        - end_date: Date at which to stop, excluded (YYYY-MM-DD)
+
+        Returns:
+        - DataFrame with the same columns and formatting as the history table (newest first)
+        """
+        response = get_http_session().get(
+            f"{self.base_url}/v8/finance/chart/{self.ticker}",
+            params={
+                "period1": to_timestamp(start_date),
+                "period2": to_timestamp(end_date),
+                "interval": "1d",
+                "events": "div,split",
+                "includeAdjustedClose": "true",
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        chart = response.json()["chart"]
+        if chart.get("error"):
+            raise ValueError(f"Chart API error for {self.ticker}: {chart['error']}")
+
+        result = chart["result"][0]
+        timestamps = result.get("timestamp") or []
+        quote = result["indicators"]["quote"][0]
+        adjclose = result["indicators"].get("adjclose", [{}])[0].get("adjclose", quote["close"])
+
+        data = pd.DataFrame({
+            "Date": pd.to_datetime(
+                pd.Series(timestamps, dtype="int64") + result["meta"].get("gmtoffset", 0), unit="s"
+            ),
+            "Open": quote["open"],
+            "High": quote["high"],
+            "Low": quote["low"],
+            "Close": quote["close"],
+            "Adj Close": adjclose,
+            "Volume": quote["volume"],
+        })
+        # Days without trades come back as nulls
+        data = data.dropna().sort_values("Date", ascending=False, ignore_index=True)
+
+        # Same text formatting as the Yahoo history table
+        data["Date"] = format_history_dates(data["Date"])
+        for col in ["Open", "High", "Low", "Close", "Adj Close"]:
+            data[col] = data[col].map("{:.2f}".format)
+        data["Volume"] = data["Volume"].astype("int64").map("{:,}".format)
+        return data[PRICE_COLUMNS]
+
+    def scrape_with_selenium(self, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """Read the price history table with Chrome (pooled session if a pool was given)"""
+        if self.pool is not None:
+            with self.pool.session() as driver:
+                return self._scrape_with_driver(driver, start_date, end_date)
+
         driver = self.setup_driver()
-        data = None
+        try:
+            return self._scrape_with_driver(driver, start_date, end_date)
+        finally:
+            driver.quit()
+
+    def _scrape_with_driver(self, driver, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """Scrape the history table with the given driver"""
+        # Yahoo Finance URL for the stock history
+        url = (
+            f"https://finance.yahoo.com/quote/{self.ticker}/history/"
+            f"?period1={to_timestamp(start_date)}&period2={to_timestamp(end_date)}"
+        )
+        driver.get(url)
+        
+        self.handle_cookie_consent(driver)
         
+        # Wait for the table to load
+        table = WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located(HISTORY_TABLE)
+        )
+        
+        # Extract every cell in a single round trip, skipping the header
+        # and the dividend/split rows that span fewer columns
+        rows = driver.execute_script(
+            "return Array.from(arguments[0].rows).slice(1)"
+            ".map(row => Array.from(row.cells, cell => cell.innerText));",
+            table,
+        )
+        stock_data = [row for row in rows if len(row) == len(PRICE_COLUMNS)]
+        
+        if not stock_data:
+            return None
+        return pd.DataFrame(stock_data, columns=PRICE_COLUMNS)
+
+    def scrape_stock_data(
+        self,
+        start_date: str = DEFAULT_START_DATE,
+        end_date: str = DEFAULT_END_DATE,
+        method: str = "auto",
+    ) -> Optional[pd.DataFrame]:
+        """
+        Fetch the stock price history and save it to CSV
+
+        Parameters:
+        - start_date: First date to fetch (YYYY-MM-DD)
+        - end_date: Date at which to stop, excluded (YYYY-MM-DD)
+        - method: "http" (chart API), "selenium" (history page) or "auto" (HTTP, Selenium as fallback)
+
+        Returns:
+        - DataFrame with the saved rows, or None if nothing was found
+        """
         try:
-            # Yahoo Finance URL for Tesla stock history
-            url = "https://finance.yahoo.com/quote/TSLA/history/?period1=1704067200&period2=1738281600"
-            driver.get(url)
-            
-            self.handle_cookie_consent(driver)
-            
-            # Wait for the table to load
-            table = WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "table[class*='yf-']"))
-            )
-            
-            # Extract data from table
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            stock_data = []
-            
-            for row in rows[1:]:  # Skip header row
-                cols = row.find_elements(By.TAG_NAME, "td")
-                if cols:
-                    row_data = [col.text for col in cols]
-                    stock_data.append(row_data)
-            
-            if stock_data:
-                # Convert to DataFrame
-                data = pd.DataFrame(
-                    stock_data,
-                    columns=[
-                        "Date",
-                        "Open",
-                        "High",
-                        "Low",
-                        "Close",
-                        "Adj Close",
-                        "Volume"
-                    ]
-                )
-                
-                # Add ticker and company name columns
-                data["Ticker"] = "TSLA"
-                data["Company_Name"] = "Tesla, Inc."
-                                
+            data = self._fetch(start_date, end_date, method)
+            if data is not None:
                 # Save to CSV
-                output_path = os.path.join(self.output_dir, "tesla_stock_history.csv")
-                data.to_csv(output_path, index=False)
-                print(f"Successfully saved Tesla stock data to {output_path}")
+                data.to_csv(self.output_file, index=False)
+                print(f"Successfully saved {self.ticker} stock data to {self.output_file}")
                 
         except Exception as e:
-            print(f"Error scraping Tesla stock data: {e}")
+            print(f"Error scraping {self.ticker} stock data: {e}")
             raise
-        
-        finally:
-            driver.quit()
             
         return data
 
+    def refresh_stock_data(self, end_date: Optional[str] = None, method: str = "auto") -> Optional[pd.DataFrame]:
+        """
+        Incremental refresh: fetch only the days from the last stored date on and
+        upsert them into the CSV (the last stored day is fetched again since its
+        prices may have been revised)
+
+        Parameters:
+        - end_date: Date at which to stop, excluded (YYYY-MM-DD), defaults to tomorrow (UTC)
+        - method: "http", "selenium" or "auto"
+
+        Returns:
+        - DataFrame with the fetched rows, or None if nothing was fetched
+        """
+        end_date = end_date or (datetime.now(timezone.utc) + timedelta(days=1)).strftime("%Y-%m-%d")
+        if not os.path.exists(self.output_file):
+            return self.scrape_stock_data(DEFAULT_START_DATE, end_date, method)
+
+        existing = pd.read_csv(self.output_file, dtype=str, keep_default_na=False)
+        stored_dates = pd.to_datetime(existing["Date"], format="%b %d, %Y")
+        # Files written by earlier versions zero-padded the day
+        existing["Date"] = format_history_dates(stored_dates)
+        start_date = stored_dates.max().strftime("%Y-%m-%d")
+        if start_date >= end_date:
+            print(f"{self.ticker} stock data is up to date ({start_date})")
+            return None
+
+        try:
+            new_data = self._fetch(start_date, end_date, method)
+        except Exception as e:
+            print(f"Error refreshing {self.ticker} stock data: {e}")
+            raise
+        if new_data is not None:
+            # Sources may return days outside the requested range
+            new_dates = pd.to_datetime(new_data["Date"], format="%b %d, %Y")
+            in_range = ((new_dates >= start_date) & (new_dates < end_date)).to_numpy()
+            new_data = new_data[in_range].reset_index(drop=True)
+        if new_data is None or new_data.empty:
+            print(f"No new {self.ticker} rows since {start_date}")
+            return None
+
+        # Upsert: fetched rows replace stored rows of the same day, newest first
+        new_dates = pd.to_datetime(new_data["Date"], format="%b %d, %Y")
+        kept = ~stored_dates.isin(new_dates)
+        combined = pd.concat([new_data, existing[kept.to_numpy()]], ignore_index=True)
+        order = pd.concat([new_dates, stored_dates[kept]], ignore_index=True).sort_values(ascending=False, kind="stable").index
+        combined = combined.loc[order, existing.columns]
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            combined.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, self.output_file)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        print(f"Upserted {len(new_data)} {self.ticker} rows from {start_date} into {self.output_file}")
+        return new_data
+
+    def _fetch(self, start_date: str, end_date: str, method: str) -> Optional[pd.DataFrame]:
+        """Fetch prices with the given method and add the ticker columns (None if nothing was found)"""
+        if method not in ("auto", "http", "selenium"):
+            raise ValueError(f"Unsupported method '{method}', expected 'auto', 'http' or 'selenium'")
+
+        data = None
+        if method in ("auto", "http"):
+            try:
+                data = self.fetch_price_history(start_date, end_date)
+            except (requests.RequestException, KeyError, IndexError, TypeError, ValueError) as e:
+                if method == "http":
+                    raise
+                print(f"HTTP fetch failed ({e}), falling back to Selenium")
+        if data is None:
+            data = self.scrape_with_selenium(start_date, end_date)
+
+        if data is None or data.empty:
+            return None
+        # Add ticker and company name columns
+        data["Ticker"] = self.ticker
+        data["Company_Name"] = self.company_name
+        return data
+
 def main():
     """Main function to run the scraper"""
-    scraper = TeslaStockScraper()
+    parser = argparse.ArgumentParser(description="Fetch the daily price history of a stock from Yahoo Finance")
+    parser.add_argument("--ticker", default="TSLA", help="Stock ticker symbol")
+    parser.add_argument("--start-date", default=DEFAULT_START_DATE, help="First date to fetch (YYYY-MM-DD)")
+    parser.add_argument("--end-date", default=None, help=f"Date at which to stop, excluded (YYYY-MM-DD), defaults to {DEFAULT_END_DATE} (tomorrow with --incremental)")
+    parser.add_argument("--method", choices=["auto", "http", "selenium"], default="auto", help="Fetch over HTTP, render the page with Selenium, or HTTP with Selenium as fallback")
+    parser.add_argument("--base-url", default=YAHOO_CHART_BASE_URL, help="Root URL of the chart API")
+    parser.add_argument("--incremental", action="store_true", help="Only fetch the days after the last stored date and upsert them (--start-date is ignored)")
+    args = parser.parse_args()
+
+    company_name = "Tesla, Inc." if args.ticker == "TSLA" else args.ticker
+    scraper = TeslaStockScraper(ticker=args.ticker, company_name=company_name, base_url=args.base_url)
     try:
-        data = scraper.scrape_stock_data()
+        if args.incremental:
+            data = scraper.refresh_stock_data(args.end_date, args.method)
+        else:
+            data = scraper.scrape_stock_data(args.start_date, args.end_date or DEFAULT_END_DATE, args.method)
         if data is not None:
-            print(f"Successfully retrieved {len(data)} records of Tesla stock data")
+            print(f"Successfully retrieved {len(data)} records of {args.ticker} stock data")
             return data
     except Exception as e:
-        print(f"Failed to scrape Tesla stock data: {e}")
-        return None
+        print(f"Failed to scrape {args.ticker} stock data: {e}")
+        # The pipeline runner only sees the exit code
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
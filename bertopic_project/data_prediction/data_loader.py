@@ -0,0 +1,107 @@
+import os
+import sys
+
+import pandas as pd
+
+# Make the shared bertopic_project modules importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_preprocessing.schemas import SENTIMENT_SCHEMA, SENTIMENT_WITH_TOPICS_SCHEMA, STOCK_SCHEMA
+from utils.file_cache import FileVersionCache
+from utils.near_dedup import MULTIPLICITY_COLUMN, weighted_daily_mean
+
+PROCESSED_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_preprocessing", "processed_data"
+)
+STOCK_FILE = os.path.join(PROCESSED_DIR, "processed_stock_data.csv")
+SENTIMENT_FILE = os.path.join(PROCESSED_DIR, "comments_with_sentiments_without_topics.csv")
+SENTIMENT_FILE_WITH_TOPICS = os.path.join(PROCESSED_DIR, "comments_with_sentiments_with_topics.csv")
+
+# Schema and per-post score averaged per day, for each sentiment file
+SENTIMENT_SOURCES = {
+    False: (SENTIMENT_SCHEMA, "vader_compound"),
+    True: (SENTIMENT_WITH_TOPICS_SCHEMA, "vader_sentiment"),
+}
+
+# Parsed inputs and merged frames, keyed by the version of the files they come from
+data_cache = FileVersionCache()
+
+
+def load_stock_data(stock_file: str = STOCK_FILE) -> pd.DataFrame:
+    """
+    Processed stock history sorted by date (parsed once per file version)
+
+    Parameters:
+    - stock_file: Path to processed_stock_data.csv
+
+    Returns:
+    - Shared DataFrame, do not modify it in place
+    """
+    return data_cache.get(
+        ("stock", stock_file), [stock_file],
+        lambda: STOCK_SCHEMA.read(stock_file).sort_values("Date", kind="stable").reset_index(drop=True),
+    )
+
+
+def load_daily_sentiment(sentiment_file: str, with_topics: bool = False) -> pd.DataFrame:
+    """
+    Mean VADER score per day, weighted by the multiplicity of collapsed duplicates
+
+    Parameters:
+    - sentiment_file: Path to one of the comments_with_sentiments_*.csv files
+    - with_topics: Whether the file is the with-topics variant
+
+    Returns:
+    - Shared DataFrame with Date and vader_sentiment, sorted by date
+    """
+    schema, column = SENTIMENT_SOURCES[with_topics]
+
+    def compute() -> pd.DataFrame:
+        posts = schema.read(sentiment_file, usecols=["date", column, MULTIPLICITY_COLUMN])
+        daily = weighted_daily_mean(posts, column)
+        daily.columns = ["Date", "vader_sentiment"]
+        return daily.sort_values("Date").reset_index(drop=True)
+
+    return data_cache.get(("daily_sentiment", sentiment_file, with_topics), [sentiment_file], compute)
+
+
+def merge_daily_sentiment(stock_data: pd.DataFrame, daily_sentiment: pd.DataFrame) -> pd.DataFrame:
+    """
+    Attach to every trading day the sentiment of the latest trading day that has one
+
+    Same result as a left merge on Date followed by a forward fill: sentiment of
+    non-trading days (weekends, holidays) is not carried forward, so it is
+    dropped before the as-of merge.
+
+    Parameters:
+    - stock_data: Stock history sorted by Date
+    - daily_sentiment: Date and vader_sentiment sorted by Date
+
+    Returns:
+    - Merged frame without incomplete rows
+    """
+    trading_days = daily_sentiment[daily_sentiment["Date"].isin(stock_data["Date"])]
+    merged = pd.merge_asof(stock_data, trading_days, on="Date", direction="backward")
+    return merged.dropna().reset_index(drop=True)
+
+
+def load_merged_data(stock_file: str = STOCK_FILE, sentiment_file: str = None, with_topics: bool = False) -> pd.DataFrame:
+    """
+    Stock history with the daily sentiment used as a model feature
+
+    Parameters:
+    - stock_file: Path to processed_stock_data.csv
+    - sentiment_file: Sentiment file (defaults to the one matching with_topics)
+    - with_topics: Use the sentiment computed on the comments with topics
+
+    Returns:
+    - A copy of the cached merged frame, free to modify
+    """
+    if sentiment_file is None:
+        sentiment_file = SENTIMENT_FILE_WITH_TOPICS if with_topics else SENTIMENT_FILE
+    merged = data_cache.get(
+        ("merged", stock_file, sentiment_file, with_topics), [stock_file, sentiment_file],
+        lambda: merge_daily_sentiment(
+            load_stock_data(stock_file), load_daily_sentiment(sentiment_file, with_topics)
+        ),
+    )
+    return merged.copy()
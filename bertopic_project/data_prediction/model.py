@@ -5,6 +5,12 @@ from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
 from tensorflow.keras.callbacks import EarlyStopping
 import os 
+import sys
+
+# Make the shared bertopic_project modules importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_prediction.data_loader import load_merged_data
+from utils.profiling import profiler
 
 class DataProcessor:
     def __init__(self, stock_file, sentiment_file):
@@ -17,18 +23,7 @@ class DataProcessor:
         self.feature_scaler = MinMaxScaler()
     
     def load_and_merge_data(self):
-        stock_data = pd.read_csv(self.stock_file)
-        sentiment_data = pd.read_csv(self.sentiment_file)
-
-        stock_data['Date'] = pd.to_datetime(stock_data['Date']).dt.date
-        sentiment_data['date'] = pd.to_datetime(sentiment_data['date']).dt.date
-        
-        daily_sentiment = sentiment_data.groupby('date').agg({'vader_compound': 'mean'}).reset_index()
-        daily_sentiment.columns = ['Date', 'vader_sentiment']
-        
-        merged_data = pd.merge(stock_data, daily_sentiment, on='Date', how='left')
-        merged_data['vader_sentiment'] = merged_data['vader_sentiment'].fillna(method='ffill')
-        return merged_data.dropna()
+        return load_merged_data(self.stock_file, self.sentiment_file, with_topics=False)
     
     def preprocess_data(self, merged_data):
         train_data = merged_data[merged_data['Date'].astype(str).str.startswith('2024')]
@@ -66,8 +61,9 @@ class LSTMModel:
     
     def train(self, X_train, y_train):
         early_stop = EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)
-        self.model.fit(X_train, y_train, epochs=200, batch_size=32, 
-                       validation_split=0.1, callbacks=[early_stop], verbose=1)
+        with profiler.stage("model.fit", rows_in=len(X_train)):
+            self.model.fit(X_train, y_train, epochs=200, batch_size=32, 
+                           validation_split=0.1, callbacks=[early_stop], verbose=1)
     
     def predict(self, X):
         return self.model.predict(X)
@@ -77,13 +73,19 @@ class StockPredictor:
         self.processor = DataProcessor(stock_file, sentiment_file)
     
     def run(self):
-        data = self.processor.load_and_merge_data()
-        train_data, _ = self.processor.preprocess_data(data)
-        
-        X_train, y_train = self.processor.create_sequences(train_data[self.processor.features].values)
-        
-        model = LSTMModel(input_shape=(X_train.shape[1], X_train.shape[2]))
-        model.train(X_train, y_train)
+        with profiler.stage("train_lstm", export_as="train") as train_stage:
+            with profiler.stage("load_and_merge_data") as stage:
+                data = self.processor.load_and_merge_data()
+                stage.rows_out = len(data)
+            train_data, _ = self.processor.preprocess_data(data)
+            
+            with profiler.stage("create_sequences", rows_in=len(train_data)) as stage:
+                X_train, y_train = self.processor.create_sequences(train_data[self.processor.features].values)
+                stage.rows_out = len(X_train)
+            
+            model = LSTMModel(input_shape=(X_train.shape[1], X_train.shape[2]))
+            model.train(X_train, y_train)
+            train_stage.rows_out = len(X_train)
         
         last_sequence = X_train[-1].reshape(1, X_train.shape[1], X_train.shape[2])
         future_predictions = []
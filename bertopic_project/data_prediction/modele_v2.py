@@ -11,53 +11,35 @@ from tensorflow.keras.layers import LSTM, Dense, Dropout
 from tensorflow.keras.callbacks import EarlyStopping
 
 import os 
+import sys
+
+# Make the shared bertopic_project modules importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_prediction.data_loader import load_merged_data
+from utils.profiling import profiler
 
 class StockPrediction:
-    def __init__(self, stock_file, sentiment_file, sentiment_file_with_topics, seq_length=20, horizon=19):
+    def __init__(self, stock_file, sentiment_file, sentiment_file_with_topics, seq_length=20, horizon=19, seed=42):
         self.stock_file = stock_file
         self.sentiment_file = sentiment_file
         self.sentiment_file_with_topics = sentiment_file_with_topics
         self.seq_length = seq_length
         self.horizon = horizon
+        self.history = None
         
         # Fixer les seeds
-        tf.random.set_seed(42)
-        np.random.seed(42)
+        tf.random.set_seed(seed)
+        np.random.seed(seed)
         
         # Initialisation des scalers
         self.adj_close_scaler = MinMaxScaler()
         self.feature_scaler = MinMaxScaler()
     
     def load_and_merge_data(self):
-        stock_data = pd.read_csv(self.stock_file)
-        sentiment_data = pd.read_csv(self.sentiment_file)
-
-        stock_data['Date'] = pd.to_datetime(stock_data['Date']).dt.date
-        sentiment_data['date'] = pd.to_datetime(sentiment_data['date']).dt.date
-        
-        daily_sentiment = sentiment_data.groupby('date').agg({'vader_compound': 'mean'}).reset_index()
-        daily_sentiment.columns = ['Date', 'vader_sentiment']
-        daily_sentiment = daily_sentiment.rename(columns={'date': 'Date'})
-        
-        merged_data = pd.merge(stock_data, daily_sentiment, on='Date', how='left')
-        merged_data['vader_sentiment'] = merged_data['vader_sentiment'].fillna(method='ffill')
-        
-        return merged_data.dropna()
+        return load_merged_data(self.stock_file, self.sentiment_file, with_topics=False)
 
     def load_and_merge_data_with_topics(self):
-        stock_data = pd.read_csv(self.stock_file)
-        sentiment_data = pd.read_csv(self.sentiment_file_with_topics)
-        
-        stock_data['Date'] = pd.to_datetime(stock_data['Date']).dt.date
-        sentiment_data['date'] = pd.to_datetime(sentiment_data['date']).dt.date
-        
-        daily_sentiment = sentiment_data.groupby('date').agg({'vader_sentiment': 'mean'}).reset_index()
-        daily_sentiment.rename(columns={'date': 'Date'}, inplace=True)
-        
-        merged_data = pd.merge(stock_data, daily_sentiment, on='Date', how='left')
-        merged_data['vader_sentiment'] = merged_data['vader_sentiment'].fillna(method='ffill')
-        
-        return merged_data.dropna()
+        return load_merged_data(self.stock_file, self.sentiment_file_with_topics, with_topics=True)
     
     def preprocess_data(self, merged_data, features):
         train_data = merged_data[merged_data['Date'].astype(str).str.startswith('2024')].copy()
@@ -91,39 +73,52 @@ class StockPrediction:
     
     def train_lstm_model(self, model, X_train, y_train):
         early_stop = EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)
-        history = model.fit(
-            X_train, y_train,
-            epochs=50,
-            batch_size=32,
-            validation_split=0.1,
-            callbacks=[early_stop],
-            verbose=1
-        )
+        with profiler.stage("model.fit", rows_in=len(X_train)):
+            history = model.fit(
+                X_train, y_train,
+                epochs=50,
+                batch_size=32,
+                validation_split=0.1,
+                callbacks=[early_stop],
+                verbose=1
+            )
+        self.history = history.history
         
         return model
     
-    def run_prediction(self, with_topics):
+    def run_prediction(self, with_topics, output_file=None, metrics_suffix=None):
+        # Variants trained at the same time also report their stage metrics under their own names
+        train_names = ["train"] + ([f"train_{metrics_suffix}"] if metrics_suffix else [])
+        predict_names = ["predict"] + ([f"predict_{metrics_suffix}"] if metrics_suffix else [])
 
-        if with_topics :
-            data = self.load_and_merge_data_with_topics()
-            features = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 
-                    'MA7', 'MA20', 'MACD', '20SD', 'Upper_Band', 'Lower_Band', 
-                    'EMA', 'Log_Momentum', 'vader_sentiment']
-        else :
-            data = self.load_and_merge_data()
-            features = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'MA7', 'MA20', 'MACD',
-                        '20SD', 'Upper_Band', 'Lower_Band', 'EMA', 'Log_Momentum', 'vader_sentiment']
-        
-        train_data, test_data = self.preprocess_data(data, features)
-        X_train, y_train = self.create_sequences(train_data[features].values)
-        X_test = np.array(train_data[features].values[-self.horizon:]).astype(np.float32)
-        
-        model = self.build_lstm_model((X_train.shape[1], X_train.shape[2]))
-        model = self.train_lstm_model(model, X_train, y_train)
-        
-        last_sequence = X_test.reshape(1, self.horizon, X_train.shape[2])
-        next_pred_scaled = model.predict(last_sequence)[0].reshape(-1, 1)
-        next_pred = self.adj_close_scaler.inverse_transform(next_pred_scaled).flatten()
+        with profiler.stage("train_lstm", export_as=train_names) as train_stage:
+            with profiler.stage("load_and_merge_data") as stage:
+                if with_topics :
+                    data = self.load_and_merge_data_with_topics()
+                    features = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 
+                            'MA7', 'MA20', 'MACD', '20SD', 'Upper_Band', 'Lower_Band', 
+                            'EMA', 'Log_Momentum', 'vader_sentiment']
+                else :
+                    data = self.load_and_merge_data()
+                    features = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume', 'MA7', 'MA20', 'MACD',
+                                '20SD', 'Upper_Band', 'Lower_Band', 'EMA', 'Log_Momentum', 'vader_sentiment']
+                stage.rows_out = len(data)
+            
+            train_data, test_data = self.preprocess_data(data, features)
+            with profiler.stage("create_sequences", rows_in=len(train_data)) as stage:
+                X_train, y_train = self.create_sequences(train_data[features].values)
+                stage.rows_out = len(X_train)
+            X_test = np.array(train_data[features].values[-self.horizon:]).astype(np.float32)
+            
+            model = self.build_lstm_model((X_train.shape[1], X_train.shape[2]))
+            model = self.train_lstm_model(model, X_train, y_train)
+            train_stage.rows_out = len(X_train)
+        
+        with profiler.stage("predict_lstm", export_as=predict_names) as predict_stage:
+            last_sequence = X_test.reshape(1, self.horizon, X_train.shape[2])
+            next_pred_scaled = model.predict(last_sequence)[0].reshape(-1, 1)
+            next_pred = self.adj_close_scaler.inverse_transform(next_pred_scaled).flatten()
+            predict_stage.rows_out = len(next_pred)
         
         last_date = pd.to_datetime(data['Date'].max())
         future_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=self.horizon).date
@@ -139,7 +134,10 @@ class StockPrediction:
         })
         
         script_dir = os.path.dirname(os.path.abspath(__file__))
-        if with_topics :
+        if output_file is not None :
+            future_df.to_csv(output_file, index=False)
+            print(f"\nLes prédictions futures ont été sauvegardées dans '{os.path.basename(output_file)}'")
+        elif with_topics :
             future_df.to_csv(os.path.join(script_dir, "future_predictions_v2_with_topics.csv"), index=False)        
             print("\nLes prédictions futures ont été sauvegardées dans 'future_predictions_v2_with_topics.csv'")
         else :
@@ -147,16 +145,3 @@ class StockPrediction:
             print("\nLes prédictions futures ont été sauvegardées dans 'future_predictions_v2.csv'")
         
         return future_df
-
-
-if __name__ == "__main__":
-
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    stock_file = os.path.join(script_dir, "../data_preprocessing/processed_data/processed_stock_data.csv")
-    sentiment_file = os.path.join(script_dir, "../data_preprocessing/processed_data/comments_with_sentiments_without_topics.csv")
-    sentiment_file_with_topics = os.path.join(script_dir, "../data_preprocessing/processed_data/comments_with_sentiments_with_topics.csv")
-
-    predictor = StockPrediction(stock_file, sentiment_file, sentiment_file_with_topics)
-    predictor.run_prediction(with_topics=False)
-    predictor.run_prediction(with_topics=True)
-
@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+# Launches the variants without importing TensorFlow (or modele_v2, which does):
+# only the worker processes load it, after their thread budget is set
+PREDICTION_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_FILE = os.path.join(PREDICTION_DIR, "training_report.json")
+
+# TensorFlow reads these when its runtime starts, so they are set before it is imported
+THREAD_ENV = {
+    "intra": ["TF_NUM_INTRAOP_THREADS", "OMP_NUM_THREADS"],
+    "inter": ["TF_NUM_INTEROP_THREADS"],
+}
+
+
+@dataclass
+class Variant:
+    name: str
+    with_topics: bool
+    output_file: str
+    seed: int = 42
+
+
+# Distinct seeds, so the two models do not start from the same initial weights
+VARIANTS = [
+    Variant(name="without_topics", with_topics=False, output_file="future_predictions_v2.csv", seed=42),
+    Variant(name="with_topics", with_topics=True, output_file="future_predictions_v2_with_topics.csv", seed=43),
+]
+
+
+def thread_budget(parallel: int, cpus: Optional[int] = None) -> Dict[str, int]:
+    """
+    Split the cores between variants trained at the same time.
+
+    A 100-unit LSTM trained on batches of 32 runs one op after the other, so
+    each variant gets a single inter-op thread and an equal share of the cores
+    for intra-op work.
+
+    Parameters:
+    - parallel: Number of variants trained at the same time
+    - cpus: Number of cores to share (defaults to the CPU count)
+
+    Returns:
+    - Dictionary with the intra-op and inter-op thread counts of one variant
+    """
+    cpus = cpus or os.cpu_count() or 1
+    return {"intra": max(1, cpus // max(1, parallel)), "inter": 1}
+
+
+def train_variant(variant: Variant, intra_threads: int, inter_threads: int) -> Dict:
+    """
+    Train one variant in the current process and return its metrics.
+
+    Must run in a fresh process: the thread budget only applies if
+    TensorFlow has not been imported yet.
+
+    Parameters:
+    - variant: Variant to train
+    - intra_threads: Threads used inside an op (matrix products)
+    - inter_threads: Ops run at the same time
+
+    Returns:
+    - Dictionary with the error on the test days and the training history
+    """
+    for name in THREAD_ENV["intra"]:
+        os.environ[name] = str(intra_threads)
+    for name in THREAD_ENV["inter"]:
+        os.environ[name] = str(inter_threads)
+
+    import numpy as np
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_threads)
+
+    # Make the shared bertopic_project modules importable when run as a script
+    sys.path.insert(0, os.path.dirname(PREDICTION_DIR))
+    from data_prediction.data_loader import STOCK_FILE, SENTIMENT_FILE, SENTIMENT_FILE_WITH_TOPICS
+    from data_prediction.modele_v2 import StockPrediction
+
+    predictor = StockPrediction(STOCK_FILE, SENTIMENT_FILE, SENTIMENT_FILE_WITH_TOPICS, seed=variant.seed)
+    future_df = predictor.run_prediction(
+        variant.with_topics,
+        output_file=os.path.join(PREDICTION_DIR, variant.output_file),
+        metrics_suffix=variant.name,
+    )
+
+    error = future_df["Predicted_Adj_Close"] - future_df["Real_Adj_Close"]
+    history = predictor.history
+    return {
+        "mae": float(np.abs(error).mean()),
+        "rmse": float(np.sqrt((error ** 2).mean())),
+        "epochs": len(history["loss"]),
+        "final_loss": float(history["loss"][-1]),
+        "best_val_loss": float(min(history["val_loss"])),
+    }
+
+
+class TrainingRunner:
+    def __init__(
+        self,
+        variants: List[Variant],
+        max_parallel: Optional[int] = None,
+        intra_threads: Optional[int] = None,
+        inter_threads: Optional[int] = None,
+        report_file: str = REPORT_FILE,
+    ):
+        """
+        Train model variants concurrently, one process per variant.
+
+        Each process gets its own thread budget, seed, prediction file and log
+        file (train_<name>.log), so the variants do not compete for cores or
+        overwrite each other's outputs. A report with the timings and metrics
+        of every variant is written once all of them are done.
+
+        Parameters:
+        - variants: Variants to train
+        - max_parallel: Maximum number of variants training at the same time (defaults to all of them)
+        - intra_threads: Intra-op threads per variant (defaults to an equal share of the cores)
+        - inter_threads: Inter-op threads per variant (defaults to 1)
+        - report_file: JSON file receiving the consolidated report
+        """
+        self.variants = variants
+        self.max_parallel = max(1, min(max_parallel or len(variants), len(variants)))
+        budget = thread_budget(self.max_parallel)
+        self.intra_threads = intra_threads or budget["intra"]
+        self.inter_threads = inter_threads or budget["inter"]
+        self.report_file = report_file
+
+    def _child_env(self, variant: Variant) -> Dict[str, str]:
+        env = dict(os.environ)
+        for name in THREAD_ENV["intra"]:
+            env[name] = str(self.intra_threads)
+        for name in THREAD_ENV["inter"]:
+            env[name] = str(self.inter_threads)
+        # One trace per variant instead of each process overwriting the same file
+        if env.get("BERTOPIC_PROFILE_OUTPUT"):
+            root, ext = os.path.splitext(env["BERTOPIC_PROFILE_OUTPUT"])
+            env["BERTOPIC_PROFILE_OUTPUT"] = f"{root}_{variant.name}{ext}"
+        return env
+
+    def _run_variant(self, variant: Variant, result_dir: str) -> Dict:
+        result_file = os.path.join(result_dir, f"{variant.name}.json")
+        log_file = os.path.join(PREDICTION_DIR, f"train_{variant.name}.log")
+        command = [
+            sys.executable, os.path.abspath(__file__),
+            "--worker", json.dumps(asdict(variant)),
+            "--result", result_file,
+            "--intra-threads", str(self.intra_threads),
+            "--inter-threads", str(self.inter_threads),
+        ]
+
+        print(f"[train] Starting {variant.name} (seed {variant.seed}, log: {log_file})")
+        start_time = time.perf_counter()
+        with open(log_file, "w") as log:
+            process = subprocess.run(
+                command, stdout=log, stderr=subprocess.STDOUT, env=self._child_env(variant), cwd=PREDICTION_DIR
+            )
+        seconds = time.perf_counter() - start_time
+
+        entry = {
+            **asdict(variant),
+            "status": "ok" if process.returncode == 0 else "failed",
+            "seconds": round(seconds, 2),
+            "log_file": log_file,
+        }
+        if process.returncode == 0:
+            with open(result_file) as f:
+                entry["metrics"] = json.load(f)
+        else:
+            print(f"[train] {variant.name} failed with exit code {process.returncode}, see {log_file}")
+        print(f"[train] {variant.name} finished in {seconds:.2f}s")
+        return entry
+
+    def run(self) -> Dict:
+        """
+        Train every variant and write the report.
+
+        Returns:
+        - The report: thread budget, total wall time and one entry per variant
+        """
+        start_time = time.perf_counter()
+        with tempfile.TemporaryDirectory() as result_dir:
+            with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+                entries = list(executor.map(lambda variant: self._run_variant(variant, result_dir), self.variants))
+        wall_seconds = time.perf_counter() - start_time
+
+        report = {
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "cpus": os.cpu_count(),
+            "max_parallel": self.max_parallel,
+            "intra_threads": self.intra_threads,
+            "inter_threads": self.inter_threads,
+            "wall_seconds": round(wall_seconds, 2),
+            # Wall time the variants would have taken back to back
+            "sequential_seconds": round(sum(entry["seconds"] for entry in entries), 2),
+            "variants": entries,
+        }
+        with open(self.report_file, "w") as f:
+            json.dump(report, f, indent=2)
+        print_report(report)
+        print(f"Training report saved to: {self.report_file}")
+        return report
+
+
+def print_report(report: Dict) -> None:
+    """Print a per-variant timing and error summary"""
+    print("\nTraining summary:")
+    print(f"{'variant':<20}{'status':<10}{'seconds':>10}{'epochs':>8}{'MAE':>10}{'RMSE':>10}")
+    for entry in report["variants"]:
+        metrics = entry.get("metrics", {})
+        epochs = metrics.get("epochs", "-")
+        mae = f"{metrics['mae']:.2f}" if metrics else "-"
+        rmse = f"{metrics['rmse']:.2f}" if metrics else "-"
+        print(f"{entry['name']:<20}{entry['status']:<10}{entry['seconds']:>10.2f}{epochs:>8}{mae:>10}{rmse:>10}")
+    print(f"{'total (wall)':<30}{report['wall_seconds']:>10.2f}")
+    print(f"{'total (sequential)':<30}{report['sequential_seconds']:>10.2f}")
+
+
+def main():
+    """Main function to train the prediction models"""
+    parser = argparse.ArgumentParser(description="Train the LSTM variants concurrently")
+    parser.add_argument("--variants", nargs="+", choices=[v.name for v in VARIANTS], help="Variants to train (default: all)")
+    parser.add_argument("--max-parallel", type=int, help="Maximum number of variants training at the same time")
+    parser.add_argument("--intra-threads", type=int, help="Intra-op threads per variant")
+    parser.add_argument("--inter-threads", type=int, help="Inter-op threads per variant")
+    # Internal: train a single variant in this process
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        variant = Variant(**json.loads(args.worker))
+        metrics = train_variant(variant, args.intra_threads, args.inter_threads)
+        with open(args.result, "w") as f:
+            json.dump(metrics, f)
+        return
+
+    variants = [v for v in VARIANTS if args.variants is None or v.name in args.variants]
+    report = TrainingRunner(variants, args.max_parallel, args.intra_threads, args.inter_threads).run()
+    if any(entry["status"] != "ok" for entry in report["variants"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,66 @@
+import argparse
 import numpy as np
 import os
 import re
+import shutil
+import sys
+import tempfile
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Iterator, Optional, Dict
+
+# Make the shared bertopic_project modules importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data_preprocessing.schemas import RAW_REDDIT_SCHEMA, SOCIAL_SCHEMA
+from utils.near_dedup import NearDuplicateCollapser
+from utils.profiling import profiler
+
+# Same substitutions as SocialMediaPreprocessor.clean_text, compiled once and
+# applied in the same order (each step sees the output of the previous one, so
+# they cannot be fused into one pattern without changing the result)
+TICKER_PATTERN = re.compile(r'\$[A-Za-z]+')
+CLEAN_PATTERNS = [
+    (re.compile(r'http\S+|www\.\S+'), ''),  # URLs
+    (re.compile(r'\[.*?\]|\(.*?\)'), ''),  # []() formatting
+    (re.compile(r'&amp;|&lt;|&gt;'), ''),  # HTML entities
+    (re.compile(r'#\w+'), ''),  # hashtags
+    (re.compile(r'@\w+'), ''),  # @ mentions
+    (re.compile(r'[^a-zA-Z0-9\s\$\.]'), ' '),  # special characters
+]
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Below this many rows, starting worker processes costs more than it saves
+PARALLEL_CLEAN_MIN_ROWS = 200_000
+
+# Only the columns the preprocessor uses, read as plain strings so that every
+# chunk of a file gets the same types
+REDDIT_COLUMNS = {'date': str, 'title': str, 'text': str}
+TWITTER_COLUMNS = {'content': str, 'date': str}
+OUTPUT_COLUMNS = ['date', 'content', 'source']
+
+# Rows per chunk in streaming mode
+DEFAULT_CHUNK_ROWS = 50_000
+
+def clean_texts(texts: pd.Series) -> pd.Series:
+    """
+    Vectorized equivalent of SocialMediaPreprocessor.clean_text for a whole column
+    
+    Parameters:
+    - texts: Raw texts (missing values become empty strings)
+    
+    Returns:
+    - Cleaned texts, with the same index
+    """
+    texts = texts.fillna('').astype(str).str.strip()
+    tickers = texts.str.findall(TICKER_PATTERN).str.join(' ')
+    
+    for pattern, replacement in CLEAN_PATTERNS:
+        texts = texts.str.replace(pattern, replacement, regex=True)
+    
+    # Preserved tickers go back at the end, whitespace is normalized afterwards
+    texts = texts + ' ' + tickers
+    return texts.str.replace(WHITESPACE_PATTERN, ' ', regex=True).str.strip()
 
 class SocialMediaPreprocessor:
     def __init__(self):
@@ -20,6 +77,13 @@ class SocialMediaPreprocessor:
         
         # Ensure output directory exists
         os.makedirs(self.output_dir, exist_ok=True)
+        
+        # Reposts and copy-paste spam are only scored once downstream, weighted by their multiplicity
+        self.collapser = NearDuplicateCollapser()
+
+    def collapse_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Keep one post per cluster of near-duplicates of the same day and source"""
+        return self.collapser.collapse(df, text_column='content', group_columns=['date', 'source'])
 
     def clean_text(self, text: str) -> str:
         """Clean and standardize text content"""
@@ -53,26 +117,57 @@ class SocialMediaPreprocessor:
         
         return text
 
-    def process_reddit_data(self) -> pd.DataFrame:
-        """Process Reddit data"""
-        file_path = os.path.join(self.input_dir, "reddit_data.csv")
+    def clean_texts(self, texts: pd.Series, workers: Optional[int] = None) -> pd.Series:
+        """
+        Clean a whole column, splitting large inputs across worker processes
+        
+        Parameters:
+        - texts: Raw texts
+        - workers: Number of processes (defaults to the CPU count)
+        
+        Returns:
+        - Cleaned texts, identical to applying clean_text to every row
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(texts) < PARALLEL_CLEAN_MIN_ROWS:
+            return clean_texts(texts)
+        
+        chunk_size = -(-len(texts) // workers)
+        chunks = [texts.iloc[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return pd.concat(list(executor.map(clean_texts, chunks)))
+
+    def _raw_file(self, file_name: str, label: str) -> str:
+        file_path = os.path.join(self.input_dir, file_name)
         
         if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Reddit data file not found at {file_path}")
+            raise FileNotFoundError(f"{label} data file not found at {file_path}")
+        return file_path
+
+    def process_reddit_data(self) -> pd.DataFrame:
+        """Process Reddit data"""
+        file_path = self._raw_file("reddit_data.csv", "Reddit")
         
         # Read data
-        df = pd.read_csv(file_path)
+        with profiler.stage("read_reddit_csv") as stage:
+            df = RAW_REDDIT_SCHEMA.read(file_path)
+            stage.rows_out = len(df)
         
+        return self._prepare_reddit(df)
+
+    def _prepare_reddit(self, df: pd.DataFrame) -> pd.DataFrame:
         # Combine title and text
         df['title'] = df['title'].fillna('')
         df['text'] = df['text'].fillna('')
         df['content'] = df['title'] + ' [TITLE_END] ' + df['text']
         
         # Clean content
-        df['content'] = df['content'].apply(self.clean_text)
+        with profiler.stage("clean_text", rows_in=len(df)) as stage:
+            df['content'] = self.clean_texts(df['content'])
+            stage.rows_out = len(df)
         
         # Convert and clean date - handling separate date and time columns
-        df['date'] = pd.to_datetime(df['date']).dt.date
+        df['date'] = pd.to_datetime(df['date'])
         
         # Add source column
         df['source'] = 'reddit'
@@ -82,19 +177,23 @@ class SocialMediaPreprocessor:
 
     def process_twitter_data(self) -> pd.DataFrame:
         """Process Twitter/X data"""
-        file_path = os.path.join(self.input_dir, "Tweets_TSLA.csv")
-        
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Twitter data file not found at {file_path}")
+        file_path = self._raw_file("Tweets_TSLA.csv", "Twitter")
         
         # Read data
-        df = pd.read_csv(file_path)
+        with profiler.stage("read_twitter_csv") as stage:
+            df = pd.read_csv(file_path)
+            stage.rows_out = len(df)
         
+        return self._prepare_twitter(df)
+
+    def _prepare_twitter(self, df: pd.DataFrame) -> pd.DataFrame:
         # Clean content
-        df['content'] = df['content'].apply(self.clean_text)
+        with profiler.stage("clean_text", rows_in=len(df)) as stage:
+            df['content'] = self.clean_texts(df['content'])
+            stage.rows_out = len(df)
         
         # Convert and clean date - handling ISO format date
-        df['date'] = pd.to_datetime(df['date'].str.split('T').str[0]).dt.date
+        df['date'] = pd.to_datetime(df['date'].str.split('T').str[0])
         
         # Add source column
         df['source'] = 'twitter'
@@ -102,32 +201,146 @@ class SocialMediaPreprocessor:
         # Select final columns
         return df[['date', 'content', 'source']]
 
-    def process_data(self) -> Dict:
+    @staticmethod
+    def filter_short_texts(df: pd.DataFrame) -> pd.DataFrame:
+        """Remove texts with fewer than 3 words"""
+        return df[df['content'].str.split().str.len() >= 3]
+
+    def iter_chunks(self, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
         """
-        Main method to process all social media data
+        Read, clean and filter both raw files chunk by chunk
+        
+        Parameters:
+        - chunk_rows: Number of raw rows read at a time
+        
+        Returns:
+        - Iterator of processed chunks (date, content, source), Reddit first
+        """
+        sources = [
+            ("reddit_data.csv", "Reddit", REDDIT_COLUMNS, self._prepare_reddit),
+            ("Tweets_TSLA.csv", "Twitter", TWITTER_COLUMNS, self._prepare_twitter),
+        ]
+        for file_name, label, columns, prepare in sources:
+            file_path = self._raw_file(file_name, label)
+            reader = pd.read_csv(file_path, usecols=list(columns), dtype=columns, chunksize=chunk_rows)
+            with reader:
+                for chunk in reader:
+                    yield self.filter_short_texts(prepare(chunk))
+
+    def process_data_streaming(self, chunk_rows: int = DEFAULT_CHUNK_ROWS, dedup: bool = True) -> Dict:
+        """
+        Bounded-memory variant of process_data for raw files that do not fit in memory
+        
+        Each processed chunk is appended to one partition file per date, and the
+        partitions are then concatenated in date order. Memory use depends on
+        chunk_rows, not on the size of the raw files. Within a day, posts keep
+        their input order (Reddit before Twitter), whereas process_data leaves
+        them in the order of an unstable sort. Near-duplicates are collapsed one
+        day at a time.
+        
+        Parameters:
+        - chunk_rows: Number of raw rows read at a time
+        - dedup: Collapse near-duplicate posts
         
         Returns:
         - Dictionary with processing results and metadata
         """
+        output_path = os.path.join(self.output_dir, "processed_social_data.csv")
+        partition_dir = tempfile.mkdtemp(prefix="social_partitions_", dir=self.output_dir)
+        posts = 0
+        counts = {'reddit': 0, 'twitter': 0}
+        
         try:
-            # Process both data sources
-            reddit_df = self.process_reddit_data()
-            twitter_df = self.process_twitter_data()
-            
-            # Combine datasets
-            combined_df = pd.concat([reddit_df, twitter_df], ignore_index=True)
+            with profiler.stage("social_preprocessing", export_as="preprocess_social") as pipeline_stage:
+                with profiler.stage("partition_by_date") as stage:
+                    for chunk in self.iter_chunks(chunk_rows):
+                        posts += len(chunk)
+                        for date, part in chunk.groupby('date', sort=False):
+                            part_path = os.path.join(partition_dir, f"{date:%Y-%m-%d}.csv")
+                            SOCIAL_SCHEMA.write(part, part_path, mode='a', header=False)
+                    stage.rows_out = posts
+                
+                # ISO dates sort chronologically by file name
+                partitions = sorted(os.listdir(partition_dir))
+                if not partitions:
+                    raise ValueError("No posts left after filtering")
+                
+                # Only one day is held in memory at a time
+                with profiler.stage("write_csv", rows_in=posts) as stage:
+                    tmp_path = os.path.join(partition_dir, "output.csv.tmp")
+                    with open(tmp_path, 'w', encoding='utf-8', newline='') as out:
+                        for i, partition in enumerate(partitions):
+                            day = SOCIAL_SCHEMA.read(os.path.join(partition_dir, partition), header=None,
+                                                     names=OUTPUT_COLUMNS, keep_default_na=False)
+                            if dedup:
+                                day = self.collapse_duplicates(day)
+                            for source, count in day['source'].value_counts().items():
+                                counts[source] += count
+                            SOCIAL_SCHEMA.write(day, out, header=i == 0)
+                    os.replace(tmp_path, output_path)
+                    stage.rows_out = sum(counts.values())
+                pipeline_stage.rows_out = sum(counts.values())
             
-            # Sort by date
-            combined_df = combined_df.sort_values('date')
-            
-            # Remove texts with fewer than 3 words
-            combined_df['word_count'] = combined_df['content'].str.split().str.len()
-            combined_df = combined_df[combined_df['word_count'] >= 3]
-            combined_df = combined_df.drop('word_count', axis=1)
+            return {
+                "success": True,
+                "total_posts": sum(counts.values()),
+                "reddit_posts": counts['reddit'],
+                "twitter_posts": counts['twitter'],
+                "duplicates_collapsed": posts - sum(counts.values()),
+                "date_range": {
+                    "start": partitions[0][:-len(".csv")],
+                    "end": partitions[-1][:-len(".csv")]
+                },
+                "file_path": output_path
+            }
             
-            # Save processed data
-            output_path = os.path.join(self.output_dir, "processed_social_data.csv")
-            combined_df.to_csv(output_path, index=False)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
+            shutil.rmtree(partition_dir, ignore_errors=True)
+
+    def process_data(self, dedup: bool = True) -> Dict:
+        """
+        Main method to process all social media data
+        
+        Parameters:
+        - dedup: Collapse near-duplicate posts
+        
+        Returns:
+        - Dictionary with processing results and metadata
+        """
+        try:
+            with profiler.stage("social_preprocessing", export_as="preprocess_social") as pipeline_stage:
+                # Process both data sources
+                with profiler.stage("process_reddit_data") as stage:
+                    reddit_df = self.process_reddit_data()
+                    stage.rows_out = len(reddit_df)
+                with profiler.stage("process_twitter_data") as stage:
+                    twitter_df = self.process_twitter_data()
+                    stage.rows_out = len(twitter_df)
+                
+                # Combine datasets
+                combined_df = pd.concat([reddit_df, twitter_df], ignore_index=True)
+                
+                with profiler.stage("sort_and_filter", rows_in=len(combined_df)) as stage:
+                    # Sort by date
+                    combined_df = combined_df.sort_values('date')
+                    
+                    # Remove texts with fewer than 3 words
+                    combined_df = self.filter_short_texts(combined_df)
+                    stage.rows_out = len(combined_df)
+                
+                posts = len(combined_df)
+                if dedup:
+                    with profiler.stage("near_dedup", rows_in=posts) as stage:
+                        combined_df = self.collapse_duplicates(combined_df)
+                        stage.rows_out = len(combined_df)
+                
+                # Save processed data
+                output_path = os.path.join(self.output_dir, "processed_social_data.csv")
+                with profiler.stage("write_csv", rows_in=len(combined_df)):
+                    SOCIAL_SCHEMA.write(combined_df, output_path)
+                pipeline_stage.rows_out = len(combined_df)
             
             # Return processing results
             return {
@@ -135,6 +348,7 @@ class SocialMediaPreprocessor:
                 "total_posts": len(combined_df),
                 "reddit_posts": len(combined_df[combined_df['source'] == 'reddit']),
                 "twitter_posts": len(combined_df[combined_df['source'] == 'twitter']),
+                "duplicates_collapsed": posts - len(combined_df),
                 "date_range": {
                     "start": combined_df['date'].min().strftime("%Y-%m-%d"),
                     "end": combined_df['date'].max().strftime("%Y-%m-%d")
@@ -147,12 +361,27 @@ class SocialMediaPreprocessor:
 
 def main():
     """Main function to run the preprocessor"""
+    parser = argparse.ArgumentParser(description="Clean and merge the raw Reddit and Twitter data")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Process the raw files in chunks with bounded memory")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Raw rows read at a time in streaming mode")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Keep near-duplicate posts instead of collapsing them")
+    args = parser.parse_args()
+    
     preprocessor = SocialMediaPreprocessor()
-    results = preprocessor.process_data()
+    if args.streaming:
+        results = preprocessor.process_data_streaming(args.chunk_rows, dedup=not args.no_dedup)
+    else:
+        results = preprocessor.process_data(dedup=not args.no_dedup)
     
     print("\nProcessing Results:")
     for key, value in results.items():
         print(f"{key}: {value}")
+    # The pipeline runner only sees the exit code
+    if not results.get("success"):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,9 +1,79 @@
+import argparse
+import io
 import numpy as np
 import os
+import sys
 import pandas as pd
 from datetime import datetime
 from typing import Optional, Tuple, Dict
 
+# Make the shared bertopic_project modules importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data_preprocessing.indicators import IndicatorEngine, panel_indicators_parallel
+from data_preprocessing.schemas import STOCK_SCHEMA
+from utils.profiling import profiler
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+def read_csv_tail(file_path: str, n_rows: int, block_size: int = 64 * 1024) -> pd.DataFrame:
+    """
+    Read the header and the last n_rows rows of a CSV file without parsing the rest
+    
+    Parameters:
+    - file_path: CSV file without embedded newlines in its fields
+    - n_rows: Number of trailing rows to read
+    - block_size: Bytes read per backward step
+    
+    Returns:
+    - DataFrame with at most n_rows rows
+    """
+    with open(file_path, "rb") as f:
+        header = f.readline()
+        header_end = f.tell()
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        # One extra newline guarantees the first kept line is complete
+        while position > header_end and data.count(b"\n") <= n_rows:
+            read_size = min(block_size, position - header_end)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+
+    lines = data.splitlines(keepends=True)
+    if position > header_end:
+        lines = lines[1:]
+    return pd.read_csv(io.BytesIO(header + b"".join(lines[-n_rows:])))
+
+def truncate_csv_tail(file_path: str, n_rows: int, block_size: int = 64 * 1024) -> None:
+    """
+    Remove the last n_rows rows of a CSV file in place (the header is always kept)
+    
+    Parameters:
+    - file_path: CSV file without embedded newlines in its fields, ending with a newline
+    - n_rows: Number of trailing rows to remove
+    - block_size: Bytes read per backward step
+    """
+    with open(file_path, "r+b") as f:
+        header_end = len(f.readline())
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        position = end
+        data = b""
+        # The row before the removed ones must end inside the data read
+        while position > header_end and data.count(b"\n") <= n_rows:
+            read_size = min(block_size, position - header_end)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+
+        cut = len(data)
+        for _ in range(n_rows + 1):
+            cut = data.rfind(b"\n", 0, cut)
+            if cut < 0:
+                break
+        f.truncate(max(header_end, position + cut + 1))
+
 class StockDataPreprocessor:
     def __init__(self):
         """Initialize the preprocessor with directory paths"""
@@ -29,6 +99,8 @@ class StockDataPreprocessor:
         # File paths
         self.stock_file = os.path.join(self.raw_dir, "tesla_stock_history.csv")
         self.processed_file = os.path.join(self.processed_data_dir, "processed_stock_data.csv")
+        # Rolling windows and EMA accumulators as of the last processed day
+        self.state_file = os.path.join(self.processed_data_dir, "processed_stock_state.json")
         
         print(f"Reading from: {self.stock_file}")
         print(f"Writing to: {self.processed_file}")
@@ -75,15 +147,15 @@ class StockDataPreprocessor:
 
         return df
 
-    def clean_stock_data(self, df: pd.DataFrame) -> pd.DataFrame:
+    def clean_prices(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Clean and preprocess stock data
+        Parse dates and prices, drop incomplete rows and sort by date
         
         Parameters:
         - df: Raw stock DataFrame
         
         Returns:
-        - Cleaned DataFrame with technical indicators
+        - Cleaned DataFrame without indicators
         """
         df = df.copy()
         
@@ -91,9 +163,11 @@ class StockDataPreprocessor:
         df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
         
         # Clean numeric columns
-        numeric_columns = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
-        for col in numeric_columns:
-            df[col] = pd.to_numeric(df[col].astype(str).str.replace(",", ""), errors="coerce")
+        for col in PRICE_COLUMNS:
+            # Only text needs the thousands separators stripped
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = df[col].astype(str).str.replace(",", "")
+            df[col] = pd.to_numeric(df[col], errors="coerce")
 
         # Handle missing and infinite values
         df.replace([np.inf, -np.inf], np.nan, inplace=True)
@@ -101,9 +175,24 @@ class StockDataPreprocessor:
 
         # Sort by date
         df.sort_values("Date", inplace=True)
+        return df
+
+    def clean_stock_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Clean and preprocess stock data
+        
+        Parameters:
+        - df: Raw stock DataFrame
+        
+        Returns:
+        - Cleaned DataFrame with technical indicators
+        """
+        df = self.clean_prices(df)
 
         # Add technical features
-        df = self.add_technical_features(df)
+        with profiler.stage("add_technical_features", rows_in=len(df)) as stage:
+            df = self.add_technical_features(df)
+            stage.rows_out = len(df)
 
         return df
 
@@ -119,13 +208,18 @@ class StockDataPreprocessor:
             if not os.path.exists(self.stock_file):
                 return {"success": False, "error": f"File not found: {self.stock_file}"}
 
-            df = pd.read_csv(self.stock_file)
-            
-            # Clean and process data
-            df = self.clean_stock_data(df)
+            with profiler.stage("stock_preprocessing", export_as="preprocess_stock") as pipeline_stage:
+                df = pd.read_csv(self.stock_file)
+                
+                # Clean and process data
+                with profiler.stage("clean_stock_data", rows_in=len(df)) as stage:
+                    df = self.clean_stock_data(df)
+                    stage.rows_out = len(df)
 
-            # Save processed data
-            df.to_csv(self.processed_file, index=False)
+                # Save processed data (indicators are computed in float64, stored as float32)
+                STOCK_SCHEMA.write(df, self.processed_file)
+                IndicatorEngine.from_history(df).save(self.state_file)
+                pipeline_stage.rows_out = len(df)
 
             # Return processing results
             return {
@@ -142,13 +236,146 @@ class StockDataPreprocessor:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def process_panel(self, input_file: str, output_file: Optional[str] = None, workers: Optional[int] = None) -> Dict:
+        """
+        Clean and featurize a long-format file of many tickers in one pass
+        
+        Parameters:
+        - input_file: CSV in the raw scraper format, with a Ticker column and one row per ticker and day
+        - output_file: Output CSV (defaults to processed_panel_data.csv in the processed data directory)
+        - workers: Number of processes for large panels (defaults to the CPU count)
+        
+        Returns:
+        - Dictionary with processing results and metadata
+        """
+        output_file = output_file or os.path.join(self.processed_data_dir, "processed_panel_data.csv")
+        try:
+            if not os.path.exists(input_file):
+                return {"success": False, "error": f"File not found: {input_file}"}
+
+            with profiler.stage("stock_panel_preprocessing") as pipeline_stage:
+                df = pd.read_csv(input_file, dtype={"Ticker": "category", **{col: str for col in PRICE_COLUMNS}})
+                if "Ticker" not in df.columns:
+                    return {"success": False, "error": f"No Ticker column in {input_file}"}
+
+                with profiler.stage("clean_prices", rows_in=len(df)) as stage:
+                    df = self.clean_prices(df)
+                    stage.rows_out = len(df)
+
+                with profiler.stage("panel_indicators", rows_in=len(df)) as stage:
+                    df = panel_indicators_parallel(df, "Ticker", workers)
+                    stage.rows_out = len(df)
+
+                STOCK_SCHEMA.write(df, output_file)
+                pipeline_stage.rows_out = len(df)
+
+            return {
+                "success": True,
+                "rows_processed": len(df),
+                "tickers": int(df["Ticker"].nunique()),
+                "date_range": {
+                    "start": df["Date"].min().strftime("%Y-%m-%d"),
+                    "end": df["Date"].max().strftime("%Y-%m-%d")
+                },
+                "file_path": output_file
+            }
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def process_incremental(self) -> Dict:
+        """
+        Append the days of the raw file that are newer than the processed file
+        
+        The last processed day is processed again, since the scraper fetches
+        it again and its bar may have been partial or revised. Indicators are
+        computed by the IndicatorEngine from the saved state, rewound to the
+        day before, in O(new days). If the state is missing or does not match
+        the processed file, it is rebuilt from the raw history first.
+        Falls back to process_data() when there is no processed file yet or
+        when the raw file starts before it.
+        
+        Returns:
+        - Dictionary with processing results and metadata
+        """
+        try:
+            if not os.path.exists(self.stock_file):
+                return {"success": False, "error": f"File not found: {self.stock_file}"}
+            if not os.path.exists(self.processed_file) or os.path.getsize(self.processed_file) == 0:
+                return self.process_data()
+
+            last_processed = pd.to_datetime(read_csv_tail(self.processed_file, 1)["Date"]).iloc[0]
+            first_processed = pd.to_datetime(pd.read_csv(self.processed_file, usecols=["Date"], nrows=1)["Date"]).iloc[0]
+
+            raw = pd.read_csv(self.stock_file)
+            raw["Date"] = pd.to_datetime(raw["Date"], errors="coerce")
+            if raw["Date"].min() < first_processed:
+                print("Raw data starts before the processed data, reprocessing everything")
+                return self.process_data()
+            revisited = (raw["Date"] == last_processed).any()
+            new_rows = raw[raw["Date"] >= last_processed] if revisited else raw[raw["Date"] > last_processed]
+            if new_rows.empty:
+                print(f"Processed data is up to date ({last_processed:%Y-%m-%d})")
+                return {"success": True, "rows_appended": 0, "file_path": self.processed_file}
+
+            with profiler.stage("stock_preprocessing", export_as="preprocess_stock") as pipeline_stage:
+                engine = IndicatorEngine.load(self.state_file)
+                # States saved before rewinding was supported cannot go back a bar
+                if engine is None or engine.last_date != last_processed or (engine.previous is None and engine.bars > 1):
+                    print("No indicator state for the processed data, rebuilding it from the raw history")
+                    engine = IndicatorEngine.from_history(self.clean_prices(raw[raw["Date"] <= last_processed]))
+                if revisited:
+                    engine = engine.rewind()
+
+                with profiler.stage("update_indicators", rows_in=len(new_rows)) as stage:
+                    new_rows = engine.update(self.clean_prices(new_rows))
+                    stage.rows_out = len(new_rows)
+
+                header = pd.read_csv(self.processed_file, nrows=0).columns
+                if revisited:
+                    # Replace the stored bar of the last processed day
+                    truncate_csv_tail(self.processed_file, 1)
+                STOCK_SCHEMA.write(new_rows[header], self.processed_file, mode="a", header=False)
+                # Only advance the state once the rows are stored
+                engine.save(self.state_file)
+                pipeline_stage.rows_out = len(new_rows)
+
+            return {
+                "success": True,
+                "rows_appended": int((new_rows["Date"] > last_processed).sum()),
+                "rows_replaced": int(revisited),
+                "date_range": {
+                    "start": new_rows["Date"].min().strftime("%Y-%m-%d"),
+                    "end": new_rows["Date"].max().strftime("%Y-%m-%d")
+                },
+                "file_path": self.processed_file
+            }
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
 def main():
     """Main function to run the preprocessor"""
+    parser = argparse.ArgumentParser(description="Clean stock prices and add technical indicators")
+    parser.add_argument("--incremental", action="store_true", help="Only append the days newer than the processed file")
+    parser.add_argument("--panel", metavar="CSV", help="Featurize a long-format file of many tickers instead")
+    parser.add_argument("--output", help="Output file of --panel")
+    parser.add_argument("--workers", type=int, help="Processes used by --panel for large panels")
+    args = parser.parse_args()
+
     preprocessor = StockDataPreprocessor()
-    results = preprocessor.process_data()
+    if args.panel:
+        results = preprocessor.process_panel(args.panel, args.output, args.workers)
+    elif args.incremental:
+        results = preprocessor.process_incremental()
+    else:
+        results = preprocessor.process_data()
     print("\nProcessing Results:")
     for key, value in results.items():
         print(f"{key}: {value}")
+    # The pipeline runner only sees the exit code
+    if not results.get("success"):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,225 @@
+import json
+import math
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Longest rolling window used by the indicators (MA20, 20SD, Bollinger Bands)
+WINDOW = 20
+
+# EMA spans: 12 and 26 for MACD, 20 for EMA
+EMA_SPANS = {"ema12": 12, "ema26": 26, "ema20": 20}
+
+INDICATOR_COLUMNS = ["MA7", "MA20", "MACD", "20SD", "Upper_Band", "Lower_Band", "EMA", "Log_Momentum"]
+
+# Below this many rows, splitting a panel across processes costs more than it saves
+PARALLEL_PANEL_MIN_ROWS = 2_000_000
+
+
+def panel_indicators(df: pd.DataFrame, group_column: str = "Ticker") -> pd.DataFrame:
+    """
+    Indicators of StockDataPreprocessor.add_technical_features for many tickers in one pass.
+
+    Rolling windows and EMAs run grouped by ticker, so each ticker gives the
+    same values as add_technical_features on its own history.
+
+    Parameters:
+    - df: Long-format prices (one row per ticker and date) with Date and Close
+    - group_column: Column identifying the ticker
+
+    Returns:
+    - The panel sorted by ticker and date, with the indicator columns added
+    """
+    df = df.sort_values([group_column, "Date"], kind="stable").reset_index(drop=True)
+    close = df.groupby(group_column, sort=False, observed=True)["Close"]
+
+    def grouped(result: pd.Series) -> pd.Series:
+        # Grouped rolling/ewm prepend the group key to the index
+        return result.reset_index(level=0, drop=True)
+
+    df["MA7"] = grouped(close.rolling(window=7, min_periods=1).mean())
+    df["MA20"] = grouped(close.rolling(window=20, min_periods=1).mean())
+    df["MACD"] = (
+        grouped(close.ewm(span=12, adjust=False).mean())
+        - grouped(close.ewm(span=26, adjust=False).mean())
+    )
+    df["20SD"] = grouped(close.rolling(window=20, min_periods=1).std())
+    df["Upper_Band"] = df["MA20"] + (df["20SD"] * 2)
+    df["Lower_Band"] = df["MA20"] - (df["20SD"] * 2)
+    df["EMA"] = grouped(close.ewm(span=20, adjust=False).mean())
+    df["Log_Momentum"] = np.log(df["Close"] / close.shift(1))
+    return df
+
+
+def panel_indicators_parallel(df: pd.DataFrame, group_column: str = "Ticker", workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    panel_indicators, split by ticker across worker processes for large panels
+
+    Parameters:
+    - df: Long-format prices with Date and Close
+    - group_column: Column identifying the ticker
+    - workers: Number of processes (defaults to the CPU count)
+
+    Returns:
+    - Same result as panel_indicators
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(df) < PARALLEL_PANEL_MIN_ROWS:
+        return panel_indicators(df, group_column)
+
+    # Whole tickers per chunk, so no window crosses a chunk boundary
+    tickers = np.sort(df[group_column].unique())
+    chunks = [df[df[group_column].isin(part)] for part in np.array_split(tickers, workers) if len(part)]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+        results = list(executor.map(panel_indicators, chunks, [group_column] * len(chunks)))
+    return pd.concat(results, ignore_index=True)
+
+
+class IndicatorEngine:
+    def __init__(self):
+        """
+        Online version of StockDataPreprocessor.add_technical_features.
+
+        Keeps the last WINDOW closes, the EMA accumulators and the last close,
+        which is all the indicators depend on, so appending new bars costs
+        O(new bars) instead of a pass over the whole history. The state before
+        the last bar is kept too, so that bar can be replaced when its prices
+        are revised. The state is persisted as JSON next to the processed file.
+        """
+        self.closes = deque(maxlen=WINDOW)
+        self.emas: Dict[str, Optional[float]] = {name: None for name in EMA_SPANS}
+        self.last_date: Optional[pd.Timestamp] = None
+        self.bars = 0
+        # State before the last bar (see rewind)
+        self.previous: Optional[Dict] = None
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame) -> "IndicatorEngine":
+        """
+        Build the state of a processed or cleaned price history.
+
+        Parameters:
+        - df: Frame with Date and Close, sorted by date
+
+        Returns:
+        - Engine positioned after the last bar of df
+        """
+        engine = cls()
+        if df.empty:
+            return engine
+        history = df.iloc[:-1]
+        if not history.empty:
+            close = history["Close"].astype(np.float64)
+            engine.closes.extend(close.iloc[-WINDOW:].tolist())
+            for name, span in EMA_SPANS.items():
+                engine.emas[name] = float(close.ewm(span=span, adjust=False).mean().iloc[-1])
+            engine.last_date = pd.Timestamp(history["Date"].iloc[-1])
+            engine.bars = len(history)
+        # Step through the last bar so the state before it is known
+        engine.update(df.iloc[-1:])
+        return engine
+
+    def rewind(self) -> "IndicatorEngine":
+        """
+        Engine positioned before the last bar, to process that bar again.
+
+        Returns:
+        - New engine (an empty one if the last bar was the first)
+        """
+        if self.previous is None:
+            return IndicatorEngine()
+        return IndicatorEngine.from_dict(self.previous)
+
+    def _state(self) -> Dict:
+        return {
+            "last_date": None if self.last_date is None else self.last_date.strftime("%Y-%m-%d"),
+            "bars": self.bars,
+            "closes": list(self.closes),
+            "emas": dict(self.emas),
+        }
+
+    def _step(self, close: float) -> Dict[str, float]:
+        previous = self.closes[-1] if self.closes else None
+        self.closes.append(close)
+        for name, span in EMA_SPANS.items():
+            alpha = 2.0 / (span + 1.0)
+            ema = self.emas[name]
+            self.emas[name] = close if ema is None else (1.0 - alpha) * ema + alpha * close
+        self.bars += 1
+
+        window = np.fromiter(self.closes, dtype=np.float64, count=len(self.closes))
+        ma7 = window[-7:].mean()
+        ma20 = window.mean()
+        sd20 = window.std(ddof=1) if len(window) > 1 else np.nan
+        return {
+            "MA7": ma7,
+            "MA20": ma20,
+            "MACD": self.emas["ema12"] - self.emas["ema26"],
+            "20SD": sd20,
+            "Upper_Band": ma20 + sd20 * 2,
+            "Lower_Band": ma20 - sd20 * 2,
+            "EMA": self.emas["ema20"],
+            "Log_Momentum": math.log(close / previous) if previous is not None else np.nan,
+        }
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the indicators of new bars and advance the state.
+
+        Parameters:
+        - df: Cleaned bars (Date, Close, ...) sorted by date; bars not newer than the state are dropped
+
+        Returns:
+        - The new bars with the indicator columns added
+        """
+        if self.last_date is not None:
+            df = df[df["Date"] > self.last_date]
+        df = df.copy()
+
+        rows = []
+        for date, close in zip(df["Date"], df["Close"]):
+            self.previous = self._state()
+            rows.append(self._step(float(close)))
+            self.last_date = pd.Timestamp(date)
+        indicators = pd.DataFrame(rows, columns=INDICATOR_COLUMNS, index=df.index)
+        for col in INDICATOR_COLUMNS:
+            df[col] = indicators[col]
+        return df
+
+    def to_dict(self) -> Dict:
+        return {**self._state(), "previous": self.previous}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> "IndicatorEngine":
+        engine = cls()
+        engine.closes.extend(state["closes"])
+        engine.emas.update(state["emas"])
+        engine.last_date = None if state["last_date"] is None else pd.Timestamp(state["last_date"])
+        engine.bars = state["bars"]
+        engine.previous = state.get("previous")
+        return engine
+
+    def save(self, file_path: str) -> None:
+        """Write the state atomically, so an interrupted run keeps the previous one"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, file_path: str) -> Optional["IndicatorEngine"]:
+        """Load a saved state, or None if there is none (or it is unreadable)"""
+        try:
+            with open(file_path) as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
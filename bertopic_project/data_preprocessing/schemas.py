@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+DATE = "datetime64[ns]"
+DATE_FORMAT = "%Y-%m-%d"
+
+
+@dataclass(frozen=True)
+class Schema:
+    """
+    Declared column types of a pipeline CSV file.
+
+    Dates are parsed to datetime64 and written back as YYYY-MM-DD, labels are
+    categorical, and scores and features are float32. Columns missing from a
+    frame are skipped and undeclared columns are kept as they are, so files
+    written by older versions of a stage can still be read.
+    """
+    name: str
+    columns: Dict[str, str]
+
+    def extend(self, name: str, columns: Dict[str, str]) -> "Schema":
+        """Schema of a stage that adds columns to this one"""
+        return Schema(name, {**self.columns, **columns})
+
+    def dtypes(self, columns: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """read_csv dtypes of the declared non-date columns (optionally only the given ones)"""
+        wanted = self.columns if columns is None else set(columns)
+        return {col: dtype for col, dtype in self.columns.items() if col in wanted and dtype != DATE}
+
+    def enforce(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Cast the declared columns of a frame to their types.
+
+        Parameters:
+        - df: Frame to cast (left unchanged)
+
+        Returns:
+        - Frame with the declared types
+        """
+        casts = {}
+        for col, dtype in self.columns.items():
+            if col not in df.columns or str(df[col].dtype) == dtype:
+                continue
+            if dtype == DATE:
+                casts[col] = pd.to_datetime(df[col])
+            else:
+                casts[col] = df[col].astype(dtype)
+        return df.assign(**casts) if casts else df
+
+    def read(self, file_path: str, usecols: Optional[Iterable[str]] = None, **kwargs) -> pd.DataFrame:
+        """
+        Read a CSV file of this schema with the declared types.
+
+        Parameters:
+        - file_path: CSV file to read
+        - usecols: Columns to read (all by default); those the file does not have are skipped
+        - kwargs: Other read_csv arguments
+
+        Returns:
+        - Typed DataFrame
+        """
+        present = kwargs.get("names")
+        if present is None:
+            present = list(pd.read_csv(file_path, nrows=0).columns)
+        if usecols is not None:
+            usecols = [col for col in usecols if col in present]
+            present = usecols
+        df = pd.read_csv(file_path, usecols=usecols, dtype=self.dtypes(present), **kwargs)
+        return self.enforce(df)
+
+    def write(self, df: pd.DataFrame, path_or_buf, **kwargs) -> None:
+        """
+        Write a frame as CSV after casting it to the declared types.
+
+        Parameters:
+        - df: Frame to write
+        - path_or_buf: Output file path or open file
+        - kwargs: Other to_csv arguments (e.g. mode="a", header=False)
+        """
+        self.enforce(df).to_csv(path_or_buf, index=False, date_format=DATE_FORMAT, **kwargs)
+
+
+# Raw Reddit scrape (data_extraction/raw/reddit_data.csv)
+RAW_REDDIT_SCHEMA = Schema("reddit_data", {
+    "subreddit": "category",
+    "ticker": "category",
+    "company_name": "category",
+})
+
+# processed_social_data.csv
+SOCIAL_SCHEMA = Schema("processed_social_data", {
+    "date": DATE,
+    "content": "object",
+    "source": "category",
+    "multiplicity": "int32",
+})
+
+# processed_stock_data.csv; Volume stays 64-bit, float32 cannot hold it exactly
+STOCK_SCHEMA = Schema("processed_stock_data", {
+    "Date": DATE,
+    **{col: "float32" for col in ["Open", "High", "Low", "Close", "Adj Close"]},
+    "Volume": "int64",
+    "Ticker": "category",
+    "Company_Name": "category",
+    **{col: "float32" for col in [
+        "MA7", "MA20", "MACD", "20SD", "Upper_Band", "Lower_Band", "EMA", "Log_Momentum",
+    ]},
+})
+
+# comments_with_topics.csv
+TOPICS_SCHEMA = SOCIAL_SCHEMA.extend("comments_with_topics", {
+    "topic": "int32",
+    "topic_words": "category",
+})
+
+_FINBERT_COLUMNS = {
+    "finbert_positive": "float32",
+    "finbert_negative": "float32",
+    "finbert_neutral": "float32",
+    "finbert_sentiment": "category",
+}
+
+# comments_with_sentiments_without_topics.csv
+SENTIMENT_SCHEMA = SOCIAL_SCHEMA.extend("comments_with_sentiments_without_topics", {
+    "vader_compound": "float32",
+    "vader_positive": "float32",
+    "vader_negative": "float32",
+    "vader_neutral": "float32",
+    **_FINBERT_COLUMNS,
+    "vader_sentiment": "category",
+})
+
+# comments_with_sentiments_with_topics.csv (vader_sentiment is the compound score here)
+SENTIMENT_WITH_TOPICS_SCHEMA = TOPICS_SCHEMA.extend("comments_with_sentiments_with_topics", {
+    "vader_sentiment": "float32",
+    **_FINBERT_COLUMNS,
+})
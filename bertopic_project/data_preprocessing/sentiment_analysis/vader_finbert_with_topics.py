@@ -4,6 +4,12 @@ from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import os
+import sys
+
+# Make the shared bertopic_project modules importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data_preprocessing.schemas import SENTIMENT_WITH_TOPICS_SCHEMA, TOPICS_SCHEMA
+from utils.profiling import profiler
 
 class SentimentAnalyzer:
     def __init__(self):
@@ -53,28 +59,33 @@ class SentimentAnalyzer:
         input_path = os.path.join(self.data_dir, "comments_with_topics.csv")
         output_path = os.path.join(self.data_dir, "comments_with_sentiments_with_topics.csv")
         
-        print("Loading comments with topics...")
-        df = pd.read_csv(input_path)
-        
-        print("Calculating VADER sentiment...")
-        df['vader_sentiment'] = df['content'].apply(self.get_vader_sentiment)
-        
-        print("Calculating FinBERT sentiment...")
-        finbert_sentiments = df['content'].apply(self.get_finbert_sentiment)
-        
-        # Add FinBERT sentiment scores as separate columns
-        df['finbert_positive'] = finbert_sentiments.apply(lambda x: x['positive'])
-        df['finbert_negative'] = finbert_sentiments.apply(lambda x: x['negative'])
-        df['finbert_neutral'] = finbert_sentiments.apply(lambda x: x['neutral'])
-        
-        # Add dominant FinBERT sentiment
-        df['finbert_sentiment'] = finbert_sentiments.apply(
-            lambda x: max(x.items(), key=lambda k: k[1])[0]
-        )
-        
-        # Save results
-        df.to_csv(output_path, index=False)
-        print(f"Results saved to: {output_path}")
+        with profiler.stage("sentiment_analysis_with_topics", export_as="sentiment_with_topics") as pipeline_stage:
+            print("Loading comments with topics...")
+            df = TOPICS_SCHEMA.read(input_path)
+            
+            print("Calculating VADER sentiment...")
+            with profiler.stage("vader_loop", rows_in=len(df)):
+                df['vader_sentiment'] = df['content'].apply(self.get_vader_sentiment)
+            
+            print("Calculating FinBERT sentiment...")
+            with profiler.stage("finbert_loop", rows_in=len(df)) as stage:
+                finbert_sentiments = df['content'].apply(self.get_finbert_sentiment)
+                stage.rows_out = len(finbert_sentiments)
+            
+            # Add FinBERT sentiment scores as separate columns
+            df['finbert_positive'] = finbert_sentiments.apply(lambda x: x['positive'])
+            df['finbert_negative'] = finbert_sentiments.apply(lambda x: x['negative'])
+            df['finbert_neutral'] = finbert_sentiments.apply(lambda x: x['neutral'])
+            
+            # Add dominant FinBERT sentiment
+            df['finbert_sentiment'] = finbert_sentiments.apply(
+                lambda x: max(x.items(), key=lambda k: k[1])[0]
+            )
+            
+            # Save results
+            SENTIMENT_WITH_TOPICS_SCHEMA.write(df, output_path)
+            print(f"Results saved to: {output_path}")
+            pipeline_stage.rows_out = len(df)
         
         # Print summary by topic
         print("\nSentiment Summary by Topic:")
@@ -4,8 +4,14 @@ from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import os
+import sys
 from tqdm import tqdm
 
+# Make the shared bertopic_project modules importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data_preprocessing.schemas import SENTIMENT_SCHEMA, SOCIAL_SCHEMA
+from utils.profiling import profiler
+
 class DirectSentimentAnalyzer:
     def __init__(self):
         """Initialize sentiment analyzers"""
@@ -56,46 +62,52 @@ class DirectSentimentAnalyzer:
         input_path = os.path.join(self.data_dir, "processed_social_data.csv")
         output_path = os.path.join(self.data_dir, "comments_with_sentiments_without_topics.csv")
         
-        print(f"Loading data from: {input_path}")
-        df = pd.read_csv(input_path)
-        
-        # VADER Analysis
-        print("\nCalculating VADER sentiment...")
-        vader_results = []
-        for text in tqdm(df['content'], desc="VADER"):
-            vader_results.append(self.get_vader_sentiment(text))
+        with profiler.stage("sentiment_analysis", export_as="sentiment") as pipeline_stage:
+            print(f"Loading data from: {input_path}")
+            df = SOCIAL_SCHEMA.read(input_path)
             
-        # Add VADER scores to dataframe
-        df['vader_compound'] = [x['compound'] for x in vader_results]
-        df['vader_positive'] = [x['pos'] for x in vader_results]
-        df['vader_negative'] = [x['neg'] for x in vader_results]
-        df['vader_neutral'] = [x['neu'] for x in vader_results]
-        
-        # FinBERT Analysis
-        print("\nCalculating FinBERT sentiment...")
-        finbert_results = []
-        for text in tqdm(df['content'], desc="FinBERT"):
-            finbert_results.append(self.get_finbert_sentiment(text))
+            # VADER Analysis
+            print("\nCalculating VADER sentiment...")
+            vader_results = []
+            with profiler.stage("vader_loop", rows_in=len(df)) as stage:
+                for text in tqdm(df['content'], desc="VADER"):
+                    vader_results.append(self.get_vader_sentiment(text))
+                stage.rows_out = len(vader_results)
+                
+            # Add VADER scores to dataframe
+            df['vader_compound'] = [x['compound'] for x in vader_results]
+            df['vader_positive'] = [x['pos'] for x in vader_results]
+            df['vader_negative'] = [x['neg'] for x in vader_results]
+            df['vader_neutral'] = [x['neu'] for x in vader_results]
             
-        # Add FinBERT scores
-        df['finbert_positive'] = [x['positive'] for x in finbert_results]
-        df['finbert_negative'] = [x['negative'] for x in finbert_results]
-        df['finbert_neutral'] = [x['neutral'] for x in finbert_results]
-        
-        # Add dominant sentiments
-        df['vader_sentiment'] = df['vader_compound'].apply(
-            lambda x: 'positive' if x >= 0.05 else ('negative' if x <= -0.05 else 'neutral')
-        )
-        
-        df['finbert_sentiment'] = df.apply(
-            lambda row: max(['positive', 'negative', 'neutral'],
-                          key=lambda x: row[f'finbert_{x}']),
-            axis=1
-        )
-        
-        # Save results
-        df.to_csv(output_path, index=False)
-        print(f"\nResults saved to: {output_path}")
+            # FinBERT Analysis
+            print("\nCalculating FinBERT sentiment...")
+            finbert_results = []
+            with profiler.stage("finbert_loop", rows_in=len(df)) as stage:
+                for text in tqdm(df['content'], desc="FinBERT"):
+                    finbert_results.append(self.get_finbert_sentiment(text))
+                stage.rows_out = len(finbert_results)
+                
+            # Add FinBERT scores
+            df['finbert_positive'] = [x['positive'] for x in finbert_results]
+            df['finbert_negative'] = [x['negative'] for x in finbert_results]
+            df['finbert_neutral'] = [x['neutral'] for x in finbert_results]
+            
+            # Add dominant sentiments
+            df['vader_sentiment'] = df['vader_compound'].apply(
+                lambda x: 'positive' if x >= 0.05 else ('negative' if x <= -0.05 else 'neutral')
+            )
+            
+            df['finbert_sentiment'] = df.apply(
+                lambda row: max(['positive', 'negative', 'neutral'],
+                              key=lambda x: row[f'finbert_{x}']),
+                axis=1
+            )
+            
+            # Save results
+            SENTIMENT_SCHEMA.write(df, output_path)
+            print(f"\nResults saved to: {output_path}")
+            pipeline_stage.rows_out = len(df)
         
         # Print summary statistics
         print("\nSentiment Distribution Summary:")
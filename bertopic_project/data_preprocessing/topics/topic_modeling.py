@@ -1,9 +1,16 @@
+import hashlib
 import pandas as pd
 import numpy as np
 from bertopic import BERTopic
 import nltk
 from nltk.corpus import stopwords
 import os
+import sys
+
+# Make the shared bertopic_project modules importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from data_preprocessing.schemas import SOCIAL_SCHEMA, TOPICS_SCHEMA
+from utils.profiling import profiler
 
 class TopicModeler:
     def __init__(self):
@@ -48,6 +55,29 @@ class TopicModeler:
             cleaned_texts.append(' '.join(words))
         return cleaned_texts
 
+    def _texts_hash(self, texts: list) -> str:
+        """Content hash of the texts the topics were fitted on"""
+        digest = hashlib.sha256()
+        for text in texts:
+            digest.update(text.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _load_cached_topics(self, cleaned_texts: list):
+        """Return the saved topics if they were fitted on these texts, else None"""
+        if not (os.path.exists(self.model_path) and os.path.exists(self.results_path)):
+            return None
+        results = np.load(self.results_path)
+        if 'input_hash' in results.files:
+            matches = str(results['input_hash']) == self._texts_hash(cleaned_texts)
+        else:
+            # Results saved before the hash was stored can only be checked by size
+            matches = len(results['topics']) == len(cleaned_texts)
+        if not matches:
+            print("Saved topics were fitted on different data, refitting...")
+            return None
+        return results['topics']
+
     def process_topics(self):
         """Process topics from social media data"""
         try:
@@ -56,52 +86,60 @@ class TopicModeler:
             if not os.path.exists(input_file):
                 raise FileNotFoundError(f"Input file not found at: {input_file}")
                 
-            df = pd.read_csv(input_file)
-            cleaned_texts = self._clean_texts(df['content'].tolist())
-            
-            # Check if model exists
-            if os.path.exists(self.model_path) and os.path.exists(self.results_path):
-                print("Loading existing model...")
-                topic_model = BERTopic.load(self.model_path)
-                results = np.load(self.results_path)
-                topics = results['topics']
-            else:
-                print("Creating new model...")
-                # Create and fit model
-                topic_model = BERTopic(nr_topics=15)
-                topics, probs = topic_model.fit_transform(cleaned_texts)
+            with profiler.stage("topic_modeling", export_as="topics") as pipeline_stage:
+                df = SOCIAL_SCHEMA.read(input_file)
+                with profiler.stage("clean_texts", rows_in=len(df)) as stage:
+                    cleaned_texts = self._clean_texts(df['content'].tolist())
+                    stage.rows_out = len(cleaned_texts)
                 
-                # Save model and results
-                topic_model.save(self.model_path)
-                np.savez(self.results_path, topics=topics, probs=probs)
-            
-            # Get topic information
-            topic_info = topic_model.get_topic_info()
-            
-            # Add representative words for each topic
-            topic_info['top_words'] = topic_info['Topic'].apply(
-                lambda x: ', '.join([word for word, _ in topic_model.get_topic(x)][:5])
-                if x != -1 else "No topic"
-            )
-            
-            # Save topic info
-            topic_info_path = os.path.join(self.output_dir, "topic_info.csv")
-            topic_info.to_csv(topic_info_path, index=False)
-            print(f"Topic information saved to: {topic_info_path}")
-            
-            # Create DataFrame with original content and assigned topics
-            df_with_topics = df.copy()
-            df_with_topics['topic'] = topics
-            
-            # Add topic description to each comment
-            topic_word_dict = {row['Topic']: row['top_words'] 
-                             for _, row in topic_info.iterrows()}
-            df_with_topics['topic_words'] = df_with_topics['topic'].map(topic_word_dict)
-            
-            # Save comments with their topics
-            comments_path = os.path.join(self.output_dir, "comments_with_topics.csv")
-            df_with_topics.to_csv(comments_path, index=False)
-            print(f"Comments with topics saved to: {comments_path}")
+                # Reuse the saved model only if it was fitted on this input
+                topics = self._load_cached_topics(cleaned_texts)
+                if topics is not None:
+                    print("Loading existing model...")
+                    with profiler.stage("load_model"):
+                        topic_model = BERTopic.load(self.model_path)
+                else:
+                    print("Creating new model...")
+                    # Create and fit model
+                    topic_model = BERTopic(nr_topics=15)
+                    with profiler.stage("fit_transform", rows_in=len(cleaned_texts)) as stage:
+                        topics, probs = topic_model.fit_transform(cleaned_texts)
+                        stage.rows_out = len(topics)
+                    
+                    # Save model and results
+                    topic_model.save(self.model_path)
+                    np.savez(self.results_path, topics=topics, probs=probs,
+                             input_hash=self._texts_hash(cleaned_texts))
+                
+                # Get topic information
+                topic_info = topic_model.get_topic_info()
+                
+                # Add representative words for each topic
+                topic_info['top_words'] = topic_info['Topic'].apply(
+                    lambda x: ', '.join([word for word, _ in topic_model.get_topic(x)][:5])
+                    if x != -1 else "No topic"
+                )
+                
+                # Save topic info
+                topic_info_path = os.path.join(self.output_dir, "topic_info.csv")
+                topic_info.to_csv(topic_info_path, index=False)
+                print(f"Topic information saved to: {topic_info_path}")
+                
+                # Create DataFrame with original content and assigned topics
+                df_with_topics = df.copy()
+                df_with_topics['topic'] = topics
+                
+                # Add topic description to each comment
+                topic_word_dict = {row['Topic']: row['top_words'] 
+                                 for _, row in topic_info.iterrows()}
+                df_with_topics['topic_words'] = df_with_topics['topic'].map(topic_word_dict)
+                
+                # Save comments with their topics
+                comments_path = os.path.join(self.output_dir, "comments_with_topics.csv")
+                with profiler.stage("write_csv", rows_in=len(df_with_topics)):
+                    TOPICS_SCHEMA.write(df_with_topics, comments_path)
+                print(f"Comments with topics saved to: {comments_path}")
+                pipeline_stage.rows_out = len(df_with_topics)
             
             return df_with_topics
             
@@ -112,11 +150,13 @@ class TopicModeler:
 if __name__ == "__main__":
     modeler = TopicModeler()
     df_with_topics = modeler.process_topics()
-    if df_with_topics is not None:
-        # Print sample of comments with their topics
-        print("\nSample of comments with assigned topics:")
-        sample = df_with_topics.sample(5)
-        for _, row in sample.iterrows():
-            print(f"\nSource: {row['source']}")
-            print(f"Topic: {row['topic']} (Keywords: {row['topic_words']})")
-            print(f"Content: {row['content'][:200]}...")
\ No newline at end of file
+    if df_with_topics is None:
+        # The pipeline runner only sees the exit code
+        sys.exit(1)
+    # Print sample of comments with their topics
+    print("\nSample of comments with assigned topics:")
+    sample = df_with_topics.sample(5)
+    for _, row in sample.iterrows():
+        print(f"\nSource: {row['source']}")
+        print(f"Topic: {row['topic']} (Keywords: {row['topic_words']})")
+        print(f"Content: {row['content'][:200]}...")
\ No newline at end of file
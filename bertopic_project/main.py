@@ -1,5 +1,5 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.openapi.docs import get_swagger_ui_html
 from typing import Dict
 import psutil
@@ -10,7 +10,12 @@ import numpy as np
 import pandas as pd
 
 # Import the scraper
-from data_extraction.scraping_yfinance.scraper import TeslaStockScraper
+from data_extraction.scraping_yfinance.scraper import TeslaStockScraper, DEFAULT_START_DATE, DEFAULT_END_DATE
+from api import aggregations
+from api.serialization import json_response, payload_cache
+from api.metrics import metrics, StageTimer
+from data_prediction import data_loader
+from utils.browser_pool import BrowserPool, PoolTimeoutError
 
 app = FastAPI(
     title="Tesla Data Analysis API",
@@ -18,6 +23,43 @@ app = FastAPI(
     version="1.0.0"
 )
 
+metrics.register_cache("aggregates", aggregations.aggregate_cache.stats)
+metrics.register_cache("json_payloads", payload_cache.stats)
+metrics.register_cache("model_inputs", data_loader.data_cache.stats)
+
+# Warm Chrome sessions reused across scraping requests
+browser_pool = BrowserPool(
+    factory=TeslaStockScraper.setup_driver,
+    max_size=int(os.getenv("BROWSER_POOL_SIZE", "2")),
+    max_uses=int(os.getenv("BROWSER_POOL_MAX_USES", "20")),
+    on_wait=lambda seconds: metrics.observe_pool_wait("stock_scraper", seconds),
+)
+metrics.register_pool("stock_scraper", browser_pool.stats)
+
+@app.on_event("shutdown")
+def close_browser_pool():
+    """Quit the pooled Chrome sessions when the API stops."""
+    browser_pool.close()
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record latency per route template and the number of in-flight requests."""
+    metrics.request_started()
+    start_time = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.request_finished(
+            route.path if route is not None else "unmatched",
+            request.method,
+            status,
+            time.perf_counter() - start_time,
+        )
+
 @app.get("/", tags=["General"])
 async def index():
     """
@@ -31,7 +73,12 @@ async def index():
         "endpoints": {
             "GET /": "This index page with API information",
             "GET /health": "Health check endpoint with system metrics",
-            "POST /api/scrape/tesla-stock": "Scrape Tesla stock data from Yahoo Finance"
+            "GET /metrics": "Prometheus metrics (request latency, pipeline stages, caches, browser pool)",
+            "POST /api/scrape/tesla-stock": "Scrape Tesla stock data from Yahoo Finance",
+            "GET /api/aggregates/tesla-stock/ohlc": "Daily or weekly OHLC bars of Tesla stock",
+            "GET /api/aggregates/social/daily": "Daily post counts and mean sentiment by source",
+            "GET /api/aggregates/topics": "Topic frequency over time",
+            "GET /api/data/model-input": "Stock history merged with the daily sentiment fed to the LSTM models"
         },
         "developer": "Your Name",
         "last_updated": "2024-02-02"
@@ -77,30 +124,67 @@ async def health_check():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
 
+@app.get("/metrics", tags=["System"], response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus metrics: per-route latency histograms, in-flight requests,
+    last pipeline stage timings and cache hit ratios.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/api/scrape/tesla-stock", tags=["Web Scraping"])
-async def scrape_tesla_stock():
+def scrape_tesla_stock(
+    start_date: str = DEFAULT_START_DATE,
+    end_date: str = DEFAULT_END_DATE,
+    method: str = "auto",
+    incremental: bool = False,
+):
     """
     Execute web scraping for Tesla stock data from Yahoo Finance.
+    Prices come from Yahoo's chart API over HTTP; the history page is only
+    rendered in a pooled Chrome session if that fails (or with method=selenium).
+    
+    Parameters:
+        start_date: First date to fetch (YYYY-MM-DD)
+        end_date: Date at which to stop, excluded (YYYY-MM-DD)
+        method: "auto", "http" or "selenium"
+        incremental: Only fetch the days after the last stored date and upsert them (dates are ignored)
     
     Returns:
         JSON: Scraped stock data or error message
     """
+    if method not in ("auto", "http", "selenium"):
+        raise HTTPException(status_code=400, detail="method must be 'auto', 'http' or 'selenium'")
+    # An incremental refresh starts from the last stored date, so the range is not used
+    if not incremental:
+        try:
+            if datetime.strptime(start_date, "%Y-%m-%d") >= datetime.strptime(end_date, "%Y-%m-%d"):
+                raise ValueError("start_date must be before end_date")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid date range: {str(e)}")
+
     try:
         # Initialize scraper
-        scraper = TeslaStockScraper()
-        
-        # Record start time
-        start_time = time.time()
-        
-        # Execute scraping
-        data = scraper.scrape_stock_data()
+        scraper = TeslaStockScraper(pool=browser_pool)
         
-        # Calculate execution time
-        execution_time = time.time() - start_time
+        # Execute scraping (timed and exported as the "scrape" stage)
+        with StageTimer("scrape") as timer:
+            if incremental:
+                data = scraper.refresh_stock_data(method=method)
+            else:
+                data = scraper.scrape_stock_data(start_date, end_date, method)
+            timer.rows = len(data) if data is not None else None
+        execution_time = timer.duration
         
+        if data is None and incremental:
+            return JSONResponse(content={
+                "status": "up_to_date",
+                "execution_time_seconds": round(execution_time, 2),
+                "data_info": {"rows": 0, "file_saved": scraper.output_file}
+            })
         if data is not None:
             # Get file path where data was saved
-            file_path = os.path.join(scraper.output_dir, "tesla_stock_history.csv")
+            file_path = scraper.output_file
             
             # Prepare response
             response = {
@@ -122,6 +206,8 @@ async def scrape_tesla_stock():
         else:
             raise HTTPException(status_code=500, detail="Failed to fetch Tesla stock data")
             
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=f"Scraping failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scraping failed: {str(e)}")
 
@@ -142,7 +228,7 @@ async def get_config():
         "timeout_seconds": 30
     }
 
-def read_csv_file(file_path: str):
+def read_csv_file(file_path: str) -> pd.DataFrame:
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail=f"Fichier non trouvé: {file_path}")
 
@@ -153,38 +239,102 @@ def read_csv_file(file_path: str):
         df = df.fillna(0)  # Remplace les NaN par 0
         df = df.replace([np.inf, -np.inf], 0)  # Remplace les valeurs infinies par 0
 
-        return df.to_dict(orient="records")
+        return df
     except Exception as e:
         import traceback
         error_msg = traceback.format_exc()
         raise HTTPException(status_code=500, detail=f"Erreur de lecture du fichier : {error_msg}")
 
+def csv_response(request: Request, file_path: str):
+    """
+    Retourne le contenu d'un fichier CSV en JSON (ETag, 304 et compression gérés).
+    """
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail=f"Fichier non trouvé: {file_path}")
+    return json_response(request, ("csv", file_path), [file_path], lambda: read_csv_file(file_path))
+
 # Endpoint pour récupérer les données de Reddit
 @app.get("/api/data/reddit", tags=["Data"])
-async def get_reddit_data():
+async def get_reddit_data(request: Request):
     """
     Retourne les données du fichier reddit_data.csv en JSON.
     """
     file_path = "bertopic_project/data_extraction/raw/reddit_data.csv"
-    return read_csv_file(file_path)
+    return csv_response(request, file_path)
 
 # Endpoint pour récupérer les données boursières de Tesla
 @app.get("/api/data/tesla-stock", tags=["Data"])
-async def get_tesla_stock_data():
+async def get_tesla_stock_data(request: Request):
     """
     Retourne les données du fichier tesla_stock_history.csv en JSON.
     """
     file_path = "bertopic_project/data_extraction/raw/tesla_stock_history.csv"
-    return read_csv_file(file_path)
+    return csv_response(request, file_path)
 
 # Endpoint pour récupérer les tweets sur Tesla
 @app.get("/api/data/tesla-tweets", tags=["Data"])
-async def get_tesla_tweets_data():
+async def get_tesla_tweets_data(request: Request):
     """
     Retourne les données du fichier Tweets_TSLA.csv en JSON.
     """
     file_path = "bertopic_project/data_extraction/raw/Tweets_TSLA.csv"
-    return read_csv_file(file_path)
+    return csv_response(request, file_path)
+
+def aggregate_response(request: Request, compute, file_path: str, *args):
+    """Run an aggregation and serve its (small) result as JSON."""
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail=f"Fichier non trouvé: {file_path}")
+    try:
+        return json_response(
+            request, (compute.__name__, file_path) + args, [file_path],
+            lambda: compute(file_path, *args),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Endpoints d'agrégation calculés côté serveur
+@app.get("/api/aggregates/tesla-stock/ohlc", tags=["Aggregates"])
+async def get_tesla_stock_ohlc(request: Request, freq: str = "D"):
+    """
+    Retourne les barres OHLC quotidiennes (freq=D) ou hebdomadaires (freq=W) de Tesla.
+    """
+    file_path = "bertopic_project/data_extraction/raw/tesla_stock_history.csv"
+    return aggregate_response(request, aggregations.stock_ohlc, file_path, freq)
+
+@app.get("/api/aggregates/social/daily", tags=["Aggregates"])
+async def get_social_daily(request: Request):
+    """
+    Retourne le nombre de posts et le sentiment moyen par jour et par source.
+    """
+    file_path = "bertopic_project/data_preprocessing/processed_data/comments_with_sentiments_without_topics.csv"
+    return aggregate_response(request, aggregations.social_daily, file_path)
+
+@app.get("/api/aggregates/topics", tags=["Aggregates"])
+async def get_topic_frequency(request: Request, freq: str = "D"):
+    """
+    Retourne la fréquence de chaque topic par jour (freq=D) ou par semaine (freq=W).
+    """
+    file_path = "bertopic_project/data_preprocessing/processed_data/comments_with_topics.csv"
+    return aggregate_response(request, aggregations.topic_frequency, file_path, freq)
+
+@app.get("/api/data/model-input", tags=["Data"])
+async def get_model_input(request: Request, with_topics: bool = False):
+    """
+    Retourne les données d'entrée des modèles LSTM : historique boursier et sentiment quotidien.
+    """
+    stock_file = data_loader.STOCK_FILE
+    sentiment_file = data_loader.SENTIMENT_FILE_WITH_TOPICS if with_topics else data_loader.SENTIMENT_FILE
+    for file_path in (stock_file, sentiment_file):
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail=f"Fichier non trouvé: {file_path}")
+
+    def build_frame() -> pd.DataFrame:
+        # Same cached frame as the predictors use
+        df = data_loader.load_merged_data(stock_file, sentiment_file, with_topics=with_topics)
+        df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
+        return df
+
+    return json_response(request, ("model_input", with_topics), [stock_file, sentiment_file], build_frame)
 
 import subprocess
 
@@ -194,7 +344,7 @@ async def get_predictions():
     Exécute le script de prédiction et retourne les prédictions stockées dans le fichier future_predictions.csv en JSON.
     """
     file_path = "bertopic_project/data_prediction/future_predictions_v2.csv"
-    model_script = "bertopic_project/data_prediction/modele_v2.py"
+    model_script = "bertopic_project/data_prediction/train_runner.py"
 
     # Exécuter le script pour générer les nouvelles prédictions
     try:
@@ -220,7 +370,7 @@ async def get_predictions():
     Exécute le script de prédiction et retourne les prédictions stockées dans le fichier future_predictions.csv en JSON.
     """
     file_path = "bertopic_project/data_prediction/future_predictions_v2_with_topics.csv"
-    model_script = "bertopic_project/data_prediction/modele_v2.py"
+    model_script = "bertopic_project/data_prediction/train_runner.py"
 
     # Exécuter le script pour générer les nouvelles prédictions
     try:
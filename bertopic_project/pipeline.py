@@ -0,0 +1,265 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+RAW_DIR = os.path.join(PROJECT_DIR, "data_extraction", "raw")
+PROCESSED_DIR = os.path.join(PROJECT_DIR, "data_preprocessing", "processed_data")
+PREDICTION_DIR = os.path.join(PROJECT_DIR, "data_prediction")
+STATE_FILE = os.path.join(PROCESSED_DIR, "pipeline_state.json")
+
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    args: List[str] = field(default_factory=list)
+    # Stages that talk to external services only run when scraping is requested
+    external: bool = False
+
+
+STAGES = [
+    Stage(
+        name="scrape_stock",
+        script=os.path.join(PROJECT_DIR, "data_extraction", "scraping_yfinance", "scraper.py"),
+        outputs=[os.path.join(RAW_DIR, "tesla_stock_history.csv")],
+        # Only fetch the days after the last stored one
+        args=["--incremental"],
+        external=True,
+    ),
+    Stage(
+        name="scrape_reddit",
+        script=os.path.join(PROJECT_DIR, "data_extraction", "scraping_reddit", "scraper_praw.py"),
+        outputs=[os.path.join(RAW_DIR, "reddit_data.csv")],
+        external=True,
+    ),
+    Stage(
+        name="preprocess_social",
+        script=os.path.join(PROJECT_DIR, "data_preprocessing", "data_preping", "reddit_X_prep.py"),
+        inputs=[os.path.join(RAW_DIR, "reddit_data.csv"), os.path.join(RAW_DIR, "Tweets_TSLA.csv")],
+        outputs=[os.path.join(PROCESSED_DIR, "processed_social_data.csv")],
+    ),
+    Stage(
+        name="preprocess_stock",
+        script=os.path.join(PROJECT_DIR, "data_preprocessing", "data_preping", "yfinance_prep.py"),
+        inputs=[os.path.join(RAW_DIR, "tesla_stock_history.csv")],
+        outputs=[os.path.join(PROCESSED_DIR, "processed_stock_data.csv")],
+        # Append new days instead of recomputing the whole history
+        args=["--incremental"],
+    ),
+    Stage(
+        name="topics",
+        script=os.path.join(PROJECT_DIR, "data_preprocessing", "topics", "topic_modeling.py"),
+        inputs=[os.path.join(PROCESSED_DIR, "processed_social_data.csv")],
+        outputs=[
+            os.path.join(PROCESSED_DIR, "comments_with_topics.csv"),
+            os.path.join(PROCESSED_DIR, "topic_info.csv"),
+        ],
+    ),
+    Stage(
+        name="sentiment",
+        script=os.path.join(PROJECT_DIR, "data_preprocessing", "sentiment_analysis", "vader_finbert_without_topics.py"),
+        inputs=[os.path.join(PROCESSED_DIR, "processed_social_data.csv")],
+        outputs=[os.path.join(PROCESSED_DIR, "comments_with_sentiments_without_topics.csv")],
+    ),
+    Stage(
+        name="sentiment_with_topics",
+        script=os.path.join(PROJECT_DIR, "data_preprocessing", "sentiment_analysis", "vader_finbert_with_topics.py"),
+        inputs=[os.path.join(PROCESSED_DIR, "comments_with_topics.csv")],
+        outputs=[os.path.join(PROCESSED_DIR, "comments_with_sentiments_with_topics.csv")],
+    ),
+    Stage(
+        name="predict",
+        script=os.path.join(PREDICTION_DIR, "train_runner.py"),
+        inputs=[
+            os.path.join(PROCESSED_DIR, "processed_stock_data.csv"),
+            os.path.join(PROCESSED_DIR, "comments_with_sentiments_without_topics.csv"),
+            os.path.join(PROCESSED_DIR, "comments_with_sentiments_with_topics.csv"),
+        ],
+        outputs=[
+            os.path.join(PREDICTION_DIR, "future_predictions_v2.csv"),
+            os.path.join(PREDICTION_DIR, "future_predictions_v2_with_topics.csv"),
+        ],
+    ),
+]
+
+
+class PipelineRunner:
+    def __init__(self, stages: List[Stage], state_file: str = STATE_FILE, max_workers: int = 3):
+        """
+        Run pipeline stages as a DAG derived from their input/output files.
+
+        A stage depends on every stage producing one of its inputs. Stages
+        whose inputs (and script) have the same content hash as on their last
+        successful run, and whose outputs still exist, are skipped.
+
+        Parameters:
+        - stages: Stages to consider
+        - state_file: JSON file storing the hashes of the last successful runs
+        - max_workers: Maximum number of stages running at the same time
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.state = self._load_state()
+        self.producers = {output: stage.name for stage in stages for output in stage.outputs}
+        self.dependencies = {
+            stage.name: sorted({self.producers[path] for path in stage.inputs if path in self.producers})
+            for stage in stages
+        }
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"files": {}, "stages": {}}
+
+    def _save_state(self) -> None:
+        directory = os.path.dirname(self.state_file)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_file)
+
+    def file_hash(self, file_path: str) -> Optional[str]:
+        """SHA-256 of a file, reusing the previous hash when mtime and size are unchanged"""
+        if not os.path.exists(file_path):
+            return None
+        stat = os.stat(file_path)
+        version = [stat.st_mtime_ns, stat.st_size]
+        cached = self.state["files"].get(file_path)
+        if cached and cached["version"] == version:
+            return cached["sha256"]
+
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        self.state["files"][file_path] = {"version": version, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+    def stage_fingerprint(self, stage: Stage) -> Dict[str, Optional[str]]:
+        """Content hashes of a stage's script and inputs"""
+        return {path: self.file_hash(path) for path in [stage.script] + stage.inputs}
+
+    def is_up_to_date(self, stage: Stage, fingerprint: Dict[str, Optional[str]]) -> bool:
+        if stage.external:
+            return False
+        previous = self.state["stages"].get(stage.name)
+        outputs_exist = all(os.path.exists(path) for path in stage.outputs)
+        return outputs_exist and previous is not None and previous["inputs"] == fingerprint
+
+    def _run_stage(self, stage: Stage) -> float:
+        print(f"[pipeline] Running {stage.name}...")
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, stage.script] + stage.args, check=True, cwd=os.path.dirname(stage.script))
+        return time.perf_counter() - start_time
+
+    def run(self, selected: List[str], force: bool = False, dry_run: bool = False) -> Dict[str, Dict]:
+        """
+        Run the selected stages in dependency order, in parallel where possible.
+
+        Parameters:
+        - selected: Names of the stages to consider (dependencies outside it are assumed done)
+        - force: Run every selected stage even if its inputs did not change
+        - dry_run: Only report which stages would run
+
+        Returns:
+        - Dictionary mapping each stage to its status and duration
+        """
+        pending = [name for name in self.stages if name in selected]
+        results: Dict[str, Dict] = {}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name in list(pending):
+                    deps = [dep for dep in self.dependencies[name] if dep in selected]
+                    if any(results.get(dep, {}).get("status") in ("failed", "blocked") for dep in deps):
+                        results[name] = {"status": "blocked", "seconds": 0.0}
+                        pending.remove(name)
+                        continue
+                    if not all(dep in results for dep in deps):
+                        continue
+
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    fingerprint = self.stage_fingerprint(stage)
+                    upstream_changes = any(results[dep]["status"] in ("ran", "would run") for dep in deps)
+                    if not force and not upstream_changes and self.is_up_to_date(stage, fingerprint):
+                        results[name] = {"status": "skipped", "seconds": 0.0}
+                    elif dry_run:
+                        results[name] = {"status": "would run", "seconds": 0.0}
+                    else:
+                        running[executor.submit(self._run_stage, stage)] = (name, fingerprint)
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, fingerprint = running.pop(future)
+                    try:
+                        seconds = future.result()
+                    except subprocess.CalledProcessError as e:
+                        print(f"[pipeline] {name} failed: {e}")
+                        results[name] = {"status": "failed", "seconds": 0.0}
+                        continue
+                    results[name] = {"status": "ran", "seconds": round(seconds, 2)}
+                    self.state["stages"][name] = {"inputs": fingerprint, "finished_at": time.time()}
+                    self._save_state()
+
+        if not dry_run:
+            # Persist hashes computed for skipped stages too
+            self._save_state()
+        return results
+
+
+def print_summary(results: Dict[str, Dict], total_seconds: float) -> None:
+    """Print a per-stage timing summary"""
+    print("\nPipeline summary:")
+    print(f"{'stage':<24}{'status':<12}{'seconds':>10}")
+    for name, result in results.items():
+        print(f"{name:<24}{result['status']:<12}{result['seconds']:>10.2f}")
+    print(f"{'total (wall)':<36}{total_seconds:>10.2f}")
+
+
+def main():
+    """Main function to run the pipeline"""
+    stage_names = [stage.name for stage in STAGES]
+    parser = argparse.ArgumentParser(description="Run the data pipeline, skipping stages whose inputs did not change")
+    parser.add_argument("--only", nargs="+", choices=stage_names, help="Run only these stages")
+    parser.add_argument("--scrape", action="store_true", help="Also run the stock and Reddit scrapers")
+    parser.add_argument("--force", action="store_true", help="Run stages even if their inputs did not change")
+    parser.add_argument("--workers", type=int, default=3, help="Maximum number of stages running in parallel")
+    parser.add_argument("--dry-run", action="store_true", help="Only show which stages would run")
+    args = parser.parse_args()
+
+    if args.only:
+        selected = args.only
+    else:
+        selected = [stage.name for stage in STAGES if args.scrape or not stage.external]
+
+    runner = PipelineRunner(STAGES, max_workers=args.workers)
+    start_time = time.perf_counter()
+    results = runner.run(selected, force=args.force, dry_run=args.dry_run)
+    print_summary(results, time.perf_counter() - start_time)
+
+    if any(result["status"] in ("failed", "blocked") for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no browser session becomes available within the checkout timeout"""
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_size: int = 2,
+        max_uses: int = 20,
+        checkout_timeout: float = 120.0,
+        on_wait: Optional[Callable[[float], None]] = None,
+    ):
+        """
+        Bounded pool of warm WebDriver sessions.
+
+        Sessions are created lazily by the factory, handed out with checkout()
+        and given back with release(). A session is health-checked before each
+        checkout and quit after max_uses checkouts, so long-running processes
+        do not accumulate leaked memory in Chrome.
+
+        Parameters:
+        - factory: Zero-argument callable launching a new driver
+        - max_size: Maximum number of live sessions (idle + checked out)
+        - max_uses: Number of checkouts after which a session is recycled
+        - checkout_timeout: Seconds to wait for a free session before giving up
+        - on_wait: Callback receiving the seconds each checkout waited
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.checkout_timeout = checkout_timeout
+        self.on_wait = on_wait
+        self._idle: List[Any] = []
+        self._uses: Dict[int, int] = {}
+        self._in_use = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self.created = 0
+        self.recycled = 0
+        self.discarded = 0
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @staticmethod
+    def is_healthy(driver: Any) -> bool:
+        """Return True if the browser still answers WebDriver commands"""
+        try:
+            driver.execute_script("return 1;")
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(driver: Any) -> None:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def checkout(self, timeout: Optional[float] = None) -> Any:
+        """
+        Take a session from the pool, launching one if the pool is not full.
+
+        Parameters:
+        - timeout: Seconds to wait for a free session (defaults to checkout_timeout)
+
+        Returns:
+        - A healthy driver, owned by the caller until release()
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        start_time = time.perf_counter()
+        deadline = start_time + timeout
+
+        with self._condition:
+            while True:
+                if self._idle:
+                    driver = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.max_size:
+                    driver = None
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise PoolTimeoutError(f"No browser session available after {timeout:g}s")
+                self._condition.wait(remaining)
+
+        # Health checks and browser startup happen outside the lock
+        try:
+            if driver is not None and not self.is_healthy(driver):
+                self._forget(driver)
+                self._quit(driver)
+                with self._condition:
+                    self.discarded += 1
+                driver = None
+            if driver is None:
+                driver = self.factory()
+                with self._condition:
+                    self.created += 1
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+        waited = time.perf_counter() - start_time
+        with self._condition:
+            self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        if self.on_wait is not None:
+            self.on_wait(waited)
+        return driver
+
+    def _forget(self, driver: Any) -> None:
+        with self._condition:
+            self._uses.pop(id(driver), None)
+
+    def release(self, driver: Any, discard: bool = False) -> None:
+        """
+        Give a session back to the pool.
+
+        Parameters:
+        - driver: Driver obtained from checkout()
+        - discard: Quit the session instead of keeping it (e.g. after a crash)
+        """
+        with self._condition:
+            worn_out = self._uses.get(id(driver), 0) >= self.max_uses
+            keep = not discard and not worn_out and not self._closed
+            if keep:
+                self._idle.append(driver)
+            else:
+                self._uses.pop(id(driver), None)
+                if worn_out:
+                    self.recycled += 1
+                else:
+                    self.discarded += 1
+            self._in_use -= 1
+            self._condition.notify()
+        if not keep:
+            self._quit(driver)
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None):
+        """Check out a session for the duration of a with-block; a session broken by the block is discarded"""
+        driver = self.checkout(timeout)
+        failed = True
+        try:
+            yield driver
+            failed = False
+        finally:
+            self.release(driver, discard=failed and not self.is_healthy(driver))
+
+    def close(self) -> None:
+        """Quit every idle session; sessions still checked out are quit when released"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            for driver in idle:
+                self._uses.pop(id(driver), None)
+        for driver in idle:
+            self._quit(driver)
+
+    def stats(self) -> Dict[str, float]:
+        """Return pool occupancy, lifecycle counters and checkout wait times"""
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "created": self.created,
+                "recycled": self.recycled,
+                "discarded": self.discarded,
+                "checkouts": self.checkouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 4),
+                "wait_seconds_max": round(self.wait_seconds_max, 4),
+            }
@@ -0,0 +1,72 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Tuple
+
+
+def file_version(file_path: str) -> Tuple[int, int]:
+    """Return a cheap version stamp (mtime in ns, size in bytes) for a file"""
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class FileVersionCache:
+    def __init__(self, max_entries: int = 64):
+        """
+        In-process cache for values derived from files on disk.
+
+        Entries are keyed by a caller supplied key plus the version of every
+        input file, so a rewritten file automatically invalidates the
+        results that were computed from it.
+        """
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[Tuple, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, file_paths: Iterable[str], compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, recomputing it when any input file changed.
+
+        Parameters:
+        - key: Identifier of the derived value (e.g. aggregate name and parameters)
+        - file_paths: Files the value is computed from
+        - compute: Zero-argument callable producing the value
+
+        Returns:
+        - The cached or freshly computed value
+        """
+        versions = tuple(file_version(path) for path in file_paths)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                # Drop the oldest entry (dicts keep insertion order)
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (versions, value)
+
+        return value
+
+    def clear(self) -> None:
+        """Remove every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the hit ratio"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,176 @@
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+MULTIPLICITY_COLUMN = "multiplicity"
+
+# Universal hashing modulo a Mersenne prime, as in the classic MinHash construction
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class NearDuplicateCollapser:
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ):
+        """
+        Collapse near-duplicate texts (reposts, copy-paste spam) with MinHash and LSH.
+
+        Each text is reduced to a MinHash signature of its character shingles.
+        Signatures are split into bands, and texts sharing a band bucket become
+        candidates. A candidate joins a cluster when the estimated Jaccard
+        similarity to the cluster's representative (its first text) reaches
+        the threshold. Comparing with the representative only keeps clusters
+        from chaining through intermediate texts.
+
+        Parameters:
+        - threshold: Minimum estimated Jaccard similarity to be a duplicate
+        - num_perm: Number of hash functions in a signature
+        - bands: Number of LSH bands (num_perm must be a multiple of it)
+        - shingle_size: Length of the character shingles
+        - seed: Seed of the hash functions
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        text = " ".join(text.lower().split())
+        k = self.shingle_size
+        shingles = {text[i:i + k] for i in range(max(len(text) - k + 1, 1))}
+        return np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of a text"""
+        hashes = self._shingle_hashes(text)
+        permuted = (self._a * hashes + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1)
+
+    def cluster(self, texts: Sequence[str], groups: Sequence = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Assign every text to a cluster of near-duplicates.
+
+        Parameters:
+        - texts: Texts to cluster
+        - groups: Optional group key per text; texts of different groups are never merged
+
+        Returns:
+        - Index of each text's representative (itself for representatives)
+        - Multiplicity of each text (cluster size for representatives, 0 otherwise)
+        """
+        n = len(texts)
+        groups = [None] * n if groups is None else groups
+        representative = np.arange(n)
+        multiplicity = np.ones(n, dtype=np.int32)
+        signatures: Dict[int, np.ndarray] = {}
+        buckets: Dict[Tuple, List[int]] = defaultdict(list)
+
+        for i, (text, group) in enumerate(zip(texts, groups)):
+            sig = self.signature(text)
+            keys = [
+                (group, band, sig[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)
+            ]
+
+            candidates = {rep for key in keys for rep in buckets.get(key, ())}
+            best, best_similarity = None, self.threshold
+            for rep in sorted(candidates):
+                similarity = np.mean(signatures[rep] == sig)
+                if similarity >= best_similarity:
+                    best, best_similarity = rep, similarity
+
+            if best is None:
+                # New representative: only representatives are indexed
+                signatures[i] = sig
+                for key in keys:
+                    buckets[key].append(i)
+            else:
+                representative[i] = best
+                multiplicity[best] += 1
+                multiplicity[i] = 0
+
+        return representative, multiplicity
+
+    def collapse(self, df: pd.DataFrame, text_column: str = "content", group_columns: Sequence[str] = ()) -> pd.DataFrame:
+        """
+        Keep one row per cluster of near-duplicates, with its cluster size.
+
+        Rows that already carry a multiplicity (from an earlier collapse) add it
+        to their cluster instead of counting once. Rows are clustered sorted by
+        group and text, so the clusters do not depend on the order of the rows.
+
+        Parameters:
+        - df: Rows to collapse
+        - text_column: Column holding the texts
+        - group_columns: Columns whose values must match for rows to be merged (e.g. date and source)
+
+        Returns:
+        - Representatives in their original order, with a multiplicity column
+        """
+        if df.empty:
+            return df.assign(**{MULTIPLICITY_COLUMN: np.int32(1)})
+
+        # Greedy clustering depends on the order texts are seen in
+        keys = df[list(group_columns) + [text_column]].reset_index(drop=True)
+        order = keys.sort_values(list(keys.columns), kind="stable").index.to_numpy()
+        keys = keys.iloc[order]
+        groups = list(keys[list(group_columns)].itertuples(index=False, name=None)) if group_columns else None
+        sorted_representative, _ = self.cluster(keys[text_column].tolist(), groups)
+        representative = np.empty(len(df), dtype=np.int64)
+        representative[order] = order[sorted_representative]
+
+        weights = post_weights(df).to_numpy()
+        totals = np.bincount(representative, weights=weights, minlength=len(df)).astype(np.int32)
+        keep = representative == np.arange(len(df))
+
+        collapsed = df[keep].copy()
+        collapsed[MULTIPLICITY_COLUMN] = totals[keep]
+        return collapsed
+
+
+def post_weights(df: pd.DataFrame) -> pd.Series:
+    """Number of posts each row stands for (1 for files written before deduplication)"""
+    if MULTIPLICITY_COLUMN in df.columns:
+        return df[MULTIPLICITY_COLUMN].fillna(1).astype(np.int32)
+    return pd.Series(np.int32(1), index=df.index)
+
+
+def weighted_daily_mean(df: pd.DataFrame, value_column: str, date_column: str = "date") -> pd.DataFrame:
+    """
+    Daily mean of a column, each row weighted by the number of posts it stands for.
+
+    Parameters:
+    - df: Posts with a date and a value column
+    - value_column: Column to average
+    - date_column: Column to group by
+
+    Returns:
+    - DataFrame with the date and the weighted mean (same names as the inputs)
+    """
+    # Missing values are skipped, as in an unweighted mean
+    weights = post_weights(df).where(df[value_column].notna(), 0)
+    frame = pd.DataFrame({
+        date_column: df[date_column],
+        "_weighted": (df[value_column] * weights).fillna(0),
+        "_weight": weights,
+    })
+    sums = frame.groupby(date_column)[["_weighted", "_weight"]].sum()
+    return (sums["_weighted"] / sums["_weight"]).rename(value_column).reset_index()
@@ -0,0 +1,286 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Union
+
+import psutil
+
+from utils.stage_metrics import record_stage
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "traces")
+
+
+def _process_peak_rss_mb() -> float:
+    """Peak resident set size of the whole process so far (not of one stage), in MB"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return peak / (1024 ** 2) if sys.platform == "darwin" else peak / 1024
+    return _rss_mb()
+
+
+def _rss_mb() -> float:
+    """Current resident set size of the process, in MB"""
+    return psutil.Process().memory_info().rss / (1024 ** 2)
+
+
+class StageRecord:
+    """Measurements of a single stage or sub-step"""
+
+    __slots__ = (
+        "name", "parent", "depth", "thread_id", "start", "wall_seconds",
+        "cpu_seconds", "rss_start_mb", "rss_end_mb", "rss_delta_mb",
+        "peak_rss_mb", "process_peak_rss_mb", "rows_in", "rows_out",
+    )
+
+    def __init__(self, name: str, parent: Optional[str], depth: int, rows_in: Optional[int] = None):
+        self.name = name
+        self.parent = parent
+        self.depth = depth
+        self.thread_id = threading.get_ident()
+        self.start = 0.0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        # RSS when the stage starts and ends, and the highest RSS sampled while
+        # it ran. Spikes shorter than the sampling interval can be missed; the
+        # process-wide peak so far (ru_maxrss) does not miss them, but stages
+        # after the heaviest one all report it
+        self.rss_start_mb = 0.0
+        self.rss_end_mb = 0.0
+        self.rss_delta_mb = 0.0
+        self.peak_rss_mb = 0.0
+        self.process_peak_rss_mb = 0.0
+        self.rows_in = rows_in
+        self.rows_out = None
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class StageProfiler:
+    def __init__(
+        self,
+        enabled: bool = False,
+        output_path: Optional[str] = None,
+        trace_format: str = "json",
+        profile_stage: Optional[str] = None,
+        profile_tool: str = "cprofile",
+        rss_sample_interval: float = 0.01,
+    ):
+        """
+        Opt-in instrumentation of pipeline stages and their sub-steps.
+
+        Parameters:
+        - enabled: Record stages (when False, stage() only times stages exported to /metrics)
+        - output_path: Trace file written by dump() (defaults to bertopic_project/traces/)
+        - trace_format: "json" for a flat list of records, "chrome" for chrome://tracing
+        - profile_stage: Name of a stage to run under a sampling/deterministic profiler
+        - profile_tool: "cprofile" or "pyinstrument" (if installed)
+        - rss_sample_interval: Seconds between two RSS samples of the running stages
+        """
+        if trace_format not in ("json", "chrome"):
+            raise ValueError(f"Unsupported trace format '{trace_format}', expected 'json' or 'chrome'")
+        self.enabled = enabled
+        self.output_path = output_path
+        self.trace_format = trace_format
+        self.profile_stage = profile_stage
+        self.profile_tool = profile_tool
+        self.rss_sample_interval = rss_sample_interval
+        self.records: List[StageRecord] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        # Stages (of any thread) whose peak RSS is being sampled
+        self._running: List[StageRecord] = []
+        self._sampler: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "StageProfiler":
+        """
+        Build a profiler from environment variables:
+        BERTOPIC_PROFILE=1, BERTOPIC_PROFILE_OUTPUT, BERTOPIC_PROFILE_FORMAT (json|chrome),
+        BERTOPIC_PROFILE_STAGE and BERTOPIC_PROFILE_TOOL (cprofile|pyinstrument)
+        """
+        return cls(
+            enabled=os.getenv("BERTOPIC_PROFILE", "0").lower() in ("1", "true", "yes"),
+            output_path=os.getenv("BERTOPIC_PROFILE_OUTPUT"),
+            trace_format=os.getenv("BERTOPIC_PROFILE_FORMAT", "json"),
+            profile_stage=os.getenv("BERTOPIC_PROFILE_STAGE"),
+            profile_tool=os.getenv("BERTOPIC_PROFILE_TOOL", "cprofile"),
+        )
+
+    def _stack(self) -> List[StageRecord]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _start_sampling(self, record: StageRecord) -> None:
+        with self._lock:
+            self._running.append(record)
+            # One sampler thread serves every running stage, it exits when none is left
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_rss, name="rss-sampler", daemon=True)
+                self._sampler.start()
+
+    def _stop_sampling(self, record: StageRecord) -> None:
+        with self._lock:
+            self._running.remove(record)
+
+    def _sample_rss(self) -> None:
+        while True:
+            rss = _rss_mb()
+            with self._lock:
+                if not self._running:
+                    self._sampler = None
+                    return
+                for record in self._running:
+                    record.peak_rss_mb = max(record.peak_rss_mb, rss)
+            time.sleep(self.rss_sample_interval)
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None, export_as: Union[str, Sequence[str], None] = None):
+        """
+        Measure a stage; set record.rows_out inside the block to report output rows.
+
+        Parameters:
+        - name: Stage or sub-step name (e.g. "clean_text", "fit_transform")
+        - rows_in: Number of input rows, if known
+        - export_as: Pipeline stage name (or names) under which the wall time is exported to /metrics
+        """
+        stack = self._stack()
+        record = StageRecord(name, stack[-1].name if stack else None, len(stack), rows_in)
+
+        if not self.enabled and export_as is None:
+            yield record
+            return
+
+        active_profiler = self._start_profiler() if self.enabled and name == self.profile_stage else None
+        stack.append(record)
+        if self.enabled:
+            record.rss_start_mb = record.peak_rss_mb = _rss_mb()
+            self._start_sampling(record)
+        record.start = time.perf_counter()
+        cpu_start = time.process_time()
+        succeeded = False
+        try:
+            yield record
+            succeeded = True
+        finally:
+            record.wall_seconds = time.perf_counter() - record.start
+            record.cpu_seconds = time.process_time() - cpu_start
+            stack.pop()
+            if active_profiler is not None:
+                self._stop_profiler(active_profiler, name)
+            if self.enabled:
+                self._stop_sampling(record)
+                rss_end = _rss_mb()
+                record.rss_start_mb = round(record.rss_start_mb, 1)
+                record.rss_end_mb = round(rss_end, 1)
+                record.rss_delta_mb = round(record.rss_end_mb - record.rss_start_mb, 1)
+                record.peak_rss_mb = round(max(record.peak_rss_mb, rss_end), 1)
+                record.process_peak_rss_mb = round(_process_peak_rss_mb(), 1)
+                with self._lock:
+                    self.records.append(record)
+            if export_as is not None and succeeded:
+                for stage_name in [export_as] if isinstance(export_as, str) else export_as:
+                    record_stage(stage_name, record.wall_seconds, record.rows_out)
+
+    def _start_profiler(self):
+        if self.profile_tool == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("[profile] pyinstrument is not installed, falling back to cProfile")
+            else:
+                profiler = Profiler()
+                profiler.start()
+                return profiler
+
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profiler(self, profiler, name: str) -> None:
+        os.makedirs(TRACES_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if hasattr(profiler, "output_html"):  # pyinstrument
+            profiler.stop()
+            path = os.path.join(TRACES_DIR, f"{name}_{stamp}.html")
+            with open(path, "w") as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            path = os.path.join(TRACES_DIR, f"{name}_{stamp}.prof")
+            profiler.dump_stats(path)
+        print(f"[profile] Profile of stage '{name}' saved to: {path}")
+
+    def _default_output_path(self) -> str:
+        script = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+        suffix = "trace.json" if self.trace_format == "chrome" else "stages.json"
+        return os.path.join(TRACES_DIR, f"{script}_{time.strftime('%Y%m%d-%H%M%S')}_{suffix}")
+
+    def to_trace(self) -> Dict:
+        """Return the recorded stages in the configured trace format"""
+        with self._lock:
+            records = sorted(self.records, key=lambda r: r.start)
+
+        if self.trace_format == "chrome":
+            pid = os.getpid()
+            return {
+                "traceEvents": [
+                    {
+                        "name": r.name,
+                        "cat": "stage",
+                        "ph": "X",
+                        "ts": round((r.start - self._origin) * 1e6),
+                        "dur": round(r.wall_seconds * 1e6),
+                        "pid": pid,
+                        "tid": r.thread_id,
+                        "args": {
+                            "cpu_seconds": round(r.cpu_seconds, 4),
+                            "rss_delta_mb": r.rss_delta_mb,
+                            "peak_rss_mb": r.peak_rss_mb,
+                            "process_peak_rss_mb": r.process_peak_rss_mb,
+                            "rows_in": r.rows_in,
+                            "rows_out": r.rows_out,
+                        },
+                    }
+                    for r in records
+                ],
+                "displayTimeUnit": "ms",
+            }
+
+        stages = []
+        for r in records:
+            entry = r.to_dict()
+            entry["start"] = round(r.start - self._origin, 6)
+            entry["wall_seconds"] = round(r.wall_seconds, 6)
+            entry["cpu_seconds"] = round(r.cpu_seconds, 6)
+            stages.append(entry)
+        return {"pid": os.getpid(), "argv": sys.argv, "stages": stages}
+
+    def dump(self) -> Optional[str]:
+        """Write the recorded trace to disk and return its path (None when nothing was recorded)"""
+        if not self.enabled or not self.records:
+            return None
+        path = self.output_path or self._default_output_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_trace(), f, indent=2)
+        print(f"[profile] Stage trace saved to: {path}")
+        return path
+
+
+# Process-wide profiler, configured from the environment and dumped at exit
+profiler = StageProfiler.from_env()
+atexit.register(profiler.dump)
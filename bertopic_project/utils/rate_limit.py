@@ -0,0 +1,53 @@
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        """
+        Thread-safe token bucket shared by every worker calling the same API.
+
+        Parameters:
+        - rate: Tokens added per second (sustained requests per second)
+        - capacity: Maximum number of tokens, i.e. the largest burst allowed
+        """
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be positive and capacity at least 1")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.wait_seconds = 0.0
+
+    @classmethod
+    def per_minute(cls, calls: int, burst: int = 10) -> "TokenBucket":
+        """Bucket allowing `calls` requests per minute with bursts of at most `burst`"""
+        return cls(rate=calls / 60.0, capacity=min(burst, calls))
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until `tokens` are available and take them.
+
+        Returns:
+        - Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.acquired += 1
+                    self.wait_seconds += waited
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            # Sleep outside the lock so other workers can refill and check too
+            time.sleep(delay)
+            waited += delay
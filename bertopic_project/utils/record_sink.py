@@ -0,0 +1,107 @@
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+
+class RecordSink:
+    def __init__(self, file_path: str, columns: Sequence[str], chunk_rows: Optional[int] = 10_000):
+        """
+        Streaming CSV writer for scrapers.
+
+        Records are buffered column by column (one list per column instead of
+        one dict per record) and appended to the file in chunks. A chunk is
+        either written completely or not at all: if writing fails, the file is
+        truncated back to its previous size. Memory is bounded by chunk_rows.
+
+        Appending to an existing file keeps its header: columns of the records
+        are reordered to it, and columns it does not have are dropped.
+
+        Parameters:
+        - file_path: CSV file to append to (created with a header if missing or empty)
+        - columns: Column names, in the order record values are given
+        - chunk_rows: Flush automatically once this many records are buffered (None to only flush explicitly)
+        """
+        self.file_path = file_path
+        self.columns = list(columns)
+        self.chunk_rows = chunk_rows
+        self.rows_written = 0
+        self.chunks_written = 0
+        self._buffers: Dict[str, List] = {column: [] for column in self.columns}
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+
+        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+            self.header = list(pd.read_csv(file_path, nrows=0).columns)
+        else:
+            self.header = self.columns
+
+    def __len__(self) -> int:
+        """Number of buffered records"""
+        return len(self._buffers[self.columns[0]])
+
+    def write(self, values: Sequence) -> None:
+        """
+        Buffer one record given as values in column order (e.g. a tuple or dataclasses.astuple).
+        """
+        with self._lock:
+            self._check_healthy()
+            for buffer, value in zip(self._buffers.values(), values):
+                buffer.append(value)
+            if self.chunk_rows and len(self) >= self.chunk_rows:
+                self._flush_locked()
+
+    def flush(self) -> int:
+        """
+        Append the buffered records to the file as one chunk.
+
+        Returns:
+        - Number of records written
+        """
+        with self._lock:
+            self._check_healthy()
+            return self._flush_locked()
+
+    def _check_healthy(self) -> None:
+        # Records of a failed chunk are lost, so refuse to pretend later writes are complete
+        if self._error is not None:
+            raise RuntimeError(f"An earlier chunk of {self.file_path} failed to write") from self._error
+
+    def _flush_locked(self) -> int:
+        rows = len(self)
+        if rows == 0:
+            return 0
+
+        chunk = pd.DataFrame(self._buffers, columns=self.columns)
+        for buffer in self._buffers.values():
+            buffer.clear()
+
+        with open(self.file_path, "ab") as f:
+            offset = f.tell()
+            try:
+                data = chunk.reindex(columns=self.header).to_csv(index=False, header=offset == 0)
+                f.write(data.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            except BaseException as e:
+                # Never leave half a chunk behind
+                f.truncate(offset)
+                self._error = e
+                raise
+
+        self.rows_written += rows
+        self.chunks_written += 1
+        return rows
+
+    def close(self) -> None:
+        """Flush the remaining records"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Records buffered before an error are still complete, keep them
+        self.close()
+        return False
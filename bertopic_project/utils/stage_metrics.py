@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where only threads are serialized
+    fcntl = None
+
+# Shared between the API and the pipeline scripts, which run in separate processes
+STAGE_METRICS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data_preprocessing", "processed_data", "stage_metrics.json",
+)
+
+# "train" and "predict" hold the variant that finished last; each variant of
+# data_prediction/train_runner.py is also recorded under its own name
+PIPELINE_STAGES = [
+    "scrape", "preprocess_social", "preprocess_stock", "topics",
+    "sentiment", "sentiment_with_topics", "train", "predict",
+    "train_without_topics", "predict_without_topics", "train_with_topics", "predict_with_topics",
+]
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def _file_lock(file_path: str):
+    """Hold the thread lock and an exclusive flock on a sidecar lock file"""
+    with _lock:
+        if fcntl is None:
+            yield
+            return
+        # The metrics file itself is replaced on every write, so it cannot carry the lock
+        with open(file_path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def load_stage_metrics(file_path: str = STAGE_METRICS_FILE) -> Dict[str, Dict]:
+    """Return the last recorded run of each pipeline stage ({} if nothing was recorded)"""
+    try:
+        with open(file_path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def record_stage(
+    stage: str,
+    duration_seconds: float,
+    rows: Optional[int] = None,
+    file_path: str = STAGE_METRICS_FILE,
+) -> None:
+    """
+    Record the duration of the most recent run of a pipeline stage.
+
+    The file is rewritten atomically so concurrent readers never see a
+    partially written document. Writers hold an exclusive lock on
+    <file>.lock, so stages recorded at the same time by several processes
+    (pipeline stages, training runs) do not lose each other's updates.
+
+    Parameters:
+    - stage: Stage name (see PIPELINE_STAGES)
+    - duration_seconds: Wall time of the run
+    - rows: Number of rows produced by the stage, if known
+    - file_path: Metrics file to update
+    """
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+    with _file_lock(file_path):
+        metrics = load_stage_metrics(file_path)
+        metrics[stage] = {
+            "duration_seconds": round(duration_seconds, 4),
+            "rows": rows,
+            "finished_at": time.time(),
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(metrics, f, indent=2)
+            os.replace(tmp_path, file_path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(REPO_DIR, "bertopic_project")
+
+# The project modules import each other from bertopic_project (from utils..., from api...)
+sys.path.insert(0, PROJECT_DIR)
+
+
+@pytest.fixture
+def repo_dir(monkeypatch):
+    """Run from the repository root, where the API resolves its data paths"""
+    monkeypatch.chdir(REPO_DIR)
+    return REPO_DIR
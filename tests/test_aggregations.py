@@ -0,0 +1,94 @@
+import pandas as pd
+import pytest
+
+from api.aggregations import social_daily, stock_ohlc, topic_frequency
+
+# Newest first, as the scraper writes them; 2024-01-01, -08 and -15 are Mondays
+STOCK_HISTORY = """Date,Open,High,Low,Close,Adj Close,Volume
+"Jan 15, 2024",60.00,61.00,59.00,60.50,60.50,"1,000"
+"Jan 12, 2024",50.00,55.00,49.00,54.00,54.00,"2,000"
+"Jan 9, 2024",40.00,41.00,38.00,39.00,39.00,"3,000"
+"Jan 8, 2024",30.00,45.00,29.00,35.00,35.00,"4,000"
+"Jan 5, 2024",20.00,22.00,18.00,21.00,21.00,"5,000"
+"Jan 4, 2024",10.00,12.00,9.00,11.00,11.00,"6,000"
+"""
+
+
+@pytest.fixture
+def stock_file(tmp_path):
+    path = tmp_path / "tesla_stock_history.csv"
+    path.write_text(STOCK_HISTORY)
+    return str(path)
+
+
+def test_weekly_bars_are_labelled_by_their_monday(stock_file):
+    weekly = stock_ohlc(stock_file, "W")
+
+    assert weekly.to_dict(orient="list") == {
+        "Date": ["2024-01-01", "2024-01-08", "2024-01-15"],
+        "Open": [10.0, 30.0, 60.0],
+        "High": [22.0, 55.0, 61.0],
+        "Low": [9.0, 29.0, 59.0],
+        "Close": [21.0, 54.0, 60.5],
+        "Adj Close": [21.0, 54.0, 60.5],
+        "Volume": [11000, 9000, 1000],
+    }
+
+
+def test_daily_bars_skip_days_without_trading(stock_file):
+    daily = stock_ohlc(stock_file, "D")
+    assert daily["Date"].tolist() == ["2024-01-04", "2024-01-05", "2024-01-08", "2024-01-09", "2024-01-12", "2024-01-15"]
+
+
+def test_unsupported_frequency(stock_file):
+    with pytest.raises(ValueError):
+        stock_ohlc(stock_file, "M")
+
+
+def test_social_daily_weights_by_multiplicity(tmp_path):
+    path = tmp_path / "comments_with_sentiments_without_topics.csv"
+    pd.DataFrame({
+        "date": ["2024-01-02", "2024-01-02", "2024-01-02", "2024-01-03"],
+        "content": ["spam", "post", "unscored", "later"],
+        "source": ["reddit", "reddit", "reddit", "twitter"],
+        "multiplicity": [3, 1, 2, 1],
+        "vader_compound": [0.5, -0.5, None, 0.1],
+        "finbert_positive": [0.9, 0.1, 0.4, 0.2],
+        "finbert_negative": [0.05, 0.8, 0.3, 0.3],
+        "finbert_neutral": [0.05, 0.1, 0.3, 0.5],
+    }).to_csv(path, index=False)
+
+    daily = social_daily(str(path)).set_index(["date", "source"])
+
+    reddit = daily.loc[("2024-01-02", "reddit")]
+    assert reddit["posts"] == 6
+    # The unscored row counts as posts but not in the vader mean
+    assert reddit["vader_compound_mean"] == pytest.approx((3 * 0.5 - 0.5) / 4)
+    assert reddit["finbert_positive_mean"] == pytest.approx((3 * 0.9 + 0.1 + 2 * 0.4) / 6, abs=1e-4)
+    assert daily.loc[("2024-01-03", "twitter"), "posts"] == 1
+
+
+def test_topic_frequency_weights_by_multiplicity(tmp_path):
+    path = tmp_path / "comments_with_topics.csv"
+    pd.DataFrame({
+        "date": ["2024-01-02", "2024-01-02", "2024-01-04", "2024-01-08"],
+        "content": ["spam", "post", "other", "next week"],
+        "topic": [0, 1, 0, 1],
+        "topic_words": ["deliveries", "cybertruck", "deliveries", "cybertruck"],
+        "multiplicity": [3, 1, 4, 2],
+    }).to_csv(path, index=False)
+
+    daily = topic_frequency(str(path), "D")
+    assert daily[["date", "topic", "count", "share"]].values.tolist() == [
+        ["2024-01-02", 0, 3, 0.75],
+        ["2024-01-02", 1, 1, 0.25],
+        ["2024-01-04", 0, 4, 1.0],
+        ["2024-01-08", 1, 2, 1.0],
+    ]
+
+    weekly = topic_frequency(str(path), "W")
+    assert weekly[["date", "topic", "count", "share"]].values.tolist() == [
+        ["2024-01-01", 0, 7, 0.875],
+        ["2024-01-01", 1, 1, 0.125],
+        ["2024-01-08", 1, 2, 1.0],
+    ]
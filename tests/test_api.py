@@ -0,0 +1,41 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+class UpToDateScraper:
+    """Stands in for TeslaStockScraper: the stored history is already current"""
+
+    output_file = "tesla_stock_history.csv"
+
+    def __init__(self, pool=None):
+        pass
+
+    def refresh_stock_data(self, method="auto"):
+        return None
+
+    def scrape_stock_data(self, start_date, end_date, method="auto"):
+        raise AssertionError("a full scrape was not requested")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "TeslaStockScraper", UpToDateScraper)
+    # Keep the test runs out of the pipeline's stage metrics
+    monkeypatch.setattr(main.metrics, "record_stage", lambda stage, seconds, rows=None: None)
+    return TestClient(main.app)
+
+
+def test_incremental_scrape_ignores_the_date_range(client):
+    response = client.post(
+        "/api/scrape/tesla-stock",
+        params={"incremental": True, "start_date": "2025-02-01", "end_date": "2024-01-01"},
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "up_to_date"
+
+
+def test_full_scrape_still_validates_the_date_range(client):
+    response = client.post("/api/scrape/tesla-stock", params={"start_date": "2025-02-01", "end_date": "2024-01-01"})
+    assert response.status_code == 400
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from data_prediction.data_loader import merge_daily_sentiment
+
+
+def merge_and_ffill(stock_data, daily_sentiment):
+    """Merge of the original predictors: left merge on the trading days, then forward fill"""
+    merged = pd.merge(stock_data, daily_sentiment, on="Date", how="left")
+    merged["vader_sentiment"] = merged["vader_sentiment"].ffill()
+    return merged.dropna().reset_index(drop=True)
+
+
+def test_merge_matches_merge_and_ffill():
+    rng = np.random.RandomState(0)
+    days = pd.date_range("2024-01-01", periods=120)
+    for _ in range(50):
+        trading = days[rng.rand(len(days)) < 0.7]
+        stock = pd.DataFrame({"Date": trading, "Close": rng.rand(len(trading))})
+        posted = days[rng.rand(len(days)) < 0.5]
+        sentiment = pd.DataFrame({"Date": posted, "vader_sentiment": rng.randn(len(posted))})
+
+        pd.testing.assert_frame_equal(
+            merge_daily_sentiment(stock, sentiment), merge_and_ffill(stock, sentiment)
+        )
+
+
+def test_model_input_endpoint_prices(repo_dir):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    response = client.get("/api/data/model-input")
+    assert response.status_code == 200
+    assert b'"Open":244.98,' in response.content
+    assert response.json()[0]["Open"] == 244.98
+
+    cached = client.get("/api/data/model-input", headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304
@@ -0,0 +1,140 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import PROJECT_DIR
+from data_preprocessing.data_preping.yfinance_prep import StockDataPreprocessor
+from data_preprocessing import indicators
+from data_preprocessing.indicators import INDICATOR_COLUMNS, IndicatorEngine, panel_indicators, panel_indicators_parallel
+
+RAW_STOCK_FILE = os.path.join(PROJECT_DIR, "data_extraction", "raw", "tesla_stock_history.csv")
+
+
+@pytest.fixture
+def raw():
+    """Raw price history, oldest day first"""
+    df = pd.read_csv(RAW_STOCK_FILE)
+    order = pd.to_datetime(df["Date"]).sort_values(kind="stable").index
+    return df.loc[order].reset_index(drop=True)
+
+
+@pytest.fixture
+def preprocessor(tmp_path):
+    preprocessor = StockDataPreprocessor()
+    preprocessor.stock_file = str(tmp_path / "raw.csv")
+    preprocessor.processed_file = str(tmp_path / "processed.csv")
+    preprocessor.state_file = str(tmp_path / "state.json")
+    return preprocessor
+
+
+@pytest.fixture
+def panel(raw):
+    """Three tickers of different lengths and price levels, rows shuffled"""
+    prices = ["Open", "High", "Low", "Close", "Adj Close"]
+    half = raw.assign(Ticker="AAA", **{col: raw[col] * 0.5 for col in prices})
+    short = raw.iloc[:45].assign(Ticker="BBB", **{col: raw[col].iloc[:45] * 3 for col in prices})
+    return pd.concat([raw, half, short]).sample(frac=1, random_state=7).reset_index(drop=True)
+
+
+def full_recompute(preprocessor, raw, tmp_path):
+    preprocessor.processed_file = str(tmp_path / "full.csv")
+    raw.to_csv(preprocessor.stock_file, index=False)
+    assert preprocessor.process_data()["success"]
+    return pd.read_csv(preprocessor.processed_file)
+
+
+@pytest.mark.parametrize("split", [1, 5, 19, 20, 21, 100])
+def test_engine_update_matches_full_recompute(preprocessor, raw, split):
+    prices = preprocessor.clean_prices(raw)
+    expected = preprocessor.add_technical_features(prices)
+
+    engine = IndicatorEngine.from_history(prices.iloc[:split])
+    # Save and reload, as between two incremental runs
+    engine = IndicatorEngine.from_dict(engine.to_dict())
+    parts = [engine.update(prices.iloc[split:split + 7]), engine.update(prices.iloc[split + 7:])]
+    actual = pd.concat([expected.iloc[:split]] + parts)
+
+    pd.testing.assert_frame_equal(actual[INDICATOR_COLUMNS], expected[INDICATOR_COLUMNS], rtol=1e-12)
+
+
+def test_rewind_replays_the_last_bar(preprocessor, raw):
+    prices = preprocessor.clean_prices(raw).iloc[:40]
+    engine = IndicatorEngine.from_history(prices)
+    rewound = IndicatorEngine.from_dict(engine.to_dict()).rewind()
+    assert rewound.last_date == prices["Date"].iloc[-2]
+
+    replayed = rewound.update(prices.iloc[-1:])
+    expected = preprocessor.add_technical_features(prices).iloc[-1:]
+    pd.testing.assert_frame_equal(replayed[INDICATOR_COLUMNS], expected[INDICATOR_COLUMNS], rtol=1e-12)
+    assert rewound.to_dict() == engine.to_dict()
+
+
+def test_incremental_appends_match_full_recompute(preprocessor, raw, tmp_path):
+    raw.iloc[:-10].to_csv(preprocessor.stock_file, index=False)
+    assert preprocessor.process_data()["success"]
+    for end in [len(raw) - 6, len(raw) - 6, len(raw)]:
+        raw.iloc[:end].to_csv(preprocessor.stock_file, index=False)
+        assert preprocessor.process_incremental()["success"]
+    incremental = pd.read_csv(preprocessor.processed_file)
+
+    pd.testing.assert_frame_equal(incremental, full_recompute(preprocessor, raw, tmp_path))
+
+
+@pytest.mark.parametrize("with_new_days", [False, True])
+def test_incremental_replaces_revised_last_bar(preprocessor, raw, tmp_path, with_new_days):
+    raw = raw.astype({"Close": str})
+    raw.iloc[:-5].to_csv(preprocessor.stock_file, index=False)
+    assert preprocessor.process_data()["success"]
+
+    # The last processed day is fetched again with a revised close
+    revised = raw.iloc[:-3 if with_new_days else -5].copy()
+    revised.loc[len(raw) - 6, "Close"] = "999"
+    revised.to_csv(preprocessor.stock_file, index=False)
+    result = preprocessor.process_incremental()
+    assert result["success"]
+    assert result["rows_replaced"] == 1
+    assert result["rows_appended"] == (2 if with_new_days else 0)
+    incremental = pd.read_csv(preprocessor.processed_file)
+
+    expected = full_recompute(preprocessor, revised, tmp_path)
+    pd.testing.assert_frame_equal(incremental, expected)
+    assert np.isclose(incremental.loc[len(raw) - 6, "Close"], 999)
+
+
+def test_incremental_rebuilds_missing_state(preprocessor, raw, tmp_path):
+    raw.iloc[:-5].to_csv(preprocessor.stock_file, index=False)
+    assert preprocessor.process_data()["success"]
+    os.remove(preprocessor.state_file)
+
+    raw.to_csv(preprocessor.stock_file, index=False)
+    assert preprocessor.process_incremental()["success"]
+    incremental = pd.read_csv(preprocessor.processed_file)
+
+    pd.testing.assert_frame_equal(incremental, full_recompute(preprocessor, raw, tmp_path))
+
+
+def test_panel_matches_single_ticker_path(preprocessor, panel, tmp_path):
+    panel_file = str(tmp_path / "panel.csv")
+    panel.to_csv(panel_file, index=False)
+    result = preprocessor.process_panel(panel_file, str(tmp_path / "panel_out.csv"), workers=1)
+    assert result["success"]
+    assert result["tickers"] == 3
+    featurized = pd.read_csv(result["file_path"])
+
+    for ticker, rows in panel.groupby("Ticker"):
+        expected = full_recompute(preprocessor, rows, tmp_path)
+        actual = featurized[featurized["Ticker"] == ticker].reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_parallel_panel_matches_serial(preprocessor, panel, monkeypatch):
+    prices = preprocessor.clean_prices(panel.astype({"Ticker": "category"}))
+    serial = panel_indicators(prices)
+
+    # Take the process-pool path despite the small panel
+    monkeypatch.setattr(indicators, "PARALLEL_PANEL_MIN_ROWS", 0)
+    parallel = panel_indicators_parallel(prices, workers=2)
+
+    pd.testing.assert_frame_equal(parallel, serial)
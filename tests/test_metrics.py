@@ -0,0 +1,42 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from api import metrics as metrics_module
+from api.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(metrics_module, "load_stage_metrics", lambda: {})
+    return MetricsRegistry()
+
+
+def test_label_values_are_escaped(registry):
+    registry.request_started()
+    registry.request_finished('/a\\b"c\nd', "GET", 200, 0.01)
+
+    count_lines = [line for line in registry.render().splitlines() if line.startswith("http_request_duration_seconds_count")]
+    assert count_lines == ['http_request_duration_seconds_count{route="/a\\\\b\\"c\\nd",method="GET",status="200"} 1']
+
+
+def test_requests_are_labelled_with_the_route_template(registry, monkeypatch):
+    monkeypatch.setattr(main, "metrics", registry)
+
+    async def get_item(item_id: int):
+        return {"item_id": item_id}
+
+    main.app.add_api_route("/api/test/items/{item_id}", get_item)
+    try:
+        client = TestClient(main.app)
+        assert client.get("/api/test/items/1").status_code == 200
+        assert client.get("/api/test/items/2").status_code == 200
+        assert client.get("/no/such/page").status_code == 404
+    finally:
+        main.app.router.routes.pop()
+
+    counts = {labels: series[-2] for labels, series in registry.request_latency.samples()}
+    assert counts == {
+        ("/api/test/items/{item_id}", "GET", "200"): 2,
+        ("unmatched", "GET", "404"): 1,
+    }
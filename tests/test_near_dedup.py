@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from utils.near_dedup import MULTIPLICITY_COLUMN, NearDuplicateCollapser
+
+SPAM = "Tesla deliveries crushed expectations this quarter, load up on $TSLA before earnings!"
+OTHER = "Cybertruck production ramp looks slower than guided, trimming my position for now."
+
+
+@pytest.fixture
+def posts():
+    rows = [
+        ("2024-01-02", "reddit", SPAM),
+        ("2024-01-02", "reddit", SPAM + "!!"),
+        ("2024-01-02", "reddit", OTHER),
+        ("2024-01-02", "reddit", SPAM.replace("load up", "loading up")),
+        ("2024-01-02", "twitter", SPAM),
+        ("2024-01-03", "reddit", SPAM),
+        ("2024-01-03", "reddit", SPAM + " 🚀"),
+        ("2024-01-03", "reddit", OTHER),
+    ]
+    return pd.DataFrame(rows, columns=["date", "source", "content"])
+
+
+@pytest.fixture
+def collapser():
+    return NearDuplicateCollapser()
+
+
+def clusters(df):
+    """Collapsed rows as a comparable set"""
+    return set(df[["date", "source", "content", MULTIPLICITY_COLUMN]].itertuples(index=False, name=None))
+
+
+def test_groups_are_collapsed_separately(collapser, posts):
+    collapsed = collapser.collapse(posts, group_columns=["date", "source"])
+
+    assert clusters(collapsed) == {
+        ("2024-01-02", "reddit", OTHER, 1),
+        ("2024-01-02", "reddit", SPAM, 3),
+        ("2024-01-02", "twitter", SPAM, 1),
+        ("2024-01-03", "reddit", OTHER, 1),
+        ("2024-01-03", "reddit", SPAM, 2),
+    }
+    # Without groups, the same texts merge across days and sources
+    assert clusters(collapser.collapse(posts)) == {
+        ("2024-01-02", "reddit", SPAM, 6),
+        ("2024-01-02", "reddit", OTHER, 2),
+    }
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_collapse_ignores_row_order(collapser, posts, seed):
+    shuffled = posts.sample(frac=1, random_state=seed)
+    expected = collapser.collapse(posts, group_columns=["date", "source"])
+    assert clusters(collapser.collapse(shuffled, group_columns=["date", "source"])) == clusters(expected)
+
+
+def test_collapsing_again_adds_up_the_weights(collapser, posts):
+    expected = collapser.collapse(posts, group_columns=["date", "source"])
+
+    # As when the streaming mode collapses each chunk, then the concatenated chunks
+    chunks = [collapser.collapse(chunk, group_columns=["date", "source"]) for chunk in (posts.iloc[:3], posts.iloc[3:])]
+    recollapsed = collapser.collapse(pd.concat(chunks), group_columns=["date", "source"])
+
+    assert clusters(recollapsed) == clusters(expected)
+    assert recollapsed[MULTIPLICITY_COLUMN].sum() == len(posts)
+    # Collapsing a collapsed frame changes nothing
+    assert clusters(collapser.collapse(expected, group_columns=["date", "source"])) == clusters(expected)
@@ -0,0 +1,69 @@
+import subprocess
+import sys
+
+from conftest import PROJECT_DIR
+from pipeline import PipelineRunner, Stage
+
+WRITE_OUTPUT = """
+import sys
+with open(sys.argv[1], "w") as f:
+    f.write("done")
+"""
+
+# Like the stage scripts: report the failure, then exit non-zero
+FAIL_AFTER_WRITING = """
+import sys
+with open(sys.argv[1], "w") as f:
+    f.write("partial")
+print({"success": False, "error": "boom"})
+sys.exit(1)
+"""
+
+
+def make_stage(tmp_path, name, code, inputs=(), output=None):
+    script = tmp_path / f"{name}.py"
+    script.write_text(code)
+    output = output or str(tmp_path / f"{name}.out")
+    return Stage(name=name, script=str(script), inputs=list(inputs), outputs=[output], args=[output])
+
+
+def test_failed_stage_is_not_recorded_and_blocks_dependents(tmp_path):
+    source = make_stage(tmp_path, "source", WRITE_OUTPUT)
+    failing = make_stage(tmp_path, "failing", FAIL_AFTER_WRITING, inputs=source.outputs)
+    downstream = make_stage(tmp_path, "downstream", WRITE_OUTPUT, inputs=failing.outputs)
+    stages = [source, failing, downstream]
+    state_file = str(tmp_path / "state.json")
+
+    results = PipelineRunner(stages, state_file=state_file).run([s.name for s in stages])
+    assert results["source"]["status"] == "ran"
+    assert results["failing"]["status"] == "failed"
+    assert results["downstream"]["status"] == "blocked"
+
+    # The failing stage left an output behind, but is not considered up to date
+    runner = PipelineRunner(stages, state_file=state_file)
+    assert "failing" not in runner.state["stages"]
+    results = runner.run([s.name for s in stages])
+    assert results["source"]["status"] == "skipped"
+    assert results["failing"]["status"] == "failed"
+
+
+def test_unchanged_stage_is_skipped(tmp_path):
+    stage = make_stage(tmp_path, "source", WRITE_OUTPUT)
+    state_file = str(tmp_path / "state.json")
+    assert PipelineRunner([stage], state_file=state_file).run(["source"])["source"]["status"] == "ran"
+    assert PipelineRunner([stage], state_file=state_file).run(["source"])["source"]["status"] == "skipped"
+
+
+def test_stage_scripts_exit_non_zero_on_failure(tmp_path):
+    # Stage scripts report failures as {"success": False, ...} results
+    code = (
+        "import sys\n"
+        f"sys.path.insert(0, {PROJECT_DIR + '/data_preprocessing/data_preping'!r})\n"
+        "import yfinance_prep\n"
+        "yfinance_prep.StockDataPreprocessor.process_data = lambda self: {'success': False, 'error': 'boom'}\n"
+        "sys.argv = ['yfinance_prep.py']\n"
+        "yfinance_prep.main()\n"
+    )
+    process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert process.returncode == 1
+    assert "error: boom" in process.stdout
@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+
+from utils.profiling import StageProfiler
+
+
+def test_rss_is_measured_per_stage():
+    profiler = StageProfiler(enabled=True)
+    with profiler.stage("allocate") as stage:
+        data = np.ones(64 * 1024 ** 2 // 8)
+        stage.rows_out = len(data)
+    with profiler.stage("small"):
+        small = list(range(10))
+    del data, small
+
+    allocate, small = sorted(profiler.records, key=lambda r: r.start)
+    assert allocate.rss_delta_mb > 50
+    assert abs(small.rss_delta_mb) < 10
+    # The process peak is not per stage: the later, smaller stage still reports it
+    assert small.process_peak_rss_mb > allocate.rss_start_mb + 50
+    assert set(allocate.to_dict()) >= {"rss_start_mb", "rss_end_mb", "rss_delta_mb", "peak_rss_mb", "process_peak_rss_mb"}
+
+
+def test_peak_rss_is_sampled_while_the_stage_runs():
+    profiler = StageProfiler(enabled=True, rss_sample_interval=0.005)
+    with profiler.stage("spike"):
+        data = np.ones(128 * 1024 ** 2 // 8)
+        time.sleep(0.1)
+        # Freed before the stage ends, so only the sampler sees it
+        del data
+    with profiler.stage("after"):
+        time.sleep(0.05)
+
+    spike, after = sorted(profiler.records, key=lambda r: r.start)
+    assert abs(spike.rss_delta_mb) < 20
+    assert spike.peak_rss_mb > spike.rss_start_mb + 100
+    # Unlike the process-wide peak, a later stage does not inherit the spike
+    assert after.peak_rss_mb < spike.peak_rss_mb - 100
+    assert after.process_peak_rss_mb > after.rss_start_mb + 100
+
+
+def test_stage_is_exported_under_every_name(monkeypatch):
+    exported = []
+    monkeypatch.setattr("utils.profiling.record_stage", lambda stage, seconds, rows: exported.append((stage, rows)))
+    profiler = StageProfiler()
+
+    with profiler.stage("train_lstm", export_as=["train", "train_with_topics"]) as stage:
+        stage.rows_out = 3
+    with profiler.stage("predict_lstm", export_as="predict") as stage:
+        stage.rows_out = 19
+
+    assert exported == [("train", 3), ("train_with_topics", 3), ("predict", 19)]
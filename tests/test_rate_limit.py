@@ -0,0 +1,95 @@
+import prawcore
+import pytest
+
+from utils import rate_limit
+from utils.rate_limit import TokenBucket
+
+
+class FakeClock:
+    """Stands in for the time module: sleep() advances monotonic() instantly"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def test_burst_then_blocks_until_refilled(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Empty bucket: the next token arrives after 1 / rate seconds
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert clock.sleeps == [pytest.approx(0.5)]
+    assert bucket.acquired == 4
+    assert bucket.wait_seconds == pytest.approx(0.5)
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+
+    clock.now += 1.5
+    assert bucket.acquire() == 0.0
+    # Half a token is left, so the next one takes another half second
+    assert bucket.acquire() == pytest.approx(0.5)
+
+    # An idle minute refills at most `capacity` tokens
+    clock.now += 60
+    assert [bucket.acquire() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_per_minute_budget(clock):
+    bucket = TokenBucket.per_minute(30, burst=5)
+    assert bucket.rate == pytest.approx(0.5)
+    assert bucket.capacity == 5
+
+    waits = [bucket.acquire() for _ in range(7)]
+    assert waits == [0.0] * 5 + [pytest.approx(2.0)] * 2
+    assert clock.now == pytest.approx(104.0)
+
+
+def test_invalid_bucket():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, capacity=5)
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1, capacity=0.5)
+
+
+def test_requestor_takes_a_token_before_every_request(clock, monkeypatch):
+    from data_extraction.scraping_reddit.scraper_praw import RateLimitedRequestor
+
+    sent = []
+    monkeypatch.setattr(prawcore.Requestor, "request", lambda self, *args, **kwargs: sent.append(clock.now))
+    requestor = RateLimitedRequestor(user_agent="test agent", limiter=TokenBucket(rate=1.0, capacity=2))
+
+    for _ in range(4):
+        requestor.request("GET", "https://oauth.reddit.com/r/stocks/search")
+    assert sent == [100.0, 100.0, pytest.approx(101.0), pytest.approx(102.0)]
+
+
+def test_every_thread_client_shares_the_scraper_bucket():
+    from concurrent.futures import ThreadPoolExecutor
+    from data_extraction.scraping_reddit.scraper_praw import RateLimitedRequestor, RedditStockScraper
+
+    scraper = RedditStockScraper("client id", "client secret", "test agent")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        requestors = list(executor.map(lambda _: scraper.reddit._core.requestor, range(2)))
+
+    assert all(isinstance(requestor, RateLimitedRequestor) for requestor in requestors)
+    assert all(requestor.limiter is scraper.limiter for requestor in requestors)
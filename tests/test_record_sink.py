@@ -0,0 +1,59 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils import record_sink
+from utils.record_sink import RecordSink
+
+COLUMNS = ["content", "date", "id"]
+
+
+def test_chunks_are_flushed_every_chunk_rows(tmp_path):
+    path = str(tmp_path / "out.csv")
+    with RecordSink(path, COLUMNS, chunk_rows=2) as sink:
+        for i in range(5):
+            sink.write((f"post {i}", "2024-01-02", str(i)))
+        assert sink.chunks_written == 2
+        assert len(sink) == 1
+
+    stored = pd.read_csv(path, dtype=str)
+    assert list(stored.columns) == COLUMNS
+    assert stored["id"].tolist() == ["0", "1", "2", "3", "4"]
+    assert sink.rows_written == 5
+
+
+def test_existing_header_is_reused(tmp_path):
+    path = tmp_path / "out.csv"
+    path.write_text("date,content,source\n2024-01-01,old post,reddit\n")
+
+    with RecordSink(str(path), COLUMNS) as sink:
+        sink.write(("new post", "2024-01-02", "17"))
+
+    # Reordered to the file's columns; id is dropped and source left empty
+    assert path.read_text() == "date,content,source\n2024-01-01,old post,reddit\n2024-01-02,new post,\n"
+
+
+def test_failed_chunk_is_truncated(tmp_path, monkeypatch):
+    path = str(tmp_path / "out.csv")
+    sink = RecordSink(path, COLUMNS, chunk_rows=None)
+    sink.write(("first", "2024-01-01", "1"))
+    sink.flush()
+    size = os.path.getsize(path)
+
+    def failing_fsync(fd):
+        raise OSError("disk full")
+
+    # The chunk reaches the file, then the sync fails
+    monkeypatch.setattr(record_sink.os, "fsync", failing_fsync)
+    sink.write(("second", "2024-01-02", "2"))
+    with pytest.raises(OSError):
+        sink.flush()
+    monkeypatch.undo()
+
+    assert os.path.getsize(path) == size
+    assert pd.read_csv(path, dtype=str)["id"].tolist() == ["1"]
+    # Records of the failed chunk are lost, so later writes are refused
+    with pytest.raises(RuntimeError):
+        sink.write(("third", "2024-01-03", "3"))
+    assert sink.rows_written == 1
@@ -0,0 +1,49 @@
+import re
+
+import pytest
+
+from data_extraction.scraping_reddit.scraper_praw import TickerMatcher
+
+
+@pytest.fixture
+def matcher():
+    return TickerMatcher({"F": "Ford Motor", "IT": "Gartner", "TSLA": "Tesla"})
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Short tickers only count in uppercase
+    ("it is going up", set()),
+    ("IT beat earnings", {"IT"}),
+    ("f this market", set()),
+    ("F is cheap", {"F"}),
+    # ... unless they are $-prefixed
+    ("loading up on $it and $f", {"IT", "F"}),
+    # Tickers of 4+ characters and company names match in any case
+    ("tsla and Tsla", {"TSLA"}),
+    ("ford   motor recalls", {"F"}),
+    ("GARTNER report", {"IT"}),
+    ("TSLA's delivery numbers", {"TSLA"}),
+    # Only whole words
+    ("TSLAQ FORDS ITS Teslas", set()),
+    ("", set()),
+])
+def test_find(matcher, text, expected):
+    assert matcher.find(text) == expected
+
+
+def test_query_batches_stay_within_the_length_limit():
+    stocks = {f"T{i:03d}": f"Company number {i} Holdings Incorporated" for i in range(60)}
+    matcher = TickerMatcher(stocks)
+
+    batches = matcher.query_batches()
+    assert len(batches) > 1
+    assert all(len(batch) <= TickerMatcher.MAX_QUERY_LENGTH for batch in batches)
+    # Every stock is searched exactly once, in order
+    terms = [term for batch in batches for term in re.findall(r'\((T\d{3}) OR "', batch)]
+    assert terms == list(stocks)
+
+
+def test_query_batches_keep_an_oversized_term_on_its_own():
+    matcher = TickerMatcher({"TSLA": "Tesla", "BRK": "Berkshire Hathaway", "F": "Ford Motor"})
+    assert matcher.query_batches(max_length=20) == ['(TSLA OR "Tesla")', '(BRK OR "Berkshire Hathaway")', '(F OR "Ford Motor")']
+    assert matcher.query_batches() == ['(TSLA OR "Tesla") OR (BRK OR "Berkshire Hathaway") OR (F OR "Ford Motor")']
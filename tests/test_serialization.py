@@ -0,0 +1,54 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from api import serialization
+from api.serialization import frame_to_json_bytes
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    """Run each test with orjson and with the json module fallback"""
+    if request.param == "orjson":
+        if serialization.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def test_floats_use_shortest_repr(encoder):
+    df = pd.DataFrame({
+        "Open": [250.08, 237.49],
+        "Close": np.array([244.98, 218.89], dtype="float32"),
+    })
+    body = frame_to_json_bytes(df)
+    assert b"250.08," in body
+    assert b"244.98}" in body
+    assert json.loads(body) == [{"Open": 250.08, "Close": 244.98}, {"Open": 237.49, "Close": 218.89}]
+
+
+def test_missing_values_and_dates(encoder):
+    df = pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-02", None]),
+        "value": [1.5, np.nan],
+        "text": ["é", None],
+        "count": [1, 2],
+    })
+    assert json.loads(frame_to_json_bytes(df)) == [
+        {"date": "2024-01-02T00:00:00.000", "value": 1.5, "text": "é", "count": 1},
+        {"date": None, "value": None, "text": None, "count": 2},
+    ]
+
+
+def test_api_prices_round_trip(repo_dir):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    response = client.get("/api/aggregates/tesla-stock/ohlc")
+    assert response.status_code == 200
+    assert b'"Open":250.08,' in response.content
+    assert response.json()[0]["Open"] == 250.08
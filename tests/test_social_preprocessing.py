@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import PROJECT_DIR
+from data_preprocessing.data_preping import reddit_X_prep
+from data_preprocessing.data_preping.reddit_X_prep import SocialMediaPreprocessor, clean_texts
+
+RAW_DIR = os.path.join(PROJECT_DIR, "data_extraction", "raw")
+
+EDGE_CASE_TEXTS = [
+    None,
+    np.nan,
+    "",
+    "   ",
+    "$TSLA to the moon!!! 🚀🚀",
+    "Buy $tsla and $AAPL, sell $F",
+    "see https://example.com/a?b=c and www.tesla.com now",
+    "[link](http://x.y) (parenthesised) [bracketed]",
+    "AT&amp;T &lt;3 &gt; Tesla",
+    "#Tesla #EV are @elonmusk's @favourites",
+    "multi\nline\ttext   with    spaces",
+    "prices: 250.08 - 3.5% (down) ... ok",
+    "$",
+    "$$TSLA$",
+    "unclosed [bracket and (paren",
+    "café naïve résumé",
+    "$TSLA",
+]
+
+
+@pytest.fixture
+def preprocessor(tmp_path):
+    preprocessor = SocialMediaPreprocessor()
+    preprocessor.output_dir = str(tmp_path)
+    return preprocessor
+
+
+def test_clean_texts_matches_clean_text(preprocessor):
+    texts = pd.Series(EDGE_CASE_TEXTS, dtype=object)
+    expected = [preprocessor.clean_text(text) for text in texts]
+    assert clean_texts(texts).tolist() == expected
+
+
+def test_parallel_clean_texts_matches_clean_text(preprocessor, monkeypatch):
+    monkeypatch.setattr(reddit_X_prep, "PARALLEL_CLEAN_MIN_ROWS", 0)
+    texts = pd.Series(EDGE_CASE_TEXTS * 5, dtype=object, index=np.arange(len(EDGE_CASE_TEXTS) * 5) + 10)
+    cleaned = preprocessor.clean_texts(texts, workers=2)
+    assert cleaned.index.equals(texts.index)
+    assert cleaned.tolist() == [preprocessor.clean_text(text) for text in texts]
+
+
+def test_clean_texts_matches_clean_text_on_raw_data(preprocessor):
+    reddit = pd.read_csv(os.path.join(RAW_DIR, "reddit_data.csv"), nrows=500)
+    tweets = pd.read_csv(os.path.join(RAW_DIR, "Tweets_TSLA.csv"), nrows=500)
+    texts = pd.concat([reddit["title"] + " [TITLE_END] " + reddit["text"].fillna(""), tweets["content"]])
+    assert clean_texts(texts).tolist() == [preprocessor.clean_text(text) for text in texts]
+
+
+@pytest.mark.parametrize("dedup", [True, False])
+def test_streaming_matches_in_memory(preprocessor, tmp_path, dedup):
+    input_dir = tmp_path / "raw"
+    input_dir.mkdir()
+    pd.read_csv(os.path.join(RAW_DIR, "reddit_data.csv"), nrows=400).to_csv(input_dir / "reddit_data.csv", index=False)
+    pd.read_csv(os.path.join(RAW_DIR, "Tweets_TSLA.csv"), nrows=1500).to_csv(input_dir / "Tweets_TSLA.csv", index=False)
+    preprocessor.input_dir = str(input_dir)
+    output_file = os.path.join(preprocessor.output_dir, "processed_social_data.csv")
+
+    in_memory = preprocessor.process_data(dedup=dedup)
+    assert in_memory["success"]
+    expected = pd.read_csv(output_file)
+
+    # Small chunks, so posts of a day are split across several of them
+    streaming = preprocessor.process_data_streaming(chunk_rows=97, dedup=dedup)
+    assert streaming["success"]
+    actual = pd.read_csv(output_file)
+
+    assert streaming["duplicates_collapsed"] == in_memory["duplicates_collapsed"]
+    # Only the order of the posts within a day may differ
+    key = list(expected.columns)
+    pd.testing.assert_frame_equal(
+        actual.sort_values(key).reset_index(drop=True),
+        expected.sort_values(key).reset_index(drop=True),
+    )
+    assert actual["date"].is_monotonic_increasing
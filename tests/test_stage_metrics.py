@@ -0,0 +1,21 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.stage_metrics import load_stage_metrics, record_stage
+
+
+def record_many(file_path, worker, runs):
+    for run in range(runs):
+        record_stage(f"stage_{worker}_{run}", 0.5, rows=run, file_path=file_path)
+
+
+def test_concurrent_processes_keep_every_stage(tmp_path):
+    file_path = str(tmp_path / "stage_metrics.json")
+    workers, runs = 4, 25
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(record_many, file_path, worker, runs) for worker in range(workers)]
+        for future in futures:
+            future.result()
+
+    metrics = load_stage_metrics(file_path)
+    assert len(metrics) == workers * runs
+    assert metrics["stage_3_24"]["rows"] == 24
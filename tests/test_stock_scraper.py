@@ -0,0 +1,201 @@
+import json
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+import requests
+
+from data_extraction.scraping_yfinance.scraper import PRICE_COLUMNS, TeslaStockScraper
+
+
+def chart_payload(days):
+    """Chart API answer for (YYYY-MM-DD, open, high, low, close, adj close, volume) rows"""
+    # Bars are stamped at the 9:30 New York open, in UTC
+    timestamps = [
+        int(datetime.strptime(day[0], "%Y-%m-%d").replace(hour=14, minute=30, tzinfo=timezone.utc).timestamp())
+        for day in days
+    ]
+    columns = list(zip(*[day[1:] for day in days])) if days else [[]] * 6
+    return {
+        "chart": {
+            "result": [{
+                "meta": {"symbol": "TSLA", "gmtoffset": -18000},
+                "timestamp": timestamps,
+                "indicators": {
+                    "quote": [{
+                        "open": list(columns[0]),
+                        "high": list(columns[1]),
+                        "low": list(columns[2]),
+                        "close": list(columns[3]),
+                        "volume": list(columns[5]),
+                    }],
+                    "adjclose": [{"adjclose": list(columns[4])}],
+                },
+            }],
+            "error": None,
+        }
+    }
+
+
+DAYS = [
+    ("2024-01-02", 250.08, 251.25, 244.41, 248.42, 248.42, 104654200),
+    ("2024-01-03", 244.98, 245.68, 236.32, 238.45, 238.45, 121082600),
+    # Holidays come back as nulls
+    ("2024-01-04", None, None, None, None, None, None),
+    ("2024-01-05", 236.86, 240.12, 234.9, 237.49, 237.49, 92488900),
+]
+
+
+class StubChartServer:
+    """Local chart API answering each request with the next canned (status, body)"""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                stub.requests.append((url.path, parse_qs(url.query)))
+                status, body = stub.responses.pop(0) if stub.responses else (500, {"error": "no response left"})
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    with StubChartServer() as server:
+        yield server
+
+
+@pytest.fixture
+def scraper(stub, tmp_path):
+    scraper = TeslaStockScraper(base_url=stub.url, timeout=5)
+    scraper.output_dir = str(tmp_path)
+    scraper.output_file = str(tmp_path / "tesla_stock_history.csv")
+    return scraper
+
+
+def test_parses_chart_like_the_history_table(stub, scraper):
+    stub.responses.append((200, chart_payload(DAYS)))
+    data = scraper.fetch_price_history("2024-01-01", "2024-01-08")
+
+    assert list(data.columns) == PRICE_COLUMNS
+    assert data.to_dict(orient="list") == {
+        "Date": ["Jan 5, 2024", "Jan 3, 2024", "Jan 2, 2024"],
+        "Open": ["236.86", "244.98", "250.08"],
+        "High": ["240.12", "245.68", "251.25"],
+        "Low": ["234.90", "236.32", "244.41"],
+        "Close": ["237.49", "238.45", "248.42"],
+        "Adj Close": ["237.49", "238.45", "248.42"],
+        "Volume": ["92,488,900", "121,082,600", "104,654,200"],
+    }
+
+    path, query = stub.requests[0]
+    assert path == "/v8/finance/chart/TSLA"
+    assert query["period1"] == ["1704067200"]
+    assert query["period2"] == ["1704672000"]
+    assert query["interval"] == ["1d"]
+
+
+def test_retries_transient_errors(stub, scraper):
+    stub.responses += [(503, {}), (502, {}), (200, chart_payload(DAYS[:2]))]
+    data = scraper.fetch_price_history("2024-01-01", "2024-01-08")
+
+    assert data["Date"].tolist() == ["Jan 3, 2024", "Jan 2, 2024"]
+    assert len(stub.requests) == 3
+
+
+def test_raises_on_client_error_without_retrying(stub, scraper):
+    stub.responses.append((404, {"chart": {"result": None, "error": {"code": "Not Found"}}}))
+    with pytest.raises(requests.HTTPError):
+        scraper.fetch_price_history("2024-01-01", "2024-01-08")
+    assert len(stub.requests) == 1
+
+
+def test_gives_up_after_repeated_server_errors(stub, scraper):
+    stub.responses += [(500, {})] * 4
+    with pytest.raises(requests.RequestException):
+        scraper.fetch_price_history("2024-01-01", "2024-01-08")
+    assert len(stub.requests) == 4
+
+
+def test_chart_error_is_not_silently_empty(stub, scraper):
+    stub.responses.append((200, {"chart": {"result": None, "error": {"code": "Bad Request"}}}))
+    with pytest.raises(ValueError):
+        scraper.scrape_stock_data("2024-01-01", "2024-01-08", method="http")
+
+
+def test_scrape_saves_the_raw_file(stub, scraper):
+    stub.responses.append((200, chart_payload(DAYS)))
+    scraper.scrape_stock_data("2024-01-01", "2024-01-08", method="http")
+
+    saved = pd.read_csv(scraper.output_file, dtype=str)
+    assert list(saved.columns) == PRICE_COLUMNS + ["Ticker", "Company_Name"]
+    assert saved["Date"].tolist() == ["Jan 5, 2024", "Jan 3, 2024", "Jan 2, 2024"]
+    assert set(saved["Ticker"]) == {"TSLA"}
+
+
+def test_refresh_upserts_the_last_day_and_ignores_older_rows(stub, scraper):
+    stub.responses.append((200, chart_payload(DAYS[:2])))
+    scraper.scrape_stock_data("2024-01-01", "2024-01-04", method="http")
+
+    # The last stored day comes back revised, with an older day the refresh did not ask for
+    revised = [DAYS[0][:4] + (999.0, 999.0, 1), DAYS[1][:4] + (240.0, 240.0, 2), DAYS[3]]
+    stub.responses.append((200, chart_payload(revised)))
+    scraper.refresh_stock_data(end_date="2024-01-08", method="http")
+
+    assert stub.requests[-1][1]["period1"] == ["1704240000"]
+    saved = pd.read_csv(scraper.output_file, dtype=str)
+    assert saved["Date"].tolist() == ["Jan 5, 2024", "Jan 3, 2024", "Jan 2, 2024"]
+    assert saved["Close"].tolist() == ["237.49", "240.00", "248.42"]
+
+
+def test_dates_match_the_committed_history_file(stub, scraper):
+    from conftest import PROJECT_DIR
+
+    committed = pd.read_csv(f"{PROJECT_DIR}/data_extraction/raw/tesla_stock_history.csv", dtype=str)
+    stored = set(committed["Date"])
+    assert "Jan 2, 2024" in stored and "Jan 02, 2024" not in stored
+
+    stub.responses.append((200, chart_payload(DAYS[:1])))
+    data = scraper.fetch_price_history("2024-01-01", "2024-01-03")
+    assert data["Date"].tolist() == ["Jan 2, 2024"]
+
+
+def test_refresh_normalizes_zero_padded_dates(stub, scraper):
+    pd.DataFrame({
+        "Date": ["Jan 03, 2024", "Jan 02, 2024"],
+        **{col: ["1.00", "1.00"] for col in PRICE_COLUMNS[1:]},
+        "Ticker": "TSLA",
+        "Company_Name": "Tesla, Inc.",
+    }).to_csv(scraper.output_file, index=False)
+
+    stub.responses.append((200, chart_payload(DAYS[1:])))
+    scraper.refresh_stock_data(end_date="2024-01-08", method="http")
+
+    saved = pd.read_csv(scraper.output_file, dtype=str)
+    assert saved["Date"].tolist() == ["Jan 5, 2024", "Jan 3, 2024", "Jan 2, 2024"]
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+from conftest import PROJECT_DIR
+
+# The X scraper drives Chrome through undetected_chromedriver
+pytest.importorskip("undetected_chromedriver")
+pytest.importorskip("dotenv")
+# cli.py imports x_scrapper as a sibling script
+sys.path.insert(0, os.path.join(PROJECT_DIR, "data_extraction", "scraping_X"))
+
+from utils.record_sink import RecordSink
+from x_scrapper import OUTPUT_COLUMNS, migrate_output_header
+from cli import merge_shards
+
+LEGACY_ROWS = "content,date\nfirst tweet,2024-01-02 10:00:00\nsecond tweet,2024-01-02 11:00:00\n"
+
+
+@pytest.fixture
+def legacy_file(tmp_path):
+    path = tmp_path / "TSLA_tweets.csv"
+    path.write_text(LEGACY_ROWS)
+    return str(path)
+
+
+def test_legacy_header_is_migrated_before_appending(legacy_file):
+    migrate_output_header(legacy_file)
+    with RecordSink(legacy_file, OUTPUT_COLUMNS, chunk_rows=None) as sink:
+        sink.write(("new tweet", "2024-01-03 09:00:00", "1745"))
+
+    stored = pd.read_csv(legacy_file, dtype=str, keep_default_na=False)
+    assert list(stored.columns) == ["content", "date", "id"]
+    assert stored["id"].tolist() == ["", "", "1745"]
+    assert stored["content"].tolist() == ["first tweet", "second tweet", "new tweet"]
+
+
+def test_migration_leaves_current_files_untouched(tmp_path):
+    path = tmp_path / "TSLA_tweets.csv"
+    path.write_text("content,date,id\nfirst tweet,2024-01-02 10:00:00,17\n")
+    modified = os.path.getmtime(path)
+
+    migrate_output_header(str(path))
+    assert os.path.getmtime(path) == modified
+    assert os.listdir(tmp_path) == ["TSLA_tweets.csv"]
+
+
+def test_merged_shards_keep_their_ids(tmp_path, legacy_file):
+    shard = tmp_path / "TSLA_tweets.shard0.csv"
+    pd.DataFrame({"content": ["shard tweet"], "date": ["2024-01-04 08:00:00"], "id": ["1800"]}).to_csv(shard, index=False)
+
+    assert merge_shards([str(shard)], legacy_file) == 1
+    stored = pd.read_csv(legacy_file, dtype=str, keep_default_na=False)
+    assert stored["id"].tolist() == ["", "", "1800"]
+    assert not shard.exists()